@@ -4,39 +4,145 @@ This module handles SQLAlchemy database engine, session management,
 and provides the base class for all database models.
 """
 
-from sqlalchemy import create_engine, MetaData, inspect
+from sqlalchemy import create_engine, event, MetaData, inspect
+from sqlalchemy.engine import Engine, URL, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import QueuePool, StaticPool
 from contextlib import contextmanager
 import logging
-from typing import Generator
+from typing import Generator, Optional
 
 from .settings import settings
+from app.utils.deadline import DeadlineExceeded, current_deadline
 
 # Configure logging for database operations
 logger = logging.getLogger(__name__)
 
-# SQLAlchemy database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_recycle=1800,
-    echo=settings.DEBUG,  # Log SQL queries in debug mode
-    future=True,
-    connect_args={
-        "ssl_disabled": False,  # Enable SSL for Aiven
-        "ssl_verify_identity": False,
-        "autocommit": False,
-        "charset": "utf8mb4",
-        "sql_mode": "TRADITIONAL",
-    },
-    execution_options={
-        "schema_translate_map": None,
-        "compiled_cache": {}
+MYSQL_CONNECT_ARGS = {
+    "ssl_disabled": False,  # Enable SSL for Aiven
+    "ssl_verify_identity": False,
+    "autocommit": False,
+    "charset": "utf8mb4",
+    "sql_mode": "TRADITIONAL",
+}
+
+
+def _is_sqlite_memory(url: URL) -> bool:
+    """Whether a SQLite URL points at an in-memory database."""
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Enables WAL journaling and foreign keys on each new file-backed SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _interrupt_after_deadline(conn, cursor, statement, parameters, context, executemany):
+    """Bounds a SQLite statement by the current request deadline.
+
+    A progress handler polls the deadline every few thousand VM instructions and
+    aborts the statement once it has passed. It is reset on every statement, so a
+    connection never carries over a previous request's deadline.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        cursor.connection.set_progress_handler(None, 0)
+        return
+    deadline.check()
+    cursor.connection.set_progress_handler(deadline.expired, 4000)
+
+
+def _mysql_execution_time_hint(conn, cursor, statement, parameters, context, executemany):
+    """Adds a `MAX_EXECUTION_TIME` hint with the request's remaining time to SELECT statements.
+
+    MySQL only enforces the limit on SELECTs; writes are bounded by the lock wait timeout.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return statement, parameters
+    deadline.check()
+    remaining = deadline.remaining()
+    if remaining is not None and statement.lstrip()[:6].upper() == "SELECT":
+        head, _, tail = statement.lstrip().partition(" ")
+        statement = f"{head} /*+ MAX_EXECUTION_TIME({max(1, int(remaining * 1000))}) */ {tail}"
+    return statement, parameters
+
+
+def _deadline_error(context):
+    """Reports a statement aborted by the request deadline as DeadlineExceeded."""
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired() and not isinstance(context.original_exception, DeadlineExceeded):
+        return DeadlineExceeded("Request deadline exceeded during a database statement")
+    return None
+
+
+def create_db_engine(database_url: str, echo: bool = False) -> Engine:
+    """Creates an engine with connect args and pooling suited to the URL's backend.
+
+    Compiled SQL is cached in SQLAlchemy's bounded LRU (`DB_QUERY_CACHE_SIZE`
+    entries per engine); SQLite connections additionally keep up to
+    `DB_STATEMENT_CACHE_SIZE` prepared statements each.
+
+    - MySQL: SSL and strict SQL mode connect args with a pre-pinged `QueuePool`.
+    - In-memory SQLite: a `StaticPool`, so every session shares the single
+      connection that holds the database.
+    - File SQLite: a connection pool with WAL journaling, so readers do not block
+      on the writer, and a busy timeout instead of immediate lock errors.
+
+    Inside a request, every statement is limited to the time left before the
+    request's deadline and fails with `DeadlineExceeded` when it runs out.
+
+    Args:
+        database_url: The SQLAlchemy database URL.
+        echo: Whether to log every SQL statement.
+
+    Returns:
+        Engine: The configured engine.
+    """
+    url = make_url(database_url)
+    options = {
+        "echo": echo,
+        "future": True,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
     }
-)
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "cached_statements": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+        if _is_sqlite_memory(url):
+            engine = create_engine(url, poolclass=StaticPool, **options)
+        else:
+            options["connect_args"]["timeout"] = 30
+            engine = create_engine(url, pool_pre_ping=True, **options)
+            event.listen(engine, "connect", _sqlite_pragmas)
+        event.listen(engine, "before_cursor_execute", _interrupt_after_deadline)
+        event.listen(engine, "handle_error", _deadline_error)
+        return engine
+
+    if url.get_backend_name() == "mysql":
+        options["connect_args"] = dict(MYSQL_CONNECT_ARGS)
+    engine = create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        **options
+    )
+    if url.get_backend_name() == "mysql":
+        event.listen(engine, "before_cursor_execute", _mysql_execution_time_hint, retval=True)
+        event.listen(engine, "handle_error", _deadline_error)
+    return engine
+
+
+# SQLAlchemy database engine
+engine = create_db_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO)
 
 # Configure SQLAlchemy metadata with naming convention for constraints
 metadata = MetaData(
@@ -70,7 +176,7 @@ def get_db() -> Generator[Session, None, None]:
         logger.debug("Database session created")
         yield db
     except Exception as e:
-        logger.error(f"Database session error: {e}")
+        logger.error("Database session error: %s", e)
         db.rollback()
         raise
     finally:
@@ -92,35 +198,39 @@ def get_db_context():
         yield db
         db.commit()
     except Exception as e:
-        logger.error(f"Database context error: {e}")
+        logger.error("Database context error: %s", e)
         db.rollback()
         raise
     finally:
         logger.debug("Database context session closed")
         db.close()
 
-def init_database():
+def init_database(bind: Engine = engine, tables: Optional[list] = None):
     """
     Initialize the database by creating all tables.
 
+    Args:
+        bind (Engine): The engine of the database to initialize.
+        tables (Optional[list]): The tables to create; all models' tables if None.
+
     Raises:
         Exception: If database initialization fails
     """
     try:
         logger.info("Initializing database...")
 
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=bind, tables=tables)
 
         try:
-            inspector = inspect(engine)
+            inspector = inspect(bind)
             tables = inspector.get_table_names()
-            logger.info(f"Database initialized successfully. Tables created: {tables}")
+            logger.info("Database initialized successfully. Tables created: %s", tables)
         except Exception as inspect_error:
-            logger.warning(f"Could not inspect tables after creation: {inspect_error}")
+            logger.warning("Could not inspect tables after creation: %s", inspect_error)
             logger.info("Database initialized successfully (table inspection failed)")
 
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error("Failed to initialize database: %s", e)
         raise
 
 
@@ -137,5 +247,5 @@ def drop_database():
         Base.metadata.drop_all(bind=engine)
         logger.warning("All database tables dropped")
     except Exception as e:
-        logger.error(f"Failed to drop database tables: {e}")
+        logger.error("Failed to drop database tables: %s", e)
         raise
@@ -0,0 +1,171 @@
+"""Asynchronous Structured Logging.
+
+This module configures the root logger so that request-handling code never
+blocks on log I/O. Records pass through a `SamplingFilter` and are put on a
+bounded in-memory queue by a `QueueHandler`; a `QueueListener` thread renders
+them as JSON lines and writes them to stdout in batches, flushing whenever
+the queue drains.
+
+Log calls should use lazy `%`-style arguments (`logger.info("x=%s", x)`) so
+that disabled levels and sampled-out records cost nothing beyond a level check.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import IO, Optional
+
+from .settings import settings
+
+# Attributes present on every LogRecord; anything else came from `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects.
+
+    Fields passed through `extra=` are included as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a random fraction of DEBUG records and every record above DEBUG."""
+
+    def __init__(self, rate: float, rng: Optional[random.Random] = None):
+        super().__init__()
+        self.rate = rate
+        self.random = (rng or random.Random()).random
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full.
+
+    Only `%`-interpolation of the message happens on the calling thread, so
+    argument objects are not read later from another thread; JSON encoding,
+    traceback rendering and I/O are left to the listener.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class BatchedStreamHandler(logging.StreamHandler):
+    """Stream handler that buffers formatted lines and writes them in one call.
+
+    The buffer is written when it reaches `batch_size` lines or when `flush` is
+    called, which `BatchingQueueListener` does each time the queue drains.
+    """
+
+    def __init__(self, stream: Optional[IO[str]] = None, batch_size: int = 256):
+        super().__init__(stream)
+        self.batch_size = batch_size
+        self.buffer: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.buffer.append(self.format(record))
+            if len(self.buffer) >= self.batch_size:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            if getattr(self.stream, "closed", False):
+                self.buffer.clear()
+                return
+            if self.buffer:
+                self.stream.write("\n".join(self.buffer) + "\n")
+                self.buffer.clear()
+            if hasattr(self.stream, "flush"):
+                self.stream.flush()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes its handlers before waiting on an empty queue."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+    def stop(self) -> None:
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+def configure_logging(level: str = settings.LOG_LEVEL,
+                      debug_sample_rate: float = settings.LOG_DEBUG_SAMPLE_RATE,
+                      queue_size: int = settings.LOG_QUEUE_SIZE,
+                      batch_size: int = settings.LOG_BATCH_SIZE,
+                      stream: Optional[IO[str]] = None) -> BatchingQueueListener:
+    """Routes all logging through a background JSON writer thread.
+
+    Replaces any handlers on the root logger, so it should be called once at
+    startup. The listener is stopped (and its queue drained) at interpreter exit.
+
+    Args:
+        level: The root log level name.
+        debug_sample_rate: Fraction of DEBUG records to keep.
+        queue_size: Maximum records waiting to be written.
+        batch_size: Maximum lines written per flush.
+        stream: Where lines are written. Defaults to stdout.
+
+    Returns:
+        BatchingQueueListener: The started listener.
+    """
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(debug_sample_rate))
+
+    writer = BatchedStreamHandler(stream or sys.stdout, batch_size=batch_size)
+    writer.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper())
+
+    listener = BatchingQueueListener(log_queue, writer)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,59 @@
+"""Uvicorn Server Profiles.
+
+This module builds the keyword arguments passed to `uvicorn.run` for the
+configured `SERVER_PROFILE`. The production profile selects uvloop and
+httptools when they are installed, bounds concurrency and the listen backlog,
+tunes keep-alive, and replaces uvicorn's per-request access log with sampled
+structured access logs.
+"""
+import importlib.util
+from typing import Any
+
+from .settings import settings, Settings
+
+
+def _available(module: str) -> bool:
+    """Checks whether an optional module can be imported."""
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(profile: str | None = None, config: Settings = settings) -> dict[str, Any]:
+    """Returns uvicorn options for a server profile.
+
+    Args:
+        profile: "default" or "production". Defaults to `SERVER_PROFILE`.
+        config: The settings to read tuning values from.
+
+    Returns:
+        dict[str, Any]: Keyword arguments for `uvicorn.run`.
+
+    Raises:
+        ValueError: If the profile is unknown, or if it runs several workers
+            without a revocation store they share.
+    """
+    profile = profile or config.SERVER_PROFILE
+    options: dict[str, Any] = {"host": config.HOST, "port": config.PORT}
+    if profile == "default":
+        options.update(reload=config.DEBUG, log_level="info")
+        return options
+    if profile != "production":
+        raise ValueError(f"Unknown SERVER_PROFILE: {profile!r}")
+    if config.SERVER_WORKERS > 1 and config.REVOCATION_BACKEND != "database":
+        # A per-process revocation index would let a logged-out token through on the other workers
+        raise ValueError("SERVER_WORKERS > 1 requires REVOCATION_BACKEND=database")
+    options.update(
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        workers=config.SERVER_WORKERS,
+        limit_concurrency=config.SERVER_LIMIT_CONCURRENCY,
+        backlog=config.SERVER_BACKLOG,
+        timeout_keep_alive=config.SERVER_KEEPALIVE_TIMEOUT,
+        access_log=False,
+        log_level="warning",
+    )
+    return options
+
+
+def sampled_access_log_enabled(config: Settings = settings) -> bool:
+    """Whether the sampled structured access log replaces uvicorn's access log."""
+    return config.SERVER_PROFILE == "production" and config.ACCESS_LOG_SAMPLE_RATE > 0
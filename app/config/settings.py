@@ -3,9 +3,10 @@
 This module handles all application configuration using environment variables
 with proper validation and type checking using Pydantic settings.
 """
-import os
+from typing import Optional
+
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator, model_validator
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,14 +15,40 @@ class Settings(BaseSettings):
     """Application settings."""
 
     # Database Config
-    DB_HOST: str = os.getenv("DB_HOST")
-    DB_PORT: int = os.getenv("DB_PORT")
-    DB_NAME: str = os.getenv("DB_NAME")
-    DB_USER: str = os.getenv("DB_USER")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD")
+    DB_HOST: Optional[str] = Field(default=None, description="MySQL host, used when DATABASE_URL is empty")
+    DB_PORT: Optional[int] = Field(default=None, description="MySQL port, used when DATABASE_URL is empty")
+    DB_NAME: Optional[str] = Field(default=None, description="MySQL database, used when DATABASE_URL is empty")
+    DB_USER: Optional[str] = Field(default=None, description="MySQL user, used when DATABASE_URL is empty")
+    DB_PASSWORD: Optional[str] = Field(default=None, description="MySQL password, used when DATABASE_URL is empty")
 
-    DATABASE_URL: str = (
-        f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?ssl-mode=REQUIRED&ssl-verify-cert=false&charset=utf8mb4"
+    DATABASE_URL: str = Field(
+        default="",
+        description=(
+            "SQLAlchemy URL; empty builds a MySQL URL from DB_*, or e.g. sqlite:///app.db or sqlite:// (in-memory)"
+        )
+    )
+    DB_QUERY_CACHE_SIZE: int = Field(
+        default=500,
+        description="Compiled SQL statements kept in the engine's LRU cache"
+    )
+    DB_STATEMENT_CACHE_SIZE: int = Field(
+        default=256,
+        description="Prepared statements cached per connection by drivers that support it (SQLite)"
+    )
+    DB_SHARD_URLS: str = Field(
+        default="",
+        description=(
+            "Comma-separated SQLAlchemy URLs of the user shards, in a fixed order (only append); "
+            "empty keeps everything in DATABASE_URL. When set, DATABASE_URL holds the global email directory"
+        )
+    )
+    DIRECTORY_RECLAIM_SECONDS: int = Field(
+        default=300,
+        ge=1,
+        description=(
+            "Age after which a directory entry whose user never reached their shard is released to a new signup; "
+            "keep well above the longest signup"
+        )
     )
 
     # Security Config
@@ -32,9 +59,34 @@ class Settings(BaseSettings):
     )
     ALGORITHM: str = Field(default="HS256", description="JWT algorithm")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(
-        default=30,
+        default=15,
         description="JWT token expiration time in minutes"
     )
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = Field(
+        default=60 * 24 * 7,
+        description="Refresh token expiration time in minutes"
+    )
+    REVOCATION_BLOOM_CAPACITY: int = Field(
+        default=100_000,
+        description="Expected number of live token revocations, used to size the bloom filter"
+    )
+    REVOCATION_PRUNE_INTERVAL_SECONDS: int = Field(
+        default=300,
+        description="Seconds between sweeps that drop revocations of expired tokens"
+    )
+    REVOCATION_BACKEND: str = Field(
+        default="memory",
+        description="Token revocation store: 'memory' (single worker only) or 'database' (shared across workers)"
+    )
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = Field(
+        default=5,
+        description="Seconds between loads of revocations made by other workers, with the 'database' backend"
+    )
+    REVOCATION_SYNC_OVERLAP_SECONDS: int = Field(
+        default=60,
+        ge=1,
+        description="Seconds of revocation history each sync re-reads to catch transactions that committed late"
+    )
     BCRYPT_ROUNDS: int = Field(
         default=12,
         description="Bcrypt hashing rounds for password security"
@@ -48,11 +100,77 @@ class Settings(BaseSettings):
     )
     DEBUG: bool = Field(default=False, description="Debug mode")
 
+    # Server Config
+    SERVER_PROFILE: str = Field(
+        default="default",
+        description="Uvicorn profile: 'default' (development) or 'production' (tuned)"
+    )
+    SERVER_WORKERS: int = Field(default=1, description="Worker processes in the production profile")
+    SERVER_LIMIT_CONCURRENCY: int = Field(
+        default=1000,
+        description="Maximum concurrent connections per worker before new ones get 503"
+    )
+    SERVER_BACKLOG: int = Field(default=2048, description="Maximum pending connections in the listen queue")
+    SERVER_KEEPALIVE_TIMEOUT: int = Field(
+        default=30,
+        description="Seconds an idle HTTP/1.1 keep-alive connection is held open"
+    )
+    ACCESS_LOG_SAMPLE_RATE: float = Field(
+        default=0.01,
+        description="Fraction of requests logged as structured access logs in the production profile"
+    )
+
+    # Logging Config
+    LOG_LEVEL: str = Field(default="INFO", description="Root log level")
+    LOG_DEBUG_SAMPLE_RATE: float = Field(
+        default=0.01,
+        description="Fraction of DEBUG records kept; higher levels are never sampled"
+    )
+    LOG_QUEUE_SIZE: int = Field(
+        default=10000,
+        description="Maximum records waiting for the log writer thread; extra records are dropped"
+    )
+    LOG_BATCH_SIZE: int = Field(default=256, description="Maximum log lines written per flush")
+    SQL_ECHO: bool = Field(default=False, description="Log every SQL statement (very verbose)")
+
     # Cache Config
     CACHE_EXPIRE_MINUTES: int = Field(
         default=5,
         description="Cache expiration time in minutes"
     )
+    CACHE_STALE_GRACE_MINUTES: int = Field(
+        default=5,
+        description="Minutes past expiry a cached post list is still served while it refreshes in the background"
+    )
+    CACHE_REFRESH_AHEAD_SECONDS: int = Field(
+        default=0,
+        description="Refresh cached post lists read this many seconds before expiry (0 disables)"
+    )
+    CACHE_REFRESH_MAX_CONCURRENCY: int = Field(
+        default=4,
+        description="Maximum number of background cache refreshes running at once"
+    )
+    CACHE_PRUNE_INTERVAL_SECONDS: int = Field(
+        default=60,
+        ge=1,
+        description="Seconds between sweeps that drop cached post lists past their stale grace"
+    )
+    CACHE_SNAPSHOT_PATH: str = Field(
+        default="post_cache.snapshot",
+        description="Local file the hottest cached post lists are saved to and restored from (empty disables)"
+    )
+    CACHE_SNAPSHOT_INTERVAL_SECONDS: int = Field(
+        default=300,
+        description="Seconds between cache snapshots; one is also written at shutdown"
+    )
+    CACHE_SNAPSHOT_MAX_USERS: int = Field(
+        default=10000,
+        description="Most-read users whose cached post lists are included in a snapshot"
+    )
+    CACHE_SNAPSHOT_RESTORE_BATCH: int = Field(
+        default=500,
+        description="Users validated against the database per query when restoring a snapshot"
+    )
 
     # Payload Config
     MAX_PAYLOAD_SIZE_MB: int = Field(
@@ -60,6 +178,225 @@ class Settings(BaseSettings):
         description="Maximum payload size in megabytes"
     )
 
+    # Rate Limit Config
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="Enable per-user and per-IP rate limiting")
+    RATE_LIMIT_BACKEND: str = Field(
+        default="memory",
+        description="Token bucket store: 'memory' (per worker) or 'redis' (shared between workers)"
+    )
+    RATE_LIMIT_REDIS_URL: str = Field(default="redis://localhost:6379/0", description="Redis URL for the shared store")
+    RATE_LIMIT_SIGNUP: str = Field(default="5/minute", description="Signup limit per client IP")
+    RATE_LIMIT_LOGIN: str = Field(default="10/minute", description="Login limit per client IP")
+    RATE_LIMIT_REFRESH: str = Field(default="30/minute", description="Token refresh limit per client IP")
+    RATE_LIMIT_POSTS_WRITE: str = Field(default="60/minute", description="Post create/delete limit per user")
+    RATE_LIMIT_POSTS_READ: str = Field(default="300/minute", description="Post listing limit per user")
+    RATE_LIMIT_POSTS_STREAM: str = Field(
+        default="30/minute",
+        description="Post stream connects (SSE or long-poll) per user"
+    )
+    RATE_LIMIT_MAX_CONCURRENT: int = Field(
+        default=8,
+        description="Maximum in-flight post requests per user in one worker"
+    )
+    RATE_LIMIT_COMPACT_INTERVAL_SECONDS: int = Field(
+        default=60,
+        description="Seconds between sweeps that drop idle in-memory rate limit buckets"
+    )
+
+    # Load Shedding Config
+    LOAD_SHED_ENABLED: bool = Field(
+        default=True,
+        description="Reject low-priority requests with 503 while the event loop lags or requests pile up"
+    )
+    LOAD_MONITOR_INTERVAL_MS: int = Field(default=100, description="Milliseconds between event loop lag probes")
+    LOAD_SHED_LAG_MS: int = Field(
+        default=200,
+        description="Average event loop lag in milliseconds above which low-priority requests are shed"
+    )
+    LOAD_SHED_MAX_PENDING: int = Field(
+        default=200,
+        description="Requests awaiting a response above which low-priority requests are shed"
+    )
+    LOAD_SHED_LOW_PRIORITY: str = Field(
+        default="GET /api/v1/posts,GET /docs,GET /redoc,GET /openapi.json",
+        description="Comma-separated 'METHOD /path' rules of requests that may be shed, matched exactly"
+    )
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = Field(default=1, description="Retry-After sent with shed requests")
+
+    # Request Deadline Config
+    REQUEST_DEADLINE_MS: int = Field(
+        default=10000,
+        description=(
+            "Time budget per request in milliseconds; database statements are cut off when it runs out (0 disables)"
+        )
+    )
+    REQUEST_DEADLINE_ROUTES: str = Field(
+        default="GET /api/v1/posts/stream=0,GET /api/v1/posts=3000",
+        description="Comma-separated 'METHOD /path-prefix=milliseconds' budgets overriding the default; 0 disables"
+    )
+
+    # Serialization Config
+    FAST_SERIALIZATION: bool = Field(
+        default=True,
+        description="Serialize hot responses with TypeAdapter.dump_json, skipping response validation"
+    )
+
+    # Compression Config
+    COMPRESSION_ENABLED: bool = Field(
+        default=True,
+        description="Compress responses with gzip/brotli/zstd when the client accepts it"
+    )
+    COMPRESSION_MIN_SIZE: int = Field(
+        default=1024,
+        description="Minimum response body size in bytes worth compressing"
+    )
+    COMPRESSION_OFFLOAD_SIZE: int = Field(
+        default=64 * 1024,
+        description="Response bodies at least this many bytes are compressed in a worker thread"
+    )
+
+    # Post Ingestion Config
+    POST_WRITE_BEHIND: bool = Field(
+        default=False,
+        description="Queue new posts in-process and commit them in batches instead of per request"
+    )
+    POST_INGEST_QUEUE_SIZE: int = Field(
+        default=10000,
+        description="Maximum number of posts waiting to be flushed before producers are pushed back"
+    )
+    POST_INGEST_BATCH_SIZE: int = Field(
+        default=500,
+        description="Maximum number of posts committed in a single batch"
+    )
+    POST_INGEST_FLUSH_INTERVAL_MS: int = Field(
+        default=50,
+        description="Maximum time in milliseconds a queued post waits before its batch is flushed"
+    )
+    POST_INGEST_SPILL_PATH: str = Field(
+        default="post_ingest.spill",
+        description="Local file holding queued posts that could not be committed, replayed by the flusher"
+    )
+    POST_INGEST_DEAD_LETTER_PATH: str = Field(
+        default="post_ingest.dead",
+        description="Local file receiving queued posts the database rejected; these are never replayed"
+    )
+    POST_INGEST_REPLAY_INTERVAL_SECONDS: float = Field(
+        default=30,
+        gt=0,
+        description="How often the flusher retries the posts in the spill file"
+    )
+
+    # Idempotency Config
+    IDEMPOTENCY_BACKEND: str = Field(
+        default="memory",
+        description="Idempotency key store: 'memory' (per worker) or 'database' (shared across workers)"
+    )
+    IDEMPOTENCY_TTL_SECONDS: int = Field(
+        default=86400,
+        description="Seconds a completed response is replayed for retries with the same Idempotency-Key"
+    )
+    IDEMPOTENCY_LEASE_SECONDS: int = Field(
+        default=30,
+        description="Seconds an in-flight key is held before a retry may take it over; keep above the request deadline"
+    )
+    IDEMPOTENCY_MAX_KEYS: int = Field(default=100_000, description="Maximum idempotency keys held in memory")
+    IDEMPOTENCY_WAIT_SECONDS: float = Field(
+        default=10.0,
+        description="Seconds a duplicate request waits for the original to finish before getting 409"
+    )
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = Field(
+        default=300,
+        description="Seconds between sweeps that drop expired idempotency keys"
+    )
+
+    # Post Storage Config
+    POST_TEXT_COMPRESSION: bool = Field(
+        default=False,
+        description="Store post bodies as compressed binary; run `python -m app.utils.post_storage` after changing"
+    )
+    POST_TEXT_COMPRESSION_MIN_SIZE: int = Field(
+        default=4096,
+        description="Post bodies at least this many bytes are compressed when compression is on"
+    )
+    POST_TEXT_COMPRESSION_CODEC: str = Field(
+        default="zstd",
+        description="Codec for compressed post bodies: 'zstd' (falls back to zlib if not installed) or 'zlib'"
+    )
+
+    # Post Stream Config
+    POST_STREAM_QUEUE_SIZE: int = Field(
+        default=64,
+        description="Events a stream may fall behind before it is dropped"
+    )
+    POST_STREAM_BACKLOG: int = Field(default=64, ge=1, description="Recent events kept per user for resuming streams")
+    POST_STREAM_BACKLOG_USERS: int = Field(
+        default=10000,
+        ge=1,
+        description="Users whose event backlogs are kept, least recently active evicted first"
+    )
+    POST_STREAM_MAX_PER_USER: int = Field(default=4, description="Maximum open streams per user in one worker")
+    POST_STREAM_HEARTBEAT_SECONDS: int = Field(
+        default=15,
+        description="Seconds between keep-alive comments on an idle SSE stream"
+    )
+    POST_STREAM_POLL_TIMEOUT_SECONDS: int = Field(
+        default=25,
+        description="Maximum seconds a long-poll request waits for events"
+    )
+
+    # Post Purge Config
+    POST_PURGE_ENABLED: bool = Field(
+        default=True,
+        description="Run the background worker that hard-deletes soft-deleted posts"
+    )
+    POST_PURGE_BATCH_SIZE: int = Field(default=200, description="Soft-deleted posts hard-deleted per transaction")
+    POST_PURGE_BATCH_INTERVAL_MS: int = Field(
+        default=500,
+        description="Pause in milliseconds between purge batches, capping the purge rate"
+    )
+    POST_PURGE_IDLE_SECONDS: int = Field(
+        default=60,
+        description="Seconds the purge worker sleeps when nothing is due or outside its window"
+    )
+    POST_PURGE_GRACE_SECONDS: int = Field(
+        default=300,
+        description="Minimum age in seconds of a soft-deleted post before it is purged"
+    )
+    POST_PURGE_WINDOW: str = Field(
+        default="",
+        description="Local-time off-peak window for purging as 'HH:MM-HH:MM' (may wrap midnight); empty means always"
+    )
+
+    @field_validator("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD", mode="before")
+    @classmethod
+    def empty_as_unset(cls, value):
+        """Treats an empty DB_* value (as in `.env.example`) as unset."""
+        return None if value == "" else value
+
+    @model_validator(mode="after")
+    def build_database_url(self) -> "Settings":
+        """Builds the MySQL URL from DB_* when DATABASE_URL is empty.
+
+        Raises:
+            ValueError: If DATABASE_URL is empty and any DB_* connection field is missing.
+        """
+        if self.DATABASE_URL:
+            return self
+        missing = [
+            name for name in ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD")
+            if getattr(self, name) is None
+        ]
+        if missing:
+            raise ValueError(
+                "Set DATABASE_URL (e.g. sqlite:///app.db), or set DB_HOST, DB_PORT, DB_NAME, DB_USER and "
+                f"DB_PASSWORD for MySQL; missing: {', '.join(missing)}"
+            )
+        self.DATABASE_URL = (
+            f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+            "?ssl-mode=REQUIRED&ssl-verify-cert=false&charset=utf8mb4"
+        )
+        return self
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
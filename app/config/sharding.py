@@ -0,0 +1,169 @@
+"""Hash-based user sharding.
+
+Users, their posts and their post counters live on one of several shard
+databases (`DB_SHARD_URLS`), chosen from the user ID with a jump consistent
+hash. Every post query is scoped to one user, so it only ever touches that
+user's shard. The global database (`DATABASE_URL`) keeps the email directory,
+which assigns user IDs and resolves a login email to its user ID, and other
+tables that are not per-user data, such as idempotency keys.
+
+With no shard URLs configured, the global database is the only shard and
+nothing is routed: sessions come from `SessionLocal` as before and users are
+looked up by email directly.
+
+The jump hash only moves about 1/n of the users when an n-th shard is appended,
+so shard URLs must only ever be appended, never reordered or removed; users
+that move are copied with `python -m app.utils.resharding`.
+"""
+import logging
+from typing import Generator, Optional
+
+from fastapi import Depends
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config.database import Base, SessionLocal, create_db_engine, engine, init_database
+from app.config.settings import settings
+from app.models.post import Post
+from app.models.user import User
+from app.models.user_directory import UserDirectoryEntry  # noqa: F401 - registers the directory table
+from app.models.user_post_stats import UserPostStats
+from app.utils.auth import get_current_user
+
+logger = logging.getLogger(__name__)
+
+# Tables holding per-user data, created on every shard
+SHARD_TABLES = [User.__table__, Post.__table__, UserPostStats.__table__]
+
+
+def shard_index(user_id: int, shard_count: int) -> int:
+    """Maps a user ID to a shard with Lamping and Veach's jump consistent hash.
+
+    Args:
+        user_id (int): The user ID.
+        shard_count (int): The number of shards.
+
+    Returns:
+        int: The shard index, in `range(shard_count)`.
+    """
+    key = user_id & 0xFFFFFFFFFFFFFFFF
+    shard, candidate = -1, 0
+    while candidate < shard_count:
+        shard = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((shard + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return shard
+
+
+class ShardMap:
+    """The shard engines and session factories, routed by user ID."""
+
+    def __init__(self, engines: list[Engine], directory: Engine,
+                 sessions: Optional[list[sessionmaker]] = None,
+                 directory_session: Optional[sessionmaker] = None):
+        """Initializes the map.
+
+        Args:
+            engines (list[Engine]): The shard engines, in shard order.
+            directory (Engine): The engine of the global database.
+            sessions (Optional[list[sessionmaker]]): Session factories per shard; built from `engines` if None.
+            directory_session (Optional[sessionmaker]): Session factory of the global database.
+        """
+        if not engines:
+            raise ValueError("At least one shard is required")
+        self.engines = engines
+        self.directory = directory
+        self.sessions = sessions or [
+            sessionmaker(autocommit=False, autoflush=False, bind=shard, future=True) for shard in engines
+        ]
+        self.directory_session = directory_session or sessionmaker(
+            autocommit=False, autoflush=False, bind=directory, future=True
+        )
+
+    @classmethod
+    def from_urls(cls, shard_urls: list[str], directory_url: Optional[str] = None,
+                  echo: bool = False) -> "ShardMap":
+        """Builds a map with a new engine per URL.
+
+        Args:
+            shard_urls (list[str]): The shard database URLs, in shard order.
+            directory_url (Optional[str]): The global database URL; the first shard if None.
+            echo (bool): Whether the engines log every SQL statement.
+
+        Raises:
+            ValueError: If no shard URL is given or a URL is listed twice.
+        """
+        if len(set(shard_urls)) != len(shard_urls):
+            raise ValueError("Each shard URL may only be listed once")
+        engines = {url: create_db_engine(url, echo=echo) for url in shard_urls}
+        if directory_url is not None and directory_url not in engines:
+            engines[directory_url] = create_db_engine(directory_url, echo=echo)
+        directory = engines[directory_url if directory_url is not None else shard_urls[0]]
+        return cls([engines[url] for url in shard_urls], directory)
+
+    @classmethod
+    def from_settings(cls) -> "ShardMap":
+        """Builds the map configured by `DB_SHARD_URLS`, reusing the global engine where listed."""
+        urls = [url.strip() for url in settings.DB_SHARD_URLS.split(",") if url.strip()]
+        if not urls:
+            return cls([engine], engine, [SessionLocal], SessionLocal)
+        if len(set(urls)) != len(urls):
+            raise ValueError("Each shard URL may only be listed once in DB_SHARD_URLS")
+        engines = [
+            engine if url == settings.DATABASE_URL else create_db_engine(url, echo=settings.SQL_ECHO)
+            for url in urls
+        ]
+        return cls(engines, engine, directory_session=SessionLocal)
+
+    @property
+    def shard_count(self) -> int:
+        """int: The number of shards."""
+        return len(self.engines)
+
+    @property
+    def sharded(self) -> bool:
+        """bool: Whether users live apart from the global database, so the directory is in use."""
+        return self.shard_count > 1 or self.engines[0] is not self.directory
+
+    def shard_for(self, user_id: int) -> int:
+        """Returns the index of the shard holding a user's data."""
+        return shard_index(user_id, self.shard_count)
+
+    def engine_for(self, user_id: int) -> Engine:
+        """Returns the engine of the shard holding a user's data."""
+        return self.engines[self.shard_for(user_id)]
+
+    def session_for(self, user_id: int) -> Session:
+        """Opens a new session on the shard holding a user's data."""
+        return self.sessions[self.shard_for(user_id)]()
+
+    def init_schema(self) -> None:
+        """Creates the per-user tables on every shard and the other tables on the global database."""
+        shard_table_names = {table.name for table in SHARD_TABLES}
+        if self.directory not in self.engines:
+            init_database(self.directory, [
+                table for table in Base.metadata.sorted_tables if table.name not in shard_table_names
+            ])
+        for shard in self.engines:
+            init_database(shard, None if shard is self.directory else SHARD_TABLES)
+
+
+def get_user_db(user: dict = Depends(get_current_user)) -> Generator[Session, None, None]:
+    """
+    Database dependency for routes that only touch the authenticated user's data.
+
+    Yields:
+        Session: SQLAlchemy session on the user's shard
+    """
+    db = shard_map.session_for(int(user["user_id"]))
+    try:
+        yield db
+    except Exception as e:
+        logger.error("Database session error: %s", e)
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+shard_map = ShardMap.from_settings()
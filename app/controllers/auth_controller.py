@@ -1,21 +1,28 @@
 from typing import Any
 
+import anyio
 from fastapi import APIRouter, Depends, status, Request
 from sqlalchemy.orm import Session
 from ..schemas.user import UserCreate, UserLogin
+from ..schemas.token import TokenRefresh, TokenRevoke
 from ..services.auth_service import AuthService
 from ..config.database import get_db
+from ..config.settings import settings
+from ..middleware.rate_limit import ip_rate_limiter
+from ..utils.auth import get_current_user
 
 auth_router = APIRouter()
 
 @auth_router.post("/signup", status_code=status.HTTP_201_CREATED)
-async def signup(request: Request, user_in: UserCreate, db: Session = Depends(get_db)) -> dict[str, Any]:
+async def signup(request: Request, user_in: UserCreate, db: Session = Depends(get_db),
+                 _rate_limit: None = Depends(ip_rate_limiter("signup", settings.RATE_LIMIT_SIGNUP))) -> dict[str, Any]:
     """Registers a new user.
 
     Args:
         request (Request): Request object
         user_in (UserCreate): User signup data (email, password)
         db (Session): Database session
+        _rate_limit (None): Enforces the per-IP signup rate limit via dependency injection.
 
     Returns:
         dict: API response with token or error
@@ -30,26 +37,30 @@ async def signup(request: Request, user_in: UserCreate, db: Session = Depends(ge
     return {
         "status": "success",
         "data": {
-            "token": token        },
+            "token": token,
+            "refresh_token": AuthService.issue_refresh_token(user_data)
+        },
         "errors": None
     }
 
 @auth_router.post("/login", status_code=status.HTTP_200_OK)
-async def login(request: Request, user_in: UserLogin, db: Session = Depends(get_db)) -> dict[str, Any]:
+async def login(request: Request, user_in: UserLogin, db: Session = Depends(get_db),
+                _rate_limit: None = Depends(ip_rate_limiter("login", settings.RATE_LIMIT_LOGIN))) -> dict[str, Any]:
     """Authenticates a user and return a JWT access token.
 
     This endpoint verifies the user's email and password credentials.
-    If authentication is successful, it returns a JWT token and user details.
+    If authentication is successful, it returns a short-lived JWT access token and a refresh token.
     Otherwise, it returns an error message.
 
     Args:
         request (Request): The incoming HTTP request object.
         user_in (UserLogin): The login credentials (email and password) provided by the user.
         db (Session): The database session dependency.
+        _rate_limit (None): Enforces the per-IP login rate limit via dependency injection.
 
     Returns:
-        dict[str, Any]: A dictionary containing the authentication status, JWT token and user info
-        on success, or error details on failure.
+        dict[str, Any]: A dictionary containing the authentication status, JWT access and refresh
+        tokens on success, or error details on failure.
     """
     token, user_data, error = AuthService.login(db, user_in)
     if error:
@@ -61,7 +72,58 @@ async def login(request: Request, user_in: UserLogin, db: Session = Depends(get_
     return {
         "status": "success",
         "data": {
-            "token": token
+            "token": token,
+            "refresh_token": AuthService.issue_refresh_token(user_data)
         },
         "errors": None
     }
+
+@auth_router.post("/refresh", status_code=status.HTTP_200_OK)
+async def refresh(request: Request, token_in: TokenRefresh,
+                  _rate_limit: None = Depends(ip_rate_limiter("refresh", settings.RATE_LIMIT_REFRESH))
+                  ) -> dict[str, Any]:
+    """Issues a new access token in exchange for a refresh token.
+
+    No password is verified, so clients can keep access tokens short-lived without
+    paying for a bcrypt login each time they expire. The refresh token is rotated:
+    the presented one is revoked and a new one is returned.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        token_in (TokenRefresh): The refresh token.
+        _rate_limit (None): Enforces the per-IP refresh rate limit via dependency injection.
+
+    Returns:
+        dict[str, Any]: A dictionary with the new access and refresh tokens on success,
+        or error details on failure.
+    """
+    # Revocations may be written to the shared table, so they run off the event loop
+    token, refresh_token, error = await anyio.to_thread.run_sync(AuthService.refresh, token_in.refresh_token)
+    if error:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [error]
+        }
+    return {
+        "status": "success",
+        "data": {
+            "token": token,
+            "refresh_token": refresh_token
+        },
+        "errors": None
+    }
+
+@auth_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token_in: TokenRevoke, user: dict = Depends(get_current_user)) -> None:
+    """Revokes the caller's access token and, optionally, their refresh token.
+
+    Args:
+        token_in (TokenRevoke): The refresh token to revoke, if any.
+        user (dict): The authenticated user's information, injected by the dependency.
+
+    Returns:
+        None
+    """
+    await anyio.to_thread.run_sync(AuthService.logout, user, token_in.refresh_token)
+    return None
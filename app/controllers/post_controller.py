@@ -1,22 +1,80 @@
-from fastapi import APIRouter, Depends, status, Request
+import json
+
+from fastapi import APIRouter, Depends, Header, status, Request, Response, Query
 from fastapi import HTTPException
-from app.schemas.post import PostCreate
+from fastapi.responses import StreamingResponse
+from app.schemas.post import (
+    PostCreate, PostCreateResponse, PostListResponse, PostEventListResponse, PostStatsResponse,
+    post_created_adapter
+)
 from app.services.post_service import PostService
+from app.services.post_stats_service import PostStatsService
+from app.services.post_events import PostEvent, PostEventHub, Subscription, TooManySubscribers, post_event_hub
+from app.services.post_ingest import IngestQueueFull
+from app.services.idempotency_service import (
+    IdempotencyConflict, IdempotencyInProgress, StoredResponse, fingerprint, idempotency_store, lease_token
+)
+from app.config.settings import settings
 from app.utils.auth import get_current_user
 from app.middleware.payload_size import payload_size_limiter
-from app.config.database import get_db
-from typing import Any
+from app.middleware.rate_limit import user_rate_limiter
+from app.config.sharding import get_user_db
+from app.utils.compression import negotiate
+from typing import Any, AsyncIterator, Literal, Optional
 
 post_router = APIRouter()
 
-@post_router.post("/", status_code=status.HTTP_201_CREATED)
+
+def _json_body(body: bytes, response: Response, headers: dict[str, str] | None = None) -> Response:
+    """Wraps pre-serialized JSON in a Response, keeping headers and status set by dependencies.
+
+    Args:
+        body (bytes): The serialized JSON body.
+        response (Response): The injected response whose status and headers are carried over.
+        headers (dict[str, str] | None): Extra headers for this response.
+
+    Returns:
+        Response: The response to return from the route.
+    """
+    merged = dict(response.headers)
+    merged.update(headers or {})
+    return Response(content=body, status_code=response.status_code or status.HTTP_200_OK,
+                    media_type="application/json", headers=merged)
+
+
+def _create_post(response: Response, db, user_id: int, text: str) -> dict[str, Any]:
+    """Creates the post and returns the response envelope, setting 201 or 202 on `response`.
+
+    Raises:
+        HTTPException: 503 if the post is queued and the ingestion queue is full.
+    """
+    try:
+        post = PostService.add_post(db, user_id=user_id, text=text)
+    except IngestQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many posts in flight, please retry.",
+            headers={"Retry-After": "1"}
+        )
+    response.status_code = status.HTTP_202_ACCEPTED if settings.POST_WRITE_BEHIND else status.HTTP_201_CREATED
+    return {
+        "status": "success",
+        "data": {"id": post.get("post_id")},
+        "errors": None
+    }
+
+
+@post_router.post("/", status_code=status.HTTP_201_CREATED, response_model=PostCreateResponse)
 async def add_post(
     request: Request,
+    response: Response,
     post_in: PostCreate,
     user: dict = Depends(get_current_user),
-    db = Depends(get_db),
-    _: None = Depends(payload_size_limiter(1024 * 1024))
-) -> dict[str, Any]:
+    db = Depends(get_user_db),
+    _: None = Depends(payload_size_limiter(1024 * 1024)),
+    _rate_limit: None = Depends(user_rate_limiter("posts_write", settings.RATE_LIMIT_POSTS_WRITE)),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255)
+) -> Any:
     """Creates a new post for the authenticated user.
 
     This endpoint allows an authenticated user to create a new post.
@@ -27,33 +85,76 @@ async def add_post(
     - Validates the payload size to ensure it does not exceed the maximum allowed size (1MB).
     - Persists the new post to the database, associating it with the authenticated user's ID.
     - Returns a JSON response containing the new post's unique identifier upon success.
+    - When write-behind ingestion is enabled, queues the post and responds with 202 Accepted,
+      or 503 if the ingestion queue is full.
+    - With an `Idempotency-Key` header, a retry with the same key and text replays the first
+      response (marked `Idempotent-Replayed: true`) instead of creating another post; a retry
+      arriving while the first request is running waits for it. Reusing a key with different
+      text returns 422, and a retry still waiting after IDEMPOTENCY_WAIT_SECONDS returns 409.
     - Returns an error response if the authentication token is missing or invalid, or if any validation fails.
 
     Args:
         request (Request): The incoming HTTP request object.
+        response (Response): The outgoing response, used to signal 202 for queued posts.
         post_in (PostCreate): The Pydantic model containing the post data from the request body.
         user (dict): The authenticated user's information, injected by the dependency.
         db: The database session, injected by the dependency.
         _ (None): Used to enforce the payload size limit via dependency injection.
+        _rate_limit (None): Enforces the per-user write rate and concurrency limits.
+        idempotency_key (Optional[str]): Client-chosen key identifying retries of one request.
 
     Returns:
-        dict[str, Any]: A dictionary with the status, the new post's ID on success, and error details if applicable.
+        Any: A JSON body with the status, the new post's ID on success, and error details if applicable.
+        Serialized directly with `post_created_adapter` unless FAST_SERIALIZATION is disabled, in which
+        case the dictionary is returned and validated against `PostCreateResponse`.
 
     Raises:
-        HTTPException: If authentication fails or payload is invalid.
+        HTTPException: If authentication fails, payload is invalid, the user is rate limited,
+            the ingestion queue is full or the idempotency key conflicts.
     """
-    post = PostService.add_post(db, user_id=int(user["user_id"]), text=post_in.text)
-    return {
-        "status": "success",
-        "data": {"id": post.get("post_id")},
-        "errors": None
-    }
+    user_id = int(user["user_id"])
+    if not idempotency_key:
+        envelope = _create_post(response, db, user_id, post_in.text)
+        if settings.FAST_SERIALIZATION:
+            return _json_body(post_created_adapter.dump_json(envelope), response)
+        return envelope
 
-@post_router.get("/", status_code=status.HTTP_200_OK)
+    key = f"{user_id}:{idempotency_key}"
+    owner = lease_token()
+    try:
+        stored = await idempotency_store.begin(key, fingerprint(post_in.text.encode("utf-8")), owner)
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request."
+        )
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress.",
+            headers={"Retry-After": "1"}
+        )
+    if stored is not None:
+        response.status_code = stored.status_code
+        return _json_body(stored.body, response, {"Idempotent-Replayed": "true"})
+
+    try:
+        envelope = _create_post(response, db, user_id, post_in.text)
+        body = post_created_adapter.dump_json(envelope)
+        await idempotency_store.complete(key, StoredResponse(response.status_code, body), owner)
+    except BaseException:
+        await idempotency_store.release(key, owner)
+        raise
+    return _json_body(body, response)
+
+@post_router.get("/", status_code=status.HTTP_200_OK, response_model=PostListResponse)
 async def get_posts(
+    request: Request,
+    response: Response,
     user: dict = Depends(get_current_user),
-    db = Depends(get_db)
-) -> dict[str, Any]:
+    db = Depends(get_user_db),
+    _rate_limit: None = Depends(user_rate_limiter("posts_read", settings.RATE_LIMIT_POSTS_READ))
+) -> Response:
     """Retrieves all posts for the authenticated user.
 
     This endpoint allows an authenticated user to fetch all their posts.
@@ -62,37 +163,159 @@ async def get_posts(
 
     - Validates the user's authentication token and retrieves the user from the request context.
     - Fetches all posts associated with the authenticated user's ID from the database.
-    - Returns a JSON response containing the list of posts on success.
+    - Returns a JSON response containing the list of posts on success, compressed with the
+      best encoding the client accepts. Encoded bodies are cached with the posts; large
+      ones are rendered and compressed off the event loop.
     - Returns an error response if the authentication token is missing or invalid.
 
     Args:
+        request (Request): The incoming HTTP request object.
+        response (Response): The injected response carrying headers set by dependencies.
         user (dict): The authenticated user's information, injected by the dependency.
         db: The database session, injected by the dependency.
+        _rate_limit (None): Enforces the per-user read rate and concurrency limits.
 
     Returns:
-        dict[str, Any]: A dictionary with the status, a list of the user's posts on success,
+        Response: A JSON body with the status, a list of the user's posts on success,
         and error details if applicable.
 
     Raises:
-        HTTPException: If authentication fails.
+        HTTPException: If authentication fails or the user is rate limited.
+    """
+    encoding = negotiate(request.headers.get("accept-encoding")) if settings.COMPRESSION_ENABLED else None
+    body, encoding = await PostService.get_posts_body_async(db, user_id=int(user["user_id"]), encoding=encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return _json_body(body, response, headers)
+
+@post_router.get("/stats", status_code=status.HTTP_200_OK, response_model=PostStatsResponse)
+async def get_post_stats(
+    user: dict = Depends(get_current_user),
+    db = Depends(get_user_db),
+    _rate_limit: None = Depends(user_rate_limiter("posts_read", settings.RATE_LIMIT_POSTS_READ))
+) -> Any:
+    """Returns the authenticated user's post count, total text size and last post time.
+
+    The counters are maintained alongside every post write, so this is a single
+    primary-key lookup rather than a scan of the user's posts. Posts still queued
+    in write-behind mode are counted once they are committed.
+
+    Args:
+        user (dict): The authenticated user's information, injected by the dependency.
+        db: The database session, injected by the dependency.
+        _rate_limit (None): Enforces the per-user read rate and concurrency limits.
+
+    Returns:
+        Any: A JSON body with the status, the counters and error details if applicable.
+
+    Raises:
+        HTTPException: If authentication fails or the user is rate limited.
     """
-    posts = PostService.get_posts(db, user_id=int(user["user_id"]))
     return {
         "status": "success",
-        "data": posts,
+        "data": PostStatsService.get_stats(db, user_id=int(user["user_id"])),
         "errors": None
     }
 
+
+def _sse_message(event: PostEvent) -> bytes:
+    """Formats a post event as a Server-Sent Events message."""
+    data = json.dumps(event.data, separators=(",", ":"))
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n".encode()
+
+
+async def _event_stream(sub: Subscription, hub: PostEventHub) -> AsyncIterator[bytes]:
+    """Yields SSE messages for a subscription until the client disconnects or is dropped.
+
+    Idle streams get a keep-alive comment every POST_STREAM_HEARTBEAT_SECONDS so
+    proxies do not close them. A dropped (too slow) subscriber's stream ends once
+    its queue is drained; the client reconnects with Last-Event-ID.
+    """
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            event = await sub.next(settings.POST_STREAM_HEARTBEAT_SECONDS)
+            if event is not None:
+                yield _sse_message(event)
+            elif sub.dropped:
+                return
+            else:
+                yield b": keep-alive\n\n"
+    finally:
+        hub.unsubscribe(sub)
+
+
+@post_router.get("/stream", status_code=status.HTTP_200_OK, response_model=PostEventListResponse)
+async def stream_posts(
+    request: Request,
+    user: dict = Depends(get_current_user),
+    mode: Literal["sse", "poll"] = Query(default="sse", description="`sse` stream or `poll` long-poll fallback"),
+    since: Optional[int] = Query(default=None, description="Last event ID received; events after it are replayed"),
+    timeout: int = Query(default=settings.POST_STREAM_POLL_TIMEOUT_SECONDS, ge=0,
+                         le=settings.POST_STREAM_POLL_TIMEOUT_SECONDS, description="Long-poll wait in seconds"),
+    _rate_limit: None = Depends(user_rate_limiter("posts_stream", settings.RATE_LIMIT_POSTS_STREAM,
+                                                  max_concurrent=None))
+) -> Any:
+    """Streams changes to the authenticated user's posts instead of polling the listing.
+
+    In `sse` mode the response is a `text/event-stream` of `post_created` and
+    `post_deleted` events, each with an `id`. In `poll` mode the request waits up to
+    `timeout` seconds and returns the events that arrived, or an empty list.
+
+    Clients resume by passing the last event ID they saw, as `since` or, for SSE, the
+    `Last-Event-ID` header; missed events are replayed from a short backlog. If they
+    are no longer available a single `resync` event is sent, after which the client
+    should refetch `GET /api/v1/posts/`.
+
+    Args:
+        request (Request): The incoming HTTP request object.
+        user (dict): The authenticated user's information, injected by the dependency.
+        mode (str): `sse` or `poll`.
+        since (Optional[int]): The last event ID the client received.
+        timeout (int): Maximum seconds a long-poll request waits.
+        _rate_limit (None): Enforces the per-user connect rate.
+
+    Returns:
+        Any: A StreamingResponse in `sse` mode, otherwise a JSON body with the events.
+
+    Raises:
+        HTTPException: If authentication fails, the user is rate limited or already
+            has too many open streams.
+    """
+    user_id = int(user["user_id"])
+    last_event_id = request.headers.get("last-event-id")
+    if mode == "sse" and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    try:
+        if mode == "poll":
+            events = await post_event_hub.wait(user_id, since, timeout)
+            return {"status": "success", "data": [event._asdict() for event in events], "errors": None}
+        sub = post_event_hub.subscribe(user_id, since)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open streams.",
+            headers={"Retry-After": "5"}
+        )
+    return StreamingResponse(
+        _event_stream(sub, post_event_hub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @post_router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(
     post_id: str,
     user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_user_db),
+    _rate_limit: None = Depends(user_rate_limiter("posts_write", settings.RATE_LIMIT_POSTS_WRITE))
 ) -> None:
     """Deletes a post for the authenticated user.
 
     This endpoint accepts a postID and a token for authentication.
-    It deletes the corresponding post from the database if it belongs to the authenticated user.
+    It deletes the corresponding post if it belongs to the authenticated user. The post is
+    tombstoned and hidden at once; its row is removed later by the background purge worker.
     Returns an error for invalid or missing token, or if the post does not exist or does not belong to the user.
     DI is used for token authentication.
 
@@ -100,6 +323,7 @@ async def delete_post(
         post_id (str): The unique ID of the post to delete.
         user (dict): The authenticated user's information, injected by the dependency.
         db: The database session, injected by the dependency.
+        _rate_limit (None): Enforces the per-user write rate and concurrency limits.
 
     Returns:
         None
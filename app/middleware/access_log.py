@@ -0,0 +1,59 @@
+import logging
+import random
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+
+access_logger = logging.getLogger("app.access")
+
+
+class SampledAccessLogMiddleware:
+    """Logs a sample of requests as structured records.
+
+    Replaces uvicorn's per-request access log in the production profile, where a
+    formatted line for every request costs measurable throughput. A fraction
+    `sample_rate` of requests is logged; server errors (5xx) are always logged.
+    Request fields are attached as `extra` so `JsonFormatter` emits them as keys.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = settings.ACCESS_LOG_SAMPLE_RATE,
+                 rng: random.Random | None = None):
+        """Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            sample_rate: Fraction of requests to log, between 0 and 1.
+            rng: Random source, injectable for tests.
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.random = (rng or random.Random()).random
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status >= 500 or self.random() < self.sample_rate:
+                client = scope.get("client")
+                access_logger.info("%s %s %d", scope["method"], scope["path"], status, extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "client": client[0] if client else None,
+                    "sample_rate": self.sample_rate,
+                })
@@ -0,0 +1,75 @@
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+from app.utils.compression import compress, is_compressible, negotiate
+
+
+class CompressionMiddleware:
+    """Compresses response bodies with the best encoding the client accepts.
+
+    Only single-message bodies of a compressible content type and at least
+    `minimum_size` bytes are compressed; streamed responses and responses that
+    already carry a Content-Encoding (e.g. precompressed cache entries) pass
+    through untouched. Bodies of `offload_size` bytes or more are compressed in
+    a worker thread so the event loop is not blocked.
+    """
+
+    def __init__(self, app: ASGIApp,
+                 minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+                 offload_size: int = settings.COMPRESSION_OFFLOAD_SIZE):
+        """Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size: Bodies smaller than this are sent uncompressed.
+            offload_size: Bodies at least this large are compressed off the event loop.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (message.get("more_body", False)
+                    or "content-encoding" in headers
+                    or len(body) < self.minimum_size
+                    or not is_compressible(headers.get("content-type"))):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= self.offload_size:
+                body = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,107 @@
+import json
+from typing import Optional
+
+import anyio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+from app.utils.deadline import Deadline, deadline_scope, parse_budgets
+
+
+class DeadlineMiddleware:
+    """Runs each request under a time budget and cancels it when the client disconnects.
+
+    The budget comes from the longest matching `METHOD /path-prefix=milliseconds`
+    rule, or `default_ms`; 0 means no deadline, which is how long-lived streams
+    opt out. While the request runs its `Deadline` is current, so database
+    statements are cut off when it expires (see `app.config.database`).
+
+    A watcher reads the request from the server on the app's behalf, one message
+    ahead, so it sees the client disconnect. A disconnect cancels the deadline,
+    so no further statements run, and cancels the handler at its next await. A
+    handler still awaiting when the budget runs out is cancelled the same way and
+    answered with 504 if no response was started. Blocking work already running
+    on the event loop cannot be interrupted, only its database statements.
+    """
+
+    def __init__(self, app: ASGIApp, default_ms: int = settings.REQUEST_DEADLINE_MS,
+                 routes: str = settings.REQUEST_DEADLINE_ROUTES):
+        """Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            default_ms: Budget in milliseconds for requests no rule matches (0 disables).
+            routes: Comma-separated `METHOD /path-prefix=milliseconds` rules.
+        """
+        self.app = app
+        self.default_ms = default_ms
+        self.routes = parse_budgets(routes)
+        self.timeout_body = json.dumps({
+            "detail": "Request deadline exceeded.",
+            "error": "Gateway timeout"
+        }).encode()
+
+    def budget_ms(self, method: str, path: str) -> int:
+        """Returns the budget of a request in milliseconds; 0 means none."""
+        for rule_method, prefix, budget in self.routes:
+            if method == rule_method and path.startswith(prefix):
+                return budget
+        return self.default_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = self.budget_ms(scope["method"], scope["path"])
+        if not budget:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(budget / 1000)
+        # The watcher reads from the server and hands messages to the app one at a time
+        body_in, body_out = anyio.create_memory_object_stream(1)
+        disconnected = False
+        response_started = False
+
+        async def watch_disconnect(app_scope: anyio.CancelScope) -> None:
+            nonlocal disconnected
+            async with body_in:
+                while True:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        break
+                    await body_in.send(message)
+            disconnected = True
+            deadline.cancel()
+            app_scope.cancel()
+
+        async def app_receive() -> Message:
+            try:
+                return await body_out.receive()
+            except anyio.EndOfStream:
+                return {"type": "http.disconnect"}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        error: Optional[Exception] = None
+        with deadline_scope(deadline), body_out:
+            async with anyio.create_task_group() as tg:
+                with anyio.CancelScope(deadline=anyio.current_time() + budget / 1000) as app_scope:
+                    tg.start_soon(watch_disconnect, app_scope)
+                    try:
+                        await self.app(scope, app_receive, send_wrapper)
+                    except Exception as e:
+                        # Re-raised outside the task group so it is not wrapped in an ExceptionGroup
+                        error = e
+                tg.cancel_scope.cancel()
+        if error is not None:
+            raise error
+        if app_scope.cancelled_caught and not response_started and not disconnected:
+            await send({"type": "http.response.start", "status": 504,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(self.timeout_body)).encode())]})
+            await send({"type": "http.response.body", "body": self.timeout_body})
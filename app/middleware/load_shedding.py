@@ -0,0 +1,93 @@
+import json
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+from app.utils.load_monitor import LoadMonitor, load_monitor
+
+
+def parse_routes(spec: str) -> tuple[tuple[str, str], ...]:
+    """Parses a comma-separated list of `METHOD /path` rules.
+
+    Paths are stored without a trailing slash, so `/api/v1/posts` and
+    `/api/v1/posts/` name the same route.
+
+    Raises:
+        ValueError: If a rule is not a method followed by a path starting with '/'.
+    """
+    rules = []
+    for rule in filter(None, (part.strip() for part in spec.split(","))):
+        method, _, path = rule.partition(" ")
+        path = path.strip()
+        if not method or not path.startswith("/"):
+            raise ValueError(f"Invalid load shedding rule {rule!r}, expected 'METHOD /path'")
+        rules.append((method.upper(), path.rstrip("/") or "/"))
+    return tuple(rules)
+
+
+class LoadSheddingMiddleware:
+    """Rejects low-priority requests with a fast 503 while the worker is overloaded.
+
+    Requests whose method and exact path match one of the low-priority
+    `METHOD /path` rules (by default docs and the post listing, but not the
+    stats or stream routes below it) are answered with 503 and `Retry-After`
+    before reaching any handler when `LoadMonitor.should_shed()` is true. All
+    other requests, such as login and writes, are always served. Every request
+    is counted as pending until its response starts, which is the queue depth
+    the monitor sheds on; long-lived streams stop counting once their headers
+    are sent.
+    """
+
+    def __init__(self, app: ASGIApp, monitor: LoadMonitor = load_monitor,
+                 low_priority: str = settings.LOAD_SHED_LOW_PRIORITY,
+                 retry_after_seconds: int = settings.LOAD_SHED_RETRY_AFTER_SECONDS):
+        """Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            monitor: The load monitor deciding when to shed.
+            low_priority: Comma-separated `METHOD /path` rules of sheddable requests.
+            retry_after_seconds: Value of the `Retry-After` header on rejected requests.
+        """
+        self.app = app
+        self.monitor = monitor
+        self.low_priority = frozenset(parse_routes(low_priority))
+        self.body = json.dumps({
+            "detail": "Server is busy, please retry.",
+            "error": "Service unavailable"
+        }).encode()
+        self.headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(self.body)).encode()),
+            (b"retry-after", str(retry_after_seconds).encode()),
+        ]
+
+    def _is_low_priority(self, scope: Scope) -> bool:
+        return (scope["method"], scope["path"].rstrip("/") or "/") in self.low_priority
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        monitor = self.monitor
+        if monitor.should_shed() and self._is_low_priority(scope):
+            monitor.request_shed()
+            await send({"type": "http.response.start", "status": 503, "headers": self.headers})
+            await send({"type": "http.response.body", "body": self.body})
+            return
+
+        monitor.request_started()
+        answered = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal answered
+            if message["type"] == "http.response.start" and not answered:
+                answered = True
+                monitor.request_answered()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not answered:
+                monitor.request_answered()
@@ -0,0 +1,93 @@
+from typing import AsyncIterator, Optional
+
+import anyio
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.config.settings import settings
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import RateLimit, concurrency_limiter, rate_limit_store, retry_after_header
+
+
+async def _check(key: str, limit: RateLimit, response: Response) -> None:
+    """Takes a token for `key`, setting rate limit headers or raising 429.
+
+    A store that does network I/O is called from a worker thread so the event
+    loop is not held up by the round trip.
+    """
+    if rate_limit_store.blocking:
+        result = await anyio.to_thread.run_sync(rate_limit_store.acquire, key, limit)
+    else:
+        result = rate_limit_store.acquire(key, limit)
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = retry_after_header(result.retry_after)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please retry later.",
+            headers=headers
+        )
+    response.headers.update(headers)
+
+
+def ip_rate_limiter(scope: str, limit: str):
+    """Returns a dependency that rate limits requests per client IP.
+
+    Used for unauthenticated routes such as login and signup.
+
+    Args:
+        scope: Name distinguishing this route's buckets from others.
+        limit: Limit spec such as `"10/minute"`.
+
+    Returns:
+        A dependency that raises a 429 error when the client IP exceeds the limit.
+    """
+    parsed = RateLimit.parse(limit)
+
+    async def dependency(request: Request, response: Response):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        client = request.client.host if request.client else "unknown"
+        await _check(f"{scope}:{client}", parsed, response)
+    return dependency
+
+
+def user_rate_limiter(scope: str, limit: str, max_concurrent: Optional[int] = settings.RATE_LIMIT_MAX_CONCURRENT):
+    """Returns a dependency that rate limits and concurrency limits requests per user.
+
+    The user comes from `get_current_user`, which FastAPI resolves once per request
+    and shares with the route handler.
+
+    Args:
+        scope: Name distinguishing this route's buckets from others.
+        limit: Limit spec such as `"60/minute"`.
+        max_concurrent: Maximum in-flight requests per user across routes using this limiter,
+            or None for long-lived routes (streams) that should not hold a slot.
+
+    Returns:
+        A dependency that raises a 429 error when the user exceeds either limit.
+    """
+    parsed = RateLimit.parse(limit)
+
+    async def dependency(response: Response, user: dict = Depends(get_current_user)) -> AsyncIterator[None]:
+        if not settings.RATE_LIMIT_ENABLED:
+            yield
+            return
+        user_key = str(user["user_id"])
+        await _check(f"{scope}:{user_key}", parsed, response)
+        if max_concurrent is None:
+            yield
+            return
+        if not concurrency_limiter.try_acquire(user_key, max_concurrent):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many concurrent requests.",
+                headers={"Retry-After": "1"}
+            )
+        try:
+            yield
+        finally:
+            concurrency_limiter.release(user_key)
+    return dependency
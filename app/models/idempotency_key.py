@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from app.config.database import Base
+
+class IdempotencyKey(Base):
+    """
+    SQLAlchemy model for an idempotency key shared across workers.
+
+    A row with no `status_code` marks a request still in flight; once it completes
+    the response is stored so retries with the same key can replay it. Only the
+    request whose `owner` token holds the key may store that response or release it.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(320), primary_key=True, doc="User ID and client-supplied Idempotency-Key")
+    fingerprint = Column(String(64), nullable=False, doc="SHA-256 of the request payload")
+    owner = Column(String(32), nullable=True, doc="Lease token of the request that claimed the key")
+    status_code = Column(Integer, nullable=True, doc="Response status, NULL while in flight")
+    body = Column(LargeBinary, nullable=True, doc="Response body")
+    expires_at = Column(DateTime, nullable=False, index=True, doc="When the key may be reused")
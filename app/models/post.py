@@ -1,7 +1,9 @@
 import uuid
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from app.config.database import Base
+from app.config.settings import settings
+from app.models.types import CompressedText, PlainText
 import datetime
 try:
     from datetime import UTC
@@ -9,6 +11,11 @@ except ImportError:
     from datetime import timezone
     UTC = timezone.utc
 
+def _text_size(context) -> int:
+    """UTF-8 size of the post text being inserted, the figure `total_bytes` counts."""
+    return len(context.get_current_parameters()["text"].encode("utf-8"))
+
+
 class Post(Base):
     """
     SQLAlchemy model for post entity.
@@ -17,6 +24,11 @@ class Post(Base):
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True, doc="Post UUID")
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True, doc="User ID")
-    text = Column(Text, nullable=False, doc="Post text, max 1MB")
+    text = Column(CompressedText() if settings.POST_TEXT_COMPRESSION else PlainText(), nullable=False,
+                  doc="Post text, max 1MB; compressed at rest when POST_TEXT_COMPRESSION is on")
+    text_size = Column(Integer, nullable=False, default=_text_size,
+                       doc="UTF-8 size of the text in bytes, so deletes can adjust counters without reading it")
     created_at = Column(DateTime, default=lambda: datetime.datetime.now(UTC), nullable=False,
                         doc="Post creation timestamp")
+    deleted_at = Column(DateTime, nullable=True, index=True,
+                        doc="Soft-delete tombstone; set posts are hidden and hard-deleted later by the purge worker")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+from app.config.database import Base
+
+class RevokedToken(Base):
+    """
+    SQLAlchemy model for a revoked JWT shared across workers.
+
+    Workers load the revocations made since their last sync by `revoked_at`, the
+    database clock at insert time. Transactions can commit out of that order, so
+    each sync re-reads a trailing overlap window. Rows are deleted once the token
+    would have expired.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, doc="Row ID, breaks ties between equal revoked_at")
+    jti = Column(String(64), unique=True, nullable=False, index=True, doc="The token's `jti` claim")
+    expires_at = Column(Integer, nullable=False, index=True, doc="The token's `exp` claim, in epoch seconds")
+    revoked_at = Column(DateTime, nullable=False, server_default=func.now(), index=True,
+                        doc="Database time of the revocation; the sync cursor")
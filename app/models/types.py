@@ -0,0 +1,130 @@
+"""Custom SQLAlchemy column types.
+
+`CompressedText` stores strings as binary with a one-byte codec marker, so
+large post bodies take less space in the buffer pool, binlog and on the wire.
+Bodies below a size threshold, or that do not shrink, are stored raw behind the
+`RAW` marker. `PlainText` is the uncompressed counterpart; it writes plain
+strings but also reads binary values, so the column can be switched to binary
+before compression is enabled (and back after it is disabled) without a window
+where rows cannot be read.
+"""
+import zlib
+from typing import Optional
+
+from sqlalchemy import LargeBinary, Text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+from app.config.settings import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec marker bytes prefixed to stored values. None of them can start valid UTF-8,
+# so a legacy plain-text row (which may begin with any character, even U+0000) is
+# never mistaken for an encoded one.
+RAW = 0xFD
+ZLIB = 0xFE
+ZSTD = 0xFF
+MARKERS = (RAW, ZLIB, ZSTD)
+
+
+def encode_text(text: str, min_size: int, codec: str) -> bytes:
+    """Encodes a string for storage, compressing it when that pays off.
+
+    Args:
+        text: The string to store.
+        min_size: Encoded bodies smaller than this are stored raw.
+        codec: "zstd" or "zlib". zstd falls back to zlib when `zstandard` is not installed.
+
+    Returns:
+        bytes: The marker byte followed by the raw or compressed UTF-8 body.
+    """
+    raw = text.encode("utf-8")
+    if len(raw) >= min_size:
+        if codec == "zstd" and zstandard is not None:
+            packed = bytes((ZSTD,)) + zstandard.ZstdCompressor(level=3).compress(raw)
+        else:
+            packed = bytes((ZLIB,)) + zlib.compress(raw, 6)
+        if len(packed) < len(raw) + 1:
+            return packed
+    return bytes((RAW,)) + raw
+
+
+def decode_text(value: bytes) -> str:
+    """Decodes a stored value produced by `encode_text`.
+
+    Values without a known marker are rows written before compression was enabled
+    and not yet backfilled, and are decoded as plain UTF-8; the markers are bytes
+    that valid UTF-8 never starts with, so the two cannot be confused.
+
+    Raises:
+        RuntimeError: If the value is zstd-compressed and `zstandard` is not installed.
+    """
+    if isinstance(value, str):
+        return value
+    marker = value[0] if value else None
+    if marker == RAW:
+        return value[1:].decode("utf-8")
+    if marker == ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    if marker == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed post found but `zstandard` is not installed")
+        return zstandard.ZstdDecompressor().decompress(value[1:]).decode("utf-8")
+    return value.decode("utf-8")
+
+
+class PlainText(TypeDecorator):
+    """Text stored uncompressed, read back from either a text or a binary column.
+
+    Values that come back as bytes (the column was already altered to `LONGBLOB`,
+    or still holds rows written with compression on) are decoded with `decode_text`.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return decode_text(value)
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as `LONGBLOB` (MySQL) / `BLOB`, compressed above a size threshold.
+
+    Values are compressed on write and decompressed as rows are read, so the ORM
+    and queries selecting the column still see plain strings. The column cannot be
+    searched or compared with SQL string operators.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, min_size: int = settings.POST_TEXT_COMPRESSION_MIN_SIZE,
+                 codec: str = settings.POST_TEXT_COMPRESSION_CODEC):
+        """Initializes the type.
+
+        Args:
+            min_size: Bodies smaller than this many bytes are stored uncompressed.
+            codec: "zstd" or "zlib".
+        """
+        super().__init__()
+        self.min_size = min_size
+        self.codec = codec
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return encode_text(value, self.min_size, self.codec)
+
+    def process_result_value(self, value: Optional[bytes], dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return decode_text(value)
@@ -0,0 +1,21 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+from app.config.database import Base
+
+class UserDirectoryEntry(Base):
+    """
+    SQLAlchemy model for the global email directory used when users are sharded.
+
+    Lives in the global database (`DATABASE_URL`), not on a shard. It assigns
+    user IDs, so they stay unique across shards, and maps a login email to the
+    user ID that selects the user's shard. An entry is committed before the
+    user's shard insert, so one whose user never arrived is reclaimed by a later
+    signup once it is older than `DIRECTORY_RECLAIM_SECONDS`.
+    """
+    __tablename__ = "user_directory"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=True, doc="Globally unique user ID")
+    email = Column(String(255), unique=True, nullable=False, index=True, doc="User's email address")
+    registered_at = Column(DateTime, nullable=False, default=datetime.datetime.now,
+                           doc="When the entry was reserved; an orphan is only reclaimed once it is old")
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer
+from app.config.database import Base
+
+class UserPostStats(Base):
+    """
+    SQLAlchemy model for a user's post counters.
+
+    Maintained in the same transaction as every post insert and delete, so reads
+    are a single primary-key lookup instead of aggregating the posts table.
+    """
+    __tablename__ = "user_post_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, doc="User ID")
+    post_count = Column(Integer, nullable=False, default=0, doc="Number of posts")
+    total_bytes = Column(BigInteger, nullable=False, default=0, doc="Total UTF-8 size of the post texts")
+    last_post_at = Column(DateTime, nullable=True, doc="Creation time of the newest post")
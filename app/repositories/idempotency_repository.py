@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.idempotency_key import IdempotencyKey
+
+_get_key = select(IdempotencyKey).where(IdempotencyKey.key == bindparam("scoped_key"))
+_complete_key = (
+    update(IdempotencyKey)
+    .where(IdempotencyKey.key == bindparam("scoped_key"), IdempotencyKey.owner == bindparam("lease_owner"))
+    .values(status_code=bindparam("status_code"), body=bindparam("body"), expires_at=bindparam("keep_until"))
+    .execution_options(synchronize_session=False)
+)
+_take_over_key = (
+    update(IdempotencyKey)
+    .where(IdempotencyKey.key == bindparam("scoped_key"), IdempotencyKey.expires_at <= bindparam("now"))
+    .values(fingerprint=bindparam("new_fingerprint"), owner=bindparam("lease_owner"), status_code=None, body=None,
+            expires_at=bindparam("lease_until"))
+    .execution_options(synchronize_session=False)
+)
+_delete_key = (
+    delete(IdempotencyKey)
+    .where(IdempotencyKey.key == bindparam("scoped_key"), IdempotencyKey.owner == bindparam("lease_owner"))
+    .execution_options(synchronize_session=False)
+)
+_expired_keys = (
+    select(IdempotencyKey.key)
+    .where(IdempotencyKey.expires_at < bindparam("now"))
+    .limit(bindparam("limit"))
+)
+
+
+class IdempotencyRepository:
+    """Provides database operations on shared idempotency keys."""
+
+    @staticmethod
+    def claim(db: Session, key: str, fingerprint: str, owner: str, expires_at: datetime) -> bool:
+        """Inserts an in-flight row for a key, relying on the primary key to reject duplicates.
+
+        Args:
+            db (Session): The database session used for the insert.
+            key (str): The scoped idempotency key.
+            fingerprint (str): The request payload fingerprint.
+            owner (str): The claiming request's lease token.
+            expires_at (datetime): When the claim's lease runs out.
+
+        Returns:
+            bool: True if this call claimed the key, False if a row already exists.
+        """
+        db.add(IdempotencyKey(key=key, fingerprint=fingerprint, owner=owner, expires_at=expires_at))
+        try:
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    @staticmethod
+    def take_over(db: Session, key: str, fingerprint: str, owner: str, now: datetime, expires_at: datetime) -> bool:
+        """Reclaims a key whose lease or TTL has run out, as one conditional UPDATE.
+
+        Args:
+            db (Session): The database session used for the update.
+            key (str): The scoped idempotency key.
+            fingerprint (str): The new request's payload fingerprint.
+            owner (str): The new request's lease token.
+            now (datetime): The current time; only rows expired by then are taken over.
+            expires_at (datetime): When the new claim's lease runs out.
+
+        Returns:
+            bool: True if this call took the key over, False if another request got it first.
+        """
+        result = db.execute(_take_over_key, {
+            "scoped_key": key, "new_fingerprint": fingerprint, "lease_owner": owner, "now": now,
+            "lease_until": expires_at
+        })
+        db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    def get(db: Session, key: str) -> Optional[IdempotencyKey]:
+        """Retrieves a key's row, bypassing the session's identity map.
+
+        Args:
+            db (Session): The database session used for querying.
+            key (str): The scoped idempotency key.
+
+        Returns:
+            Optional[IdempotencyKey]: The row, or None if it does not exist.
+        """
+        return db.scalars(_get_key.execution_options(populate_existing=True), {"scoped_key": key}).first()
+
+    @staticmethod
+    def complete(db: Session, key: str, owner: str, status_code: int, body: bytes, expires_at: datetime) -> bool:
+        """Stores the response of a completed request and extends the key to its full TTL.
+
+        The update only applies while `owner` still holds the key, so a request whose
+        lease ran out and was taken over cannot overwrite the new owner's row.
+
+        Args:
+            db (Session): The database session used for the update.
+            key (str): The scoped idempotency key.
+            owner (str): The completing request's lease token.
+            status_code (int): The response status.
+            body (bytes): The response body.
+            expires_at (datetime): When the stored response expires.
+
+        Returns:
+            bool: True if the response was stored, False if the key has another owner.
+        """
+        result = db.execute(_complete_key, {"scoped_key": key, "lease_owner": owner, "status_code": status_code,
+                                            "body": body, "keep_until": expires_at})
+        db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    def release(db: Session, key: str, owner: str) -> None:
+        """Deletes a key so it can be claimed again, unless another request has taken it over.
+
+        Args:
+            db (Session): The database session used for the delete.
+            key (str): The scoped idempotency key.
+            owner (str): The releasing request's lease token.
+        """
+        db.execute(_delete_key, {"scoped_key": key, "lease_owner": owner})
+        db.commit()
+
+    @staticmethod
+    def purge_expired(db: Session, now: datetime, limit: int = 1000) -> int:
+        """Deletes up to `limit` expired keys.
+
+        Args:
+            db (Session): The database session used for the delete.
+            now (datetime): The current time.
+            limit (int): Maximum rows deleted in this call.
+
+        Returns:
+            int: The number of keys deleted.
+        """
+        keys = db.scalars(_expired_keys, {"now": now, "limit": limit}).all()
+        if keys:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys)))
+            db.commit()
+        return len(keys)
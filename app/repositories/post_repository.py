@@ -1,8 +1,47 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
 from sqlalchemy.orm import Session
 from app.models.post import Post
+from app.repositories.post_stats_repository import PostStatsRepository, text_bytes
 import uuid
 from datetime import datetime
 
+# Statements are built once with bound parameters, so each call reuses the same
+# construct and SQLAlchemy's compiled cache entry instead of rebuilding the query.
+# Read paths only see live posts; soft-deleted rows keep `deleted_at` until purged.
+_posts_by_user = (
+    select(Post)
+    .where(Post.user_id == bindparam("user_id"), Post.deleted_at.is_(None))
+    .order_by(Post.created_at.desc())
+)
+_post_rows_by_user = (
+    select(Post.id, Post.text, Post.created_at)
+    .where(Post.user_id == bindparam("user_id"), Post.deleted_at.is_(None))
+    .order_by(Post.created_at.desc())
+)
+_post_size = select(Post.text_size).where(
+    Post.id == bindparam("post_id"), Post.user_id == bindparam("user_id"), Post.deleted_at.is_(None)
+)
+_tombstone_post = (
+    update(Post)
+    .where(Post.id == bindparam("post_id"), Post.user_id == bindparam("owner_id"), Post.deleted_at.is_(None))
+    .values(deleted_at=bindparam("tombstoned_at"))
+    .execution_options(synchronize_session=False)
+)
+_tombstones_due = (
+    select(Post.id)
+    .where(Post.deleted_at.is_not(None), Post.deleted_at <= bindparam("before"))
+    .order_by(Post.deleted_at)
+    .limit(bindparam("limit"))
+)
+_purge_posts = (
+    delete(Post)
+    .where(Post.id.in_(bindparam("post_ids", expanding=True)), Post.deleted_at.is_not(None))
+    .execution_options(synchronize_session=False)
+)
+_tombstone_backlog = select(func.count(), func.min(Post.deleted_at)).where(Post.deleted_at.is_not(None))
+
 class PostRepository:
     """Provides database operations related to Post entities."""
 
@@ -11,7 +50,8 @@ class PostRepository:
         """Creates and persists a new post for a user.
 
         This method generates a new UUID for the post, sets the user ID, post content,
-        and current timestamp, then saves the post to the database.
+        and current timestamp, then saves the post to the database. The user's post
+        counters are updated in the same transaction.
 
         Args:
             db (Session): The database session used for committing the new post.
@@ -28,10 +68,46 @@ class PostRepository:
             created_at=datetime.now()
         )
         db.add(post)
+        PostStatsRepository.record_created(db, [{
+            "user_id": user_id,
+            "post_count": 1,
+            "total_bytes": text_bytes(text),
+            "last_post_at": post.created_at
+        }])
         db.commit()
         db.refresh(post)
         return post
 
+    @staticmethod
+    def bulk_create(db: Session, posts: list[dict]) -> int:
+        """Persists a batch of posts in a single INSERT and commit.
+
+        The posts must already carry their ID and creation timestamp, so no
+        refresh round-trip is needed after the commit. Post counters are updated
+        with one upsert per user in the same transaction.
+
+        Args:
+            db (Session): The database session used for committing the posts.
+            posts (list[dict]): Post rows with `id`, `user_id`, `text` and `created_at` keys.
+
+        Returns:
+            int: The number of posts inserted.
+        """
+        if not posts:
+            return 0
+        db.execute(insert(Post), posts)
+        stats: dict[int, dict] = {}
+        for post in posts:
+            row = stats.setdefault(post["user_id"], {
+                "user_id": post["user_id"], "post_count": 0, "total_bytes": 0, "last_post_at": post["created_at"]
+            })
+            row["post_count"] += 1
+            row["total_bytes"] += text_bytes(post["text"])
+            row["last_post_at"] = max(row["last_post_at"], post["created_at"])
+        PostStatsRepository.record_created(db, list(stats.values()))
+        db.commit()
+        return len(posts)
+
     @staticmethod
     def get_by_user(db: Session, user_id: int) -> list[Post]:
         """Retrieves all posts for a given user, ordered by creation time DESC.
@@ -46,11 +122,34 @@ class PostRepository:
         Returns:
             list[Post]: A list of Post objects belonging to the user, ordered by created_at DESC.
         """
-        return db.query(Post).filter(Post.user_id == user_id).order_by(Post.created_at.desc()).all()
+        return list(db.scalars(_posts_by_user, {"user_id": user_id}))
+
+    @staticmethod
+    def get_rows_by_user(db: Session, user_id: int) -> Iterable[tuple[str, str, datetime]]:
+        """Retrieves a user's posts as plain column tuples, newest first.
+
+        Selects only the columns the listing needs and skips ORM hydration (identity
+        map and attribute instrumentation), so rows can be fed straight into the
+        cache format. The result must be consumed before the session is used again.
+
+        Args:
+            db (Session): The database session used for querying.
+            user_id (int): The unique identifier of the user whose posts are to be retrieved.
+
+        Returns:
+            Iterable[tuple[str, str, datetime]]: `(id, text, created_at)` rows, ordered by created_at DESC.
+        """
+        return db.execute(_post_rows_by_user, {"user_id": user_id})
 
     @staticmethod
     def delete(db: Session, user_id: int, post_id: str) -> bool:
-        """Deletes a post by ID for a specific user from the database.
+        """Soft-deletes a post by ID for a specific user.
+
+        The post is only tombstoned by setting `deleted_at`, a single-row UPDATE
+        that hides it from every read path; the row is hard-deleted later in
+        batches by `purge_tombstones`. Only the stored `text_size` is read first,
+        never the body, to subtract it from the user's counters, which are
+        updated in the same transaction.
 
         Args:
             db (Session): The database session used for deletion.
@@ -60,9 +159,47 @@ class PostRepository:
         Returns:
             bool: True if a post was deleted, False otherwise.
         """
-        post = db.query(Post).filter(Post.id == post_id, Post.user_id == user_id).first()
-        if not post:
+        params = {"post_id": post_id, "user_id": user_id}
+        size = db.scalar(_post_size, params)
+        if size is None:
+            return False
+        tombstone = {"post_id": post_id, "owner_id": user_id, "tombstoned_at": datetime.now()}
+        if db.execute(_tombstone_post, tombstone).rowcount == 0:
+            db.rollback()
             return False
-        db.delete(post)
+        PostStatsRepository.record_deleted(db, user_id, size)
         db.commit()
         return True
+
+    @staticmethod
+    def purge_tombstones(db: Session, before: datetime, limit: int) -> int:
+        """Hard-deletes up to `limit` posts soft-deleted at or before `before`, oldest first.
+
+        Args:
+            db (Session): The database session used for the delete.
+            before (datetime): Only tombstones at least this old are purged.
+            limit (int): Maximum rows deleted in this call.
+
+        Returns:
+            int: The number of posts purged.
+        """
+        post_ids = db.scalars(_tombstones_due, {"before": before, "limit": limit}).all()
+        if not post_ids:
+            db.rollback()
+            return 0
+        purged = db.execute(_purge_posts, {"post_ids": post_ids}).rowcount
+        db.commit()
+        return purged
+
+    @staticmethod
+    def tombstone_backlog(db: Session) -> tuple[int, Optional[datetime]]:
+        """Counts soft-deleted posts waiting to be purged.
+
+        Args:
+            db (Session): The database session used for querying.
+
+        Returns:
+            tuple[int, Optional[datetime]]: The number of tombstones and the oldest `deleted_at`, if any.
+        """
+        count, oldest = db.execute(_tombstone_backlog).one()
+        return count, oldest
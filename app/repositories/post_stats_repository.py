@@ -0,0 +1,230 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.post import Post
+from app.models.user_post_stats import UserPostStats
+
+_stats = UserPostStats.__table__
+
+# Recomputes last_post_at from the remaining live posts, so deleting the newest post moves it back
+_record_deleted = (
+    update(UserPostStats)
+    .where(UserPostStats.user_id == bindparam("stats_user_id"))
+    .values(
+        post_count=UserPostStats.post_count - 1,
+        total_bytes=UserPostStats.total_bytes - bindparam("text_bytes"),
+        last_post_at=(
+            select(func.max(Post.created_at))
+            .where(Post.user_id == bindparam("stats_user_id"), Post.deleted_at.is_(None))
+            .scalar_subquery()
+        ),
+    )
+    .execution_options(synchronize_session=False)
+)
+
+_stats_for_users = select(UserPostStats).where(UserPostStats.user_id.in_(bindparam("user_ids", expanding=True)))
+
+# Counters recomputed from the live posts in one grouped aggregate, without reading any post text
+_live_totals = (
+    select(Post.user_id, func.count(), func.sum(Post.text_size), func.max(Post.created_at))
+    .where(Post.user_id.in_(bindparam("user_ids", expanding=True)), Post.deleted_at.is_(None))
+    .group_by(Post.user_id)
+)
+
+# Upsert statements per (dialect, increment), built on first use; None for dialects without one
+_upserts: dict[tuple[str, bool], object] = {}
+
+# Update-then-insert fallback for dialects without an upsert, as (update, insert) per increment
+_fallback_update = {
+    True: update(_stats)
+    .where(_stats.c.user_id == bindparam("stats_user_id"))
+    .values(
+        post_count=_stats.c.post_count + bindparam("new_post_count"),
+        total_bytes=_stats.c.total_bytes + bindparam("new_total_bytes"),
+        last_post_at=case(
+            (
+                (_stats.c.last_post_at.is_(None)) | (_stats.c.last_post_at < bindparam("new_last_post_at")),
+                bindparam("new_last_post_at"),
+            ),
+            else_=_stats.c.last_post_at,
+        ),
+    ),
+    False: update(_stats)
+    .where(_stats.c.user_id == bindparam("stats_user_id"))
+    .values(
+        post_count=bindparam("new_post_count"),
+        total_bytes=bindparam("new_total_bytes"),
+        last_post_at=bindparam("new_last_post_at"),
+    ),
+}
+
+
+def _upsert_statement(dialect: str, increment: bool):
+    """Returns an INSERT .. ON DUPLICATE KEY / ON CONFLICT statement for the stats table.
+
+    With `increment`, the inserted counts are added to an existing row and
+    last_post_at keeps the later of the two timestamps; otherwise the row is
+    overwritten with the inserted values. Returns None for dialects with no
+    upsert syntax; those go through `_update_then_insert`.
+    """
+    key = (dialect, increment)
+    if key in _upserts:
+        return _upserts[key]
+    if dialect == "mysql":
+        stmt = mysql.insert(_stats)
+        new, greatest = stmt.inserted, func.greatest
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(_stats)
+        new, greatest = stmt.excluded, func.max if dialect == "sqlite" else func.greatest
+    else:
+        _upserts[key] = None
+        return None
+
+    if increment:
+        values = {
+            "post_count": _stats.c.post_count + new.post_count,
+            "total_bytes": _stats.c.total_bytes + new.total_bytes,
+            "last_post_at": greatest(func.coalesce(_stats.c.last_post_at, new.last_post_at), new.last_post_at),
+        }
+    else:
+        values = {name: new[name] for name in ("post_count", "total_bytes", "last_post_at")}
+
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(**values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=[_stats.c.user_id], set_=values)
+    _upserts[key] = stmt
+    return stmt
+
+
+def _update_then_insert(db: Session, rows: list[dict], increment: bool) -> None:
+    """Applies stats rows one at a time with an UPDATE, inserting those that have no row yet.
+
+    An insert that loses a race with a concurrent first post for the same user
+    is rolled back to its savepoint and retried as an update.
+    """
+    for row in rows:
+        params = {
+            "stats_user_id": row["user_id"],
+            "new_post_count": row["post_count"],
+            "new_total_bytes": row["total_bytes"],
+            "new_last_post_at": row["last_post_at"],
+        }
+        while not db.execute(_fallback_update[increment], params).rowcount:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(_stats), row)
+                break
+            except IntegrityError:
+                continue
+
+
+def _upsert(db: Session, rows: list[dict], increment: bool) -> None:
+    """Upserts stats rows with the dialect's upsert statement, or the fallback without one."""
+    stmt = _upsert_statement(db.get_bind().dialect.name, increment)
+    if stmt is None:
+        _update_then_insert(db, rows, increment)
+    else:
+        db.execute(stmt, rows)
+
+
+def text_bytes(text: str) -> int:
+    """Returns the size of a post text as counted in `total_bytes`."""
+    return len(text.encode("utf-8"))
+
+
+class PostStatsRepository:
+    """Provides database operations on the per-user post counters.
+
+    The write methods do not commit; they are called by `PostRepository` inside the
+    transaction that inserts or deletes the posts, so counters never drift from a
+    committed change.
+    """
+
+    @staticmethod
+    def get(db: Session, user_id: int) -> Optional[UserPostStats]:
+        """Retrieves a user's counters by primary key.
+
+        Args:
+            db (Session): The database session used for querying.
+            user_id (int): The ID of the user.
+
+        Returns:
+            Optional[UserPostStats]: The counters, or None if the user never posted.
+        """
+        return db.get(UserPostStats, user_id)
+
+    @staticmethod
+    def get_many(db: Session, user_ids: list[int], for_update: bool = False) -> list[UserPostStats]:
+        """Retrieves the counters of several users in one query.
+
+        Args:
+            db (Session): The database session used for querying.
+            user_ids (list[int]): The IDs of the users.
+            for_update (bool): Lock the rows (SELECT .. FOR UPDATE) until the transaction
+                ends, so concurrent post inserts and deletes wait for the caller.
+
+        Returns:
+            list[UserPostStats]: The counters of those users who have a row.
+        """
+        stmt = _stats_for_users.with_for_update() if for_update else _stats_for_users
+        return list(db.scalars(stmt, {"user_ids": user_ids}))
+
+    @staticmethod
+    def live_totals(db: Session, user_ids: list[int]) -> dict[int, tuple[int, int, Optional[datetime]]]:
+        """Recomputes counters from the live (not soft-deleted) posts of several users.
+
+        Args:
+            db (Session): The database session used for querying.
+            user_ids (list[int]): The IDs of the users.
+
+        Returns:
+            dict[int, tuple[int, int, Optional[datetime]]]: Post count, total bytes and
+                last post time per user; users without live posts are absent.
+        """
+        return {
+            user_id: (count, int(total_bytes or 0), last_post_at)
+            for user_id, count, total_bytes, last_post_at in db.execute(_live_totals, {"user_ids": user_ids})
+        }
+
+    @staticmethod
+    def record_created(db: Session, rows: list[dict]) -> None:
+        """Adds newly inserted posts to their users' counters.
+
+        Args:
+            db (Session): The session of the transaction inserting the posts.
+            rows (list[dict]): One row per user with `user_id`, `post_count`, `total_bytes`
+                and `last_post_at` (the newest new post's creation time).
+        """
+        if rows:
+            _upsert(db, rows, True)
+
+    @staticmethod
+    def record_deleted(db: Session, user_id: int, deleted_bytes: int) -> None:
+        """Removes a deleted post from its user's counters.
+
+        Must run after the post is tombstoned in the same transaction, so the new
+        last_post_at is computed from the remaining live posts.
+
+        Args:
+            db (Session): The session of the transaction deleting the post.
+            user_id (int): The ID of the post's owner.
+            deleted_bytes (int): The size of the deleted post's text.
+        """
+        db.execute(_record_deleted, {"stats_user_id": user_id, "text_bytes": deleted_bytes})
+
+    @staticmethod
+    def replace(db: Session, rows: list[dict]) -> None:
+        """Overwrites users' counters with recomputed values.
+
+        Args:
+            db (Session): The database session used for the update.
+            rows (list[dict]): Rows with `user_id`, `post_count`, `total_bytes` and `last_post_at`.
+        """
+        if rows:
+            _upsert(db, rows, False)
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, delete, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.revoked_token import RevokedToken
+
+_revoked_since = (
+    select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+    .where(or_(
+        RevokedToken.revoked_at > bindparam("after_at"),
+        and_(RevokedToken.revoked_at == bindparam("after_at"), RevokedToken.id > bindparam("after_id")),
+    ))
+    .order_by(RevokedToken.revoked_at, RevokedToken.id)
+    .limit(bindparam("limit"))
+)
+_expired_ids = (
+    select(RevokedToken.id)
+    .where(RevokedToken.expires_at <= bindparam("now"))
+    .limit(bindparam("limit"))
+)
+_delete_ids = (
+    delete(RevokedToken)
+    .where(RevokedToken.id.in_(bindparam("token_ids", expanding=True)))
+    .execution_options(synchronize_session=False)
+)
+
+
+class RevocationRepository:
+    """Provides database operations on shared token revocations."""
+
+    @staticmethod
+    def add(db: Session, jti: str, expires_at: int) -> bool:
+        """Records a revocation, relying on the unique `jti` to detect one that already exists.
+
+        Args:
+            db (Session): The database session used for the insert.
+            jti (str): The token's `jti` claim.
+            expires_at (int): The token's `exp` claim, in epoch seconds.
+
+        Returns:
+            bool: True if this call revoked the token, False if it was already revoked.
+        """
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+        try:
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    @staticmethod
+    def since(db: Session, after_at: datetime, after_id: int = 0,
+              limit: int = 1000) -> list[tuple[int, str, int, datetime]]:
+        """Returns up to `limit` revocations after `(after_at, after_id)`, oldest first.
+
+        Args:
+            db (Session): The database session used for querying.
+            after_at (datetime): Only revocations at or after this time are returned.
+            after_id (int): Among revocations at exactly `after_at`, only IDs above this.
+            limit (int): Maximum rows returned.
+
+        Returns:
+            list[tuple[int, str, int, datetime]]: `(id, jti, expires_at, revoked_at)` rows.
+        """
+        params = {"after_at": after_at, "after_id": after_id, "limit": limit}
+        return [tuple(row) for row in db.execute(_revoked_since, params)]
+
+    @staticmethod
+    def purge_expired(db: Session, now: int, limit: int = 1000) -> int:
+        """Deletes up to `limit` revocations of tokens that have expired.
+
+        Args:
+            db (Session): The database session used for the delete.
+            now (int): Current time in epoch seconds.
+            limit (int): Maximum rows deleted in this call.
+
+        Returns:
+            int: The number of rows deleted.
+        """
+        token_ids = db.scalars(_expired_ids, {"now": now, "limit": limit}).all()
+        if not token_ids:
+            db.rollback()
+            return 0
+        deleted = db.execute(_delete_ids, {"token_ids": token_ids}).rowcount
+        db.commit()
+        return deleted
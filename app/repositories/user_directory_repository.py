@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.orm import Session
+
+from app.models.user_directory import UserDirectoryEntry
+
+_user_id_by_email = select(UserDirectoryEntry.user_id).where(UserDirectoryEntry.email == bindparam("email"))
+_entry_by_email = select(UserDirectoryEntry.user_id, UserDirectoryEntry.registered_at).where(
+    UserDirectoryEntry.email == bindparam("email")
+)
+_known_user_ids = select(UserDirectoryEntry.user_id).where(
+    UserDirectoryEntry.user_id.in_(bindparam("user_ids", expanding=True))
+)
+_remove_entry = (
+    delete(UserDirectoryEntry)
+    .where(UserDirectoryEntry.user_id == bindparam("directory_user_id"))
+    .execution_options(synchronize_session=False)
+)
+_reclaim_entry = (
+    delete(UserDirectoryEntry)
+    .where(UserDirectoryEntry.user_id == bindparam("directory_user_id"),
+           UserDirectoryEntry.registered_at <= bindparam("registered_before"))
+    .execution_options(synchronize_session=False)
+)
+
+
+class UserDirectoryRepository:
+    """Provides database operations on the global email → user ID directory."""
+
+    @staticmethod
+    def get_user_id(db: Session, email: str) -> Optional[int]:
+        """Looks up the user ID registered for an email.
+
+        Args:
+            db (Session): A session on the global database.
+            email (str): The email address to look up.
+
+        Returns:
+            Optional[int]: The user ID, or None if the email is not registered.
+        """
+        return db.scalar(_user_id_by_email, {"email": email})
+
+    @staticmethod
+    def get_entry(db: Session, email: str) -> Optional[tuple[int, datetime]]:
+        """Looks up the user ID registered for an email and when it was reserved.
+
+        Args:
+            db (Session): A session on the global database.
+            email (str): The email address to look up.
+
+        Returns:
+            Optional[tuple[int, datetime]]: `(user_id, registered_at)`, or None if the email is not registered.
+        """
+        row = db.execute(_entry_by_email, {"email": email}).first()
+        return None if row is None else (row.user_id, row.registered_at)
+
+    @staticmethod
+    def reclaim(db: Session, user_id: int, registered_before: datetime) -> bool:
+        """Deletes an orphaned entry, unless it was reserved after `registered_before`.
+
+        The age condition is part of the DELETE, so of several signups reclaiming
+        the same entry only one succeeds.
+
+        Args:
+            db (Session): A session on the global database.
+            user_id (int): The orphaned entry's user ID.
+            registered_before (datetime): Only entries reserved at or before this time are deleted.
+
+        Returns:
+            bool: True if this call deleted the entry.
+        """
+        deleted = db.execute(_reclaim_entry, {"directory_user_id": user_id, "registered_before": registered_before})
+        db.commit()
+        return deleted.rowcount == 1
+
+    @staticmethod
+    def register(db: Session, email: str) -> int:
+        """Reserves a new user ID for an email.
+
+        Args:
+            db (Session): A session on the global database.
+            email (str): The new user's email address.
+
+        Returns:
+            int: The assigned user ID.
+
+        Raises:
+            IntegrityError: If the email is already registered.
+        """
+        entry = UserDirectoryEntry(email=email)
+        db.add(entry)
+        db.commit()
+        return entry.user_id
+
+    @staticmethod
+    def remove(db: Session, user_id: int) -> None:
+        """Deletes a user's entry, e.g. after their shard insert failed.
+
+        Args:
+            db (Session): A session on the global database.
+            user_id (int): The user ID to release.
+        """
+        db.execute(_remove_entry, {"directory_user_id": user_id})
+        db.commit()
+
+    @staticmethod
+    def add_missing(db: Session, users: list[tuple[int, str]]) -> int:
+        """Adds entries for existing users that are not in the directory yet.
+
+        Args:
+            db (Session): A session on the global database.
+            users (list[tuple[int, str]]): `(user_id, email)` pairs read from a shard.
+
+        Returns:
+            int: The number of entries added.
+        """
+        if not users:
+            return 0
+        known = set(db.scalars(_known_user_ids, {"user_ids": [user_id for user_id, _ in users]}))
+        missing = [UserDirectoryEntry(user_id=user_id, email=email) for user_id, email in users if user_id not in known]
+        db.add_all(missing)
+        db.commit()
+        return len(missing)
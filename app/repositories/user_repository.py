@@ -1,8 +1,12 @@
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from ..models.user import User
 from ..schemas.user import UserCreate
 from typing import Optional
 
+# Built once with a bound parameter so every lookup reuses the compiled statement.
+_user_by_email = select(User).where(User.email == bindparam("email")).limit(1)
+
 class UserRepository:
     """Provides database operations related to User entities."""
 
@@ -17,21 +21,37 @@ class UserRepository:
         Returns:
             Optional[User]: The User object if found, otherwise None.
         """
-        return db.query(User).filter(User.email == email).first()
+        return db.scalars(_user_by_email, {"email": email}).first()
+
+    @staticmethod
+    def get_by_id(db: Session, user_id: int) -> Optional[User]:
+        """Retrieves a user by primary key.
+
+        Args:
+            db (Session): The database session used for querying.
+            user_id (int): The user's ID.
+
+        Returns:
+            Optional[User]: The User object if found, otherwise None.
+        """
+        return db.get(User, user_id)
 
     @staticmethod
-    def create(db: Session, user_in: UserCreate, hashed_password: str) -> User:
+    def create(db: Session, user_in: UserCreate, hashed_password: str, user_id: Optional[int] = None) -> User:
         """Creates and persist a new user in the database.
 
         Args:
             db (Session): The database session used for committing the new user.
             user_in (UserCreate): The user registration data (email and password).
             hashed_password (str): The securely hashed password for the user.
+            user_id (Optional[int]): The ID assigned by the user directory when sharded;
+                generated by the database if None.
 
         Returns:
             User: The newly created User object.
         """
         user = User(
+            id=user_id,
             email=user_in.email,
             password=hashed_password
         )
@@ -39,3 +59,19 @@ class UserRepository:
         db.commit()
         db.refresh(user)
         return user
+
+    @staticmethod
+    def update_password(db: Session, user: User, hashed_password: str) -> User:
+        """Replaces a user's stored password hash.
+
+        Args:
+            db (Session): The database session used for committing the change.
+            user (User): The user whose hash is replaced.
+            hashed_password (str): The new password hash.
+
+        Returns:
+            User: The updated User object.
+        """
+        user.password = hashed_password
+        db.commit()
+        return user
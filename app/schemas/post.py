@@ -1,4 +1,7 @@
-from pydantic import BaseModel, constr, Field
+import datetime
+from typing import Any, Optional, TypedDict
+
+from pydantic import BaseModel, constr, Field, TypeAdapter
 
 class PostCreate(BaseModel):
     """Schema for creating a post."""
@@ -10,3 +13,71 @@ class PostResponse(BaseModel):
     text: str
     user_id: int
     created_at: str
+
+class PostListResponse(BaseModel):
+    """Schema for the post listing response."""
+    status: str
+    data: list[PostResponse]
+    errors: Optional[list[str]] = None
+
+class PostCreated(BaseModel):
+    """Schema for the ID of a newly created post."""
+    id: str
+
+class PostCreateResponse(BaseModel):
+    """Schema for the post creation response."""
+    status: str
+    data: PostCreated
+    errors: Optional[list[str]] = None
+
+class PostStats(BaseModel):
+    """Schema for a user's post counters."""
+    post_count: int
+    total_bytes: int
+    last_post_at: Optional[str] = None
+
+class PostStatsResponse(BaseModel):
+    """Schema for the post stats response."""
+    status: str
+    data: PostStats
+    errors: Optional[list[str]] = None
+
+class PostEventItem(BaseModel):
+    """Schema for a post stream event (`post_created`, `post_deleted` or `resync`)."""
+    id: int
+    type: str
+    data: dict[str, Any]
+
+class PostEventListResponse(BaseModel):
+    """Schema for the long-poll post stream response."""
+    status: str
+    data: list[PostEventItem]
+    errors: Optional[list[str]] = None
+
+
+class PostItem(TypedDict):
+    """Serialization shape of a post, mirroring `PostResponse`.
+
+    Used with `TypeAdapter.dump_json` so already-validated data is written in one pass
+    without building model instances; `created_at` is formatted by the serializer.
+    """
+    post_id: str
+    user_id: int
+    text: str
+    created_at: datetime.datetime
+
+class PostListEnvelope(TypedDict):
+    """Serialization shape of `PostListResponse`."""
+    status: str
+    data: list[PostItem]
+    errors: Optional[list[str]]
+
+class PostCreatedEnvelope(TypedDict):
+    """Serialization shape of `PostCreateResponse`."""
+    status: str
+    data: dict[str, str]
+    errors: Optional[list[str]]
+
+
+post_list_adapter = TypeAdapter(PostListEnvelope)
+post_created_adapter = TypeAdapter(PostCreatedEnvelope)
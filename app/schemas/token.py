@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+class TokenRefresh(BaseModel):
+    """Schema for exchanging a refresh token for a new access token."""
+    refresh_token: str = Field(..., min_length=1, description="Refresh token issued at signup, login or refresh")
+
+class TokenRevoke(BaseModel):
+    """Schema for logging out."""
+    refresh_token: Optional[str] = Field(
+        default=None, description="Refresh token to revoke along with the access token"
+    )
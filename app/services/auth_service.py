@@ -1,9 +1,35 @@
+from ..config.settings import settings
+from ..config.sharding import shard_map
+from ..models.user import User
+from ..repositories.user_directory_repository import UserDirectoryRepository
 from ..repositories.user_repository import UserRepository
 from ..schemas.user import UserCreate, UserLogin
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from ..utils.hashing import hash_password, verify_password
-from ..utils.jwt import create_access_token
+from ..utils.hashing import hash_password, verify_password, needs_rehash
+from ..utils.jwt import create_access_token, create_refresh_token, decode_token
+from ..utils.revocation import revocation_index
+from jose import JWTError
 from typing import Tuple, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import datetime
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# bcrypt releases the GIL, so signup hashing can overlap with the email pre-check
+_hash_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="password-hash")
+
+def _user_data(user: User) -> dict:
+    """Returns the public fields of a user."""
+    return {
+        "id": user.id,
+        "email": user.email,
+        "created_at": str(user.created_at),
+        "updated_at": str(user.updated_at)
+    }
+
 
 class AuthService:
     """Provides authentication services for user signup and login."""
@@ -12,50 +38,187 @@ class AuthService:
     def signup(db: Session, user_in: UserCreate) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
         """Registers a new user and return authentication details.
 
+        The password is hashed on a worker thread while a cheap email lookup runs, so
+        the lookup adds no latency. The unique `ix_users_email` index is what actually
+        enforces uniqueness: a concurrent signup that slips past the lookup fails the
+        insert, which is reported as "Email already registered".
+
+        When users are sharded, the email is first registered in the global directory,
+        whose unique index enforces uniqueness across shards and which assigns the user
+        ID; the user is then created on the shard that ID maps to.
+
         Args:
-            db (Session): The database session used for user creation.
+            db (Session): The database session used for user creation (the global database when sharded).
             user_in (UserCreate): The registration data (email and password).
 
         Returns:
             Tuple[Optional[str], Optional[dict], Optional[str]]: (JWT token, user data dict, error message)
         """
-        if UserRepository.get_by_email(db, user_in.email):
+        hashing = _hash_executor.submit(hash_password, user_in.password)
+        if shard_map.sharded:
+            user_data = AuthService._signup_sharded(db, user_in, hashing)
+        else:
+            user_data = AuthService._create_user(db, user_in, hashing)
+        if user_data is None:
             return None, None, "Email already registered"
-        hashed_pw = hash_password(user_in.password)
-        user = UserRepository.create(db, user_in, hashed_pw)
-        token = create_access_token({"user_id": user.id, "email": user.email})
-        user_data = {
-            "id": user.id,
-            "email": user.email,
-            "created_at": str(user.created_at),
-            "updated_at": str(user.updated_at)
-        }
+        token = create_access_token({"user_id": user_data["id"], "email": user_data["email"]})
         return token, user_data, None
 
+    @staticmethod
+    def _create_user(db: Session, user_in: UserCreate, hashing: Future,
+                     user_id: Optional[int] = None) -> Optional[dict]:
+        """Inserts the user unless the email is taken; returns their data or None."""
+        if UserRepository.get_by_email(db, user_in.email):
+            hashing.cancel()
+            return None
+        try:
+            if user_id is None:
+                user = UserRepository.create(db, user_in, hashing.result())
+            else:
+                user = UserRepository.create(db, user_in, hashing.result(), user_id=user_id)
+        except IntegrityError:
+            db.rollback()
+            return None
+        return _user_data(user)
+
+    @staticmethod
+    def _signup_sharded(db: Session, user_in: UserCreate, hashing: Future) -> Optional[dict]:
+        """Registers the email in the directory, then creates the user on their shard.
+
+        The entry is committed before the shard insert, so a process that dies in
+        between leaves an entry with no user behind. Such an entry is reclaimed
+        once it is older than `DIRECTORY_RECLAIM_SECONDS`; a younger one may belong
+        to a signup still in progress and keeps the email taken.
+        """
+        entry = UserDirectoryRepository.get_entry(db, user_in.email)
+        if entry is not None and not AuthService._reclaim_orphan(db, *entry):
+            hashing.cancel()
+            return None
+        try:
+            user_id = UserDirectoryRepository.register(db, user_in.email)
+        except IntegrityError:
+            db.rollback()
+            hashing.cancel()
+            return None
+        try:
+            with shard_map.session_for(user_id) as shard_db:
+                user_data = AuthService._create_user(shard_db, user_in, hashing, user_id)
+        except Exception:
+            UserDirectoryRepository.remove(db, user_id)
+            raise
+        if user_data is None:
+            # A stale row on the shard holds the email; keep the directory consistent with it
+            UserDirectoryRepository.remove(db, user_id)
+        return user_data
+
+    @staticmethod
+    def _reclaim_orphan(db: Session, user_id: int, registered_at: datetime.datetime) -> bool:
+        """Releases a directory entry whose user never reached their shard; returns whether it did."""
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=settings.DIRECTORY_RECLAIM_SECONDS)
+        if registered_at > cutoff:
+            return False
+        with shard_map.session_for(user_id) as shard_db:
+            if UserRepository.get_by_id(shard_db, user_id) is not None:
+                return False
+        if not UserDirectoryRepository.reclaim(db, user_id, cutoff):
+            return False
+        logger.warning("Reclaimed orphaned directory entry for user %s", user_id)
+        return True
+
     @staticmethod
     def login(db: Session, user_in: UserLogin) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
         """Authenticates a user and return authentication details.
 
         Verifies the user's email and password. If valid, returns a JWT token and user data.
-        Returns an error if authentication fails.
+        Returns an error if authentication fails. A stored hash made with a bcrypt cost below
+        `BCRYPT_ROUNDS` is replaced while the plain password is at hand; a failure to
+        save it does not fail the login. When users are sharded, the email is resolved to a
+        user ID in the global directory and the user is read from their shard by primary key.
 
         Args:
-            db (Session): The database session used for user lookup.
+            db (Session): The database session used for user lookup (the global database when sharded).
             user_in (UserLogin): The login credentials (email and password).
 
         Returns:
             Tuple[Optional[str], Optional[dict], Optional[str]]: (JWT token, user data dict, error message)
         """
-        user = UserRepository.get_by_email(db, user_in.email)
+        if not shard_map.sharded:
+            return AuthService._authenticate(db, UserRepository.get_by_email(db, user_in.email), user_in)
+        user_id = UserDirectoryRepository.get_user_id(db, user_in.email)
+        if user_id is None:
+            return None, None, "Invalid email or password"
+        with shard_map.session_for(user_id) as shard_db:
+            return AuthService._authenticate(shard_db, UserRepository.get_by_id(shard_db, user_id), user_in)
+
+    @staticmethod
+    def _authenticate(db: Session, user: Optional[User],
+                      user_in: UserLogin) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
+        """Checks the password of a looked-up user and issues a token. See `login`."""
         if not user:
             return None, None, "Invalid email or password"
         if not verify_password(user_in.password, user.password):
             return None, None, "Invalid email or password"
+        if needs_rehash(user.password):
+            try:
+                UserRepository.update_password(db, user, hash_password(user_in.password))
+            except Exception as e:
+                logger.warning("Could not rehash password for user %s: %s", user.id, e)
+                db.rollback()
         token = create_access_token({"user_id": user.id, "email": user.email})
-        user_data = {
-            "id": user.id,
-            "email": user.email,
-            "created_at": str(user.created_at),
-            "updated_at": str(user.updated_at)
-        }
-        return token, user_data, None
+        return token, _user_data(user), None
+
+    @staticmethod
+    def issue_refresh_token(user_data: dict) -> str:
+        """Creates a refresh token for a user who has just signed up or logged in.
+
+        Args:
+            user_data (dict): The user data returned by `signup` or `login`.
+
+        Returns:
+            str: A JWT refresh token.
+        """
+        return create_refresh_token({"user_id": user_data["id"], "email": user_data["email"]})
+
+    @staticmethod
+    def refresh(refresh_token: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Exchanges a refresh token for a new access token and a rotated refresh token.
+
+        No password verification or database access is involved. The presented refresh
+        token is revoked, so each one can be used only once.
+
+        Args:
+            refresh_token (str): The refresh token issued at signup, login or a previous refresh.
+
+        Returns:
+            Tuple[Optional[str], Optional[str], Optional[str]]: (access token, refresh token, error message)
+        """
+        try:
+            payload = decode_token(refresh_token)
+        except JWTError:
+            return None, None, "Invalid or expired refresh token"
+        jti = payload.get("jti")
+        if payload.get("type") != "refresh" or jti is None or payload.get("user_id") is None:
+            return None, None, "Invalid or expired refresh token"
+        # `revoke` reports a token another request revoked first, so each is accepted once
+        if revocation_index.is_revoked(jti) or not revocation_index.revoke(jti, payload["exp"]):
+            return None, None, "Refresh token has been revoked"
+        claims = {"user_id": payload["user_id"], "email": payload.get("email")}
+        return create_access_token(claims), create_refresh_token(claims), None
+
+    @staticmethod
+    def logout(user: dict, refresh_token: Optional[str] = None) -> None:
+        """Revokes the caller's access token and, if given, their refresh token.
+
+        Args:
+            user (dict): The authenticated user, as returned by `get_current_user`.
+            refresh_token (Optional[str]): A refresh token to revoke along with the access token.
+        """
+        if user.get("jti") and user.get("exp"):
+            revocation_index.revoke(user["jti"], user["exp"])
+        if refresh_token:
+            try:
+                payload = decode_token(refresh_token)
+            except JWTError:
+                return
+            if payload.get("jti") and payload.get("user_id") == user.get("user_id"):
+                revocation_index.revoke(payload["jti"], payload["exp"])
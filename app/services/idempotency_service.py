@@ -0,0 +1,315 @@
+"""
+Idempotency-Key support for retried write requests.
+
+The first request with a given key runs and its response is stored for
+`IDEMPOTENCY_TTL_SECONDS`; retries with the same key and payload get the stored
+response instead of running again. A retry that arrives while the first request
+is still running waits for it rather than starting a second write. An in-flight
+key is only leased for `IDEMPOTENCY_LEASE_SECONDS`, so if its owner dies without
+releasing it a retry takes it over once the lease runs out. Each claim carries an
+owner token, and only the current owner can complete or release the key, so a
+request that outlived its lease cannot overwrite the response of the one that
+took it over.
+
+`MemoryIdempotencyStore` keeps a bounded, TTL'd table in-process, which is enough
+for a single worker. `DatabaseIdempotencyStore` adds a shared `idempotency_keys`
+table so duplicates are caught across workers, and still dedupes in memory first.
+"""
+import asyncio
+import datetime
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+import anyio
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """Raised when a key is reused with a different request payload."""
+
+
+class IdempotencyInProgress(Exception):
+    """Raised when the original request for a key is still running after the wait timeout."""
+
+
+class StoredResponse(NamedTuple):
+    """A completed response kept for replay."""
+    status_code: int
+    body: bytes
+
+
+def fingerprint(payload: bytes) -> str:
+    """Returns the fingerprint identifying a request payload."""
+    return hashlib.sha256(payload).hexdigest()
+
+
+def lease_token() -> str:
+    """Returns a new owner token identifying one request's claim on a key."""
+    return uuid.uuid4().hex
+
+
+class _Entry:
+    """An in-flight or completed key."""
+    __slots__ = ("fingerprint", "owner", "response", "done", "expires_at")
+
+    def __init__(self, fingerprint: str, owner: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.owner = owner
+        self.response: Optional[StoredResponse] = None
+        self.done = asyncio.Event()
+        self.expires_at = expires_at
+
+
+class MemoryIdempotencyStore:
+    """In-process idempotency store, bounded by entry count and TTL.
+
+    Used from the event loop only. When full, the oldest completed keys are evicted
+    first; keys still in flight are never evicted.
+    """
+
+    def __init__(self, ttl_seconds: float = settings.IDEMPOTENCY_TTL_SECONDS,
+                 lease_seconds: float = settings.IDEMPOTENCY_LEASE_SECONDS,
+                 max_keys: int = settings.IDEMPOTENCY_MAX_KEYS,
+                 wait_seconds: float = settings.IDEMPOTENCY_WAIT_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initializes an empty store.
+
+        Args:
+            ttl_seconds: How long a completed response is replayed.
+            lease_seconds: How long an in-flight key is held before a retry may take it over.
+            max_keys: Maximum keys held.
+            wait_seconds: How long a duplicate waits for the original request to finish.
+            clock: Monotonic time source in seconds.
+        """
+        self.ttl = ttl_seconds
+        self.lease = lease_seconds
+        self.max_keys = max_keys
+        self.wait_seconds = wait_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def begin(self, key: str, request_fingerprint: str, owner: str) -> Optional[StoredResponse]:
+        """Claims a key, or returns the response already stored for it.
+
+        Args:
+            key: The scoped idempotency key.
+            request_fingerprint: The fingerprint of this request's payload.
+            owner: This request's lease token, from `lease_token`.
+
+        Returns:
+            Optional[StoredResponse]: The stored response to replay, or None if the
+            caller now owns the key and must call `complete` or `release` with `owner`.
+
+        Raises:
+            IdempotencyConflict: If the key was used with a different payload.
+            IdempotencyInProgress: If the original request is still running after `wait_seconds`.
+        """
+        deadline = self._clock() + self.wait_seconds
+        while True:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                # Expired response, or a lease whose owner never finished: take the key over
+                del self._entries[key]
+                entry.done.set()
+                entry = None
+            if entry is None:
+                self._insert(key, _Entry(request_fingerprint, owner, now + self.lease), now)
+                return None
+            if entry.fingerprint != request_fingerprint:
+                raise IdempotencyConflict(key)
+            if entry.response is not None:
+                return entry.response
+            try:
+                await asyncio.wait_for(entry.done.wait(), max(0.0, deadline - now))
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgress(key)
+            # Completed, or released by a failed owner: look again
+
+    def _insert(self, key: str, entry: _Entry, now: float) -> None:
+        """Adds an entry, evicting expired and then oldest completed entries beyond `max_keys`."""
+        entries = self._entries
+        entries[key] = entry
+        if len(entries) <= self.max_keys:
+            return
+        for old_key in list(entries):
+            old = entries[old_key]
+            if old.response is not None or old.expires_at <= now:
+                del entries[old_key]
+                if len(entries) <= self.max_keys:
+                    return
+
+    async def complete(self, key: str, response: StoredResponse, owner: str) -> bool:
+        """Stores the owner's response for the full TTL and wakes any waiting duplicates.
+
+        Returns:
+            bool: True if the response was stored, False if `owner` no longer holds the key.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.owner != owner:
+            return False
+        entry.response = response
+        entry.expires_at = self._clock() + self.ttl
+        entry.done.set()
+        return True
+
+    async def release(self, key: str, owner: str) -> None:
+        """Forgets a key whose request failed, so a retry can run it again.
+
+        Does nothing if the key has been taken over by another request.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.owner == owner:
+            del self._entries[key]
+            entry.done.set()
+
+    async def purge_expired(self) -> int:
+        """Drops expired keys. Returns the number removed."""
+        now = self._clock()
+        expired = [k for k, e in self._entries.items() if e.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+
+class DatabaseIdempotencyStore:
+    """Idempotency store shared across workers through the `idempotency_keys` table.
+
+    Duplicates within one worker are resolved by the in-memory store without
+    touching the database; across workers, the table's primary key decides which
+    request runs, and duplicates poll the row until its response is stored.
+    """
+
+    def __init__(self, session_factory: Callable = SessionLocal,
+                 local: Optional[MemoryIdempotencyStore] = None,
+                 poll_interval: float = 0.05):
+        """Initializes the store.
+
+        Args:
+            session_factory: Factory returning a new database session.
+            local: The in-process store consulted first.
+            poll_interval: Seconds between checks of a key in flight on another worker.
+        """
+        self._session_factory = session_factory
+        self.local = local if local is not None else MemoryIdempotencyStore()
+        self.poll_interval = poll_interval
+
+    def _call(self, method: Callable, *args):
+        """Runs a repository method with a fresh session."""
+        with self._session_factory() as db:
+            return method(db, *args)
+
+    async def begin(self, key: str, request_fingerprint: str, owner: str) -> Optional[StoredResponse]:
+        """Claims a key, or returns the response already stored for it. See `MemoryIdempotencyStore.begin`."""
+        stored = await self.local.begin(key, request_fingerprint, owner)
+        if stored is not None:
+            return stored
+        try:
+            stored = await self._begin_shared(key, request_fingerprint, owner)
+        except BaseException:
+            await self.local.release(key, owner)
+            raise
+        if stored is not None:
+            await self.local.complete(key, stored, owner)
+        return stored
+
+    async def _begin_shared(self, key: str, request_fingerprint: str, owner: str) -> Optional[StoredResponse]:
+        """Claims the key in the shared table or waits for the worker that holds it.
+
+        The claim is a lease of `lease` seconds; a row whose lease or TTL has run out
+        is taken over atomically, so a key held by a crashed worker frees up on its own.
+        """
+        deadline = time.monotonic() + self.local.wait_seconds
+        while True:
+            now = datetime.datetime.now()
+            lease_until = now + datetime.timedelta(seconds=self.local.lease)
+            if await anyio.to_thread.run_sync(self._call, IdempotencyRepository.claim,
+                                              key, request_fingerprint, owner, lease_until):
+                return None
+            row = await anyio.to_thread.run_sync(self._call, IdempotencyRepository.get, key)
+            if row is None:
+                continue
+            if row.expires_at <= now:
+                if await anyio.to_thread.run_sync(self._call, IdempotencyRepository.take_over,
+                                                  key, request_fingerprint, owner, now, lease_until):
+                    return None
+                continue
+            if row.fingerprint != request_fingerprint:
+                raise IdempotencyConflict(key)
+            if row.status_code is not None:
+                return StoredResponse(row.status_code, row.body)
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(key)
+            await asyncio.sleep(self.poll_interval)
+
+    async def complete(self, key: str, response: StoredResponse, owner: str) -> bool:
+        """Stores the owner's response in the shared table for the full TTL, and locally.
+
+        If another worker took the key over after this request's lease ran out, its
+        row is left alone and the local claim is dropped, so local retries read the
+        new owner's response from the table.
+
+        Returns:
+            bool: True if the response was stored, False if `owner` no longer holds the key.
+        """
+        expires_at = datetime.datetime.now() + datetime.timedelta(seconds=self.local.ttl)
+        if await anyio.to_thread.run_sync(self._call, IdempotencyRepository.complete,
+                                          key, owner, response.status_code, response.body, expires_at):
+            return await self.local.complete(key, response, owner)
+        logger.warning("Idempotency key %s was taken over before its response was stored", key)
+        await self.local.release(key, owner)
+        return False
+
+    async def release(self, key: str, owner: str) -> None:
+        """Forgets a key whose request failed, in the shared table and locally."""
+        try:
+            await anyio.to_thread.run_sync(self._call, IdempotencyRepository.release, key, owner)
+        finally:
+            await self.local.release(key, owner)
+
+    async def purge_expired(self) -> int:
+        """Drops expired keys locally and a batch of them from the shared table."""
+        await self.local.purge_expired()
+        return await anyio.to_thread.run_sync(
+            self._call, IdempotencyRepository.purge_expired, datetime.datetime.now()
+        )
+
+
+def create_idempotency_store(
+    backend: str = settings.IDEMPOTENCY_BACKEND
+) -> "MemoryIdempotencyStore | DatabaseIdempotencyStore":
+    """Creates the idempotency store configured in settings."""
+    if backend == "database":
+        return DatabaseIdempotencyStore()
+    if backend == "memory":
+        return MemoryIdempotencyStore()
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND: {backend!r}")
+
+
+async def purge_periodically(store: "MemoryIdempotencyStore | DatabaseIdempotencyStore",
+                             interval: float = settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS) -> None:
+    """Purges expired keys every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await store.purge_expired()
+        except Exception as e:
+            logger.error("Idempotency key purge failed: %s", e)
+            continue
+        if removed:
+            logger.debug("Purged %d expired idempotency keys", removed)
+
+
+idempotency_store = create_idempotency_store()
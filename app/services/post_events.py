@@ -0,0 +1,255 @@
+"""
+In-process pub/sub of post events for streaming clients.
+
+`PostService` publishes a `post_created` or `post_deleted` event whenever a
+user's posts change, and the stream endpoint subscribes per user instead of
+polling the listing. Each subscription owns a small bounded queue; a consumer
+that falls behind far enough to fill it is dropped and reconnects, replaying
+what it missed from a short per-user backlog via its last event ID. An idle
+subscriber costs one queue and nothing per publish to other users.
+
+Events only reach subscribers connected to the same worker process.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, NamedTuple, Optional
+
+from app.config.settings import settings
+
+# Sent instead of a replay when a client's last event ID fell out of the backlog,
+# telling it to refetch the full listing.
+RESYNC = "resync"
+
+
+class TooManySubscribers(Exception):
+    """Raised when a user already has the maximum number of open streams."""
+
+
+class PostEvent(NamedTuple):
+    """A change to a user's posts.
+
+    Event IDs increase across all users, so a client can pass the last ID it saw
+    to resume after reconnecting. They start from the current time in microseconds,
+    so IDs issued after a restart are still higher than any issued before it.
+    """
+    id: int
+    type: str
+    data: dict[str, Any]
+
+
+class _Backlog:
+    """Recent events for one user and the ID below which events are no longer kept."""
+    __slots__ = ("events", "floor")
+
+    def __init__(self, size: int, floor: int):
+        self.events: deque[PostEvent] = deque(maxlen=size)
+        self.floor = floor
+
+
+class Subscription:
+    """A single stream's bounded event queue, bound to the event loop that reads it."""
+    __slots__ = ("user_id", "queue", "loop", "dropped")
+
+    def __init__(self, user_id: int, maxsize: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[PostEvent] = asyncio.Queue(maxsize)
+        self.loop = loop
+        self.dropped = False
+
+    def _offer(self, event: PostEvent) -> None:
+        """Queues an event, marking the subscription dropped if its queue is full. Runs on `loop`."""
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+
+    def deliver(self, event: PostEvent) -> None:
+        """Queues an event from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._offer(event)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._offer, event)
+
+    async def next(self, timeout: float) -> Optional[PostEvent]:
+        """Waits up to `timeout` seconds for the next event.
+
+        Returns:
+            Optional[PostEvent]: The event, or None on timeout or once the
+            subscription was dropped and its queue is drained.
+        """
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        if self.dropped:
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PostEventHub:
+    """Routes post events to the subscriptions of the user they belong to."""
+
+    def __init__(self,
+                 queue_size: int = settings.POST_STREAM_QUEUE_SIZE,
+                 backlog_size: int = settings.POST_STREAM_BACKLOG,
+                 backlog_users: int = settings.POST_STREAM_BACKLOG_USERS,
+                 max_per_user: int = settings.POST_STREAM_MAX_PER_USER):
+        """Initializes an empty hub.
+
+        Args:
+            queue_size (int): Events a subscriber may fall behind before it is dropped.
+            backlog_size (int): Recent events kept per user for resuming clients.
+            backlog_users (int): Users whose backlogs are kept, least recently published evicted first.
+            max_per_user (int): Maximum open subscriptions per user.
+        """
+        self.queue_size = queue_size
+        self.backlog_size = backlog_size
+        self.backlog_users = backlog_users
+        self.max_per_user = max_per_user
+        self._ids = itertools.count(time.time_ns() // 1000)
+        self._last_id = 0
+        # Highest event ID whose backlog was evicted; older events of unknown users may be lost
+        self._evicted_floor = 0
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._backlogs: OrderedDict[int, _Backlog] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def subscriber_count(self) -> int:
+        """Returns the number of open subscriptions across all users."""
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, user_id: int, event_type: str, data: dict[str, Any]) -> PostEvent:
+        """Records an event in the user's backlog and delivers it to their subscribers.
+
+        Safe to call from any thread. Subscriptions dropped for being too slow are
+        removed here.
+
+        Args:
+            user_id (int): The user whose posts changed.
+            event_type (str): `post_created` or `post_deleted`.
+            data (dict[str, Any]): The event payload.
+
+        Returns:
+            PostEvent: The published event.
+        """
+        with self._lock:
+            event = PostEvent(next(self._ids), event_type, data)
+            self._last_id = event.id
+            backlog = self._backlogs.get(user_id)
+            if backlog is None:
+                backlog = _Backlog(self.backlog_size, self._evicted_floor)
+                # Evict before inserting, so the new backlog is never the one evicted
+                if self._backlogs and len(self._backlogs) >= self.backlog_users:
+                    _, evicted = self._backlogs.popitem(last=False)
+                    if evicted.events:
+                        self._evicted_floor = max(self._evicted_floor, evicted.events[-1].id)
+                self._backlogs[user_id] = backlog
+            else:
+                self._backlogs.move_to_end(user_id)
+            if backlog.events and len(backlog.events) == backlog.events.maxlen:
+                backlog.floor = backlog.events[0].id
+            backlog.events.append(event)
+
+            subscribers = self._subscribers.get(user_id)
+            if not subscribers:
+                return event
+            dropped = {sub for sub in subscribers if sub.dropped}
+            subscribers -= dropped
+            targets = tuple(subscribers)
+        for sub in targets:
+            sub.deliver(event)
+        return event
+
+    def subscribe(self, user_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        """Opens a subscription for a user on the running event loop.
+
+        If `last_event_id` is given, newer events from the user's backlog are queued
+        first; if some of them are no longer kept, a single `resync` event is queued
+        instead.
+
+        Args:
+            user_id (int): The subscribing user.
+            last_event_id (Optional[int]): The last event ID the client received.
+
+        Returns:
+            Subscription: The new subscription. Must be passed to `unsubscribe` when done.
+
+        Raises:
+            TooManySubscribers: If the user already has `max_per_user` open subscriptions.
+        """
+        sub = Subscription(user_id, self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            subscribers = self._subscribers.setdefault(user_id, set())
+            subscribers -= {s for s in subscribers if s.dropped}
+            if len(subscribers) >= self.max_per_user:
+                raise TooManySubscribers(user_id)
+            subscribers.add(sub)
+            if last_event_id is not None:
+                for event in self._replay(user_id, last_event_id):
+                    sub._offer(event)
+        return sub
+
+    def _replay(self, user_id: int, last_event_id: int) -> list[PostEvent]:
+        """Returns the events a client resuming after `last_event_id` missed. Must hold `_lock`."""
+        backlog = self._backlogs.get(user_id)
+        floor = backlog.floor if backlog is not None else self._evicted_floor
+        if last_event_id < floor:
+            return [PostEvent(self._last_id, RESYNC, {})]
+        if backlog is None:
+            return []
+        missed = [event for event in backlog.events if event.id > last_event_id]
+        if len(missed) > self.queue_size:
+            return [PostEvent(self._last_id, RESYNC, {})]
+        return missed
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        """Closes a subscription."""
+        with self._lock:
+            subscribers = self._subscribers.get(sub.user_id)
+            if subscribers is not None:
+                subscribers.discard(sub)
+                if not subscribers:
+                    del self._subscribers[sub.user_id]
+
+    async def wait(self, user_id: int, last_event_id: Optional[int], timeout: float) -> list[PostEvent]:
+        """Long-poll fallback: waits up to `timeout` seconds for events after `last_event_id`.
+
+        Returns as soon as at least one event is available, together with any others
+        already queued.
+
+        Args:
+            user_id (int): The polling user.
+            last_event_id (Optional[int]): The last event ID the client received.
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            list[PostEvent]: The events, or an empty list on timeout.
+
+        Raises:
+            TooManySubscribers: If the user already has `max_per_user` open subscriptions.
+        """
+        sub = self.subscribe(user_id, last_event_id)
+        try:
+            first = await sub.next(timeout)
+            if first is None:
+                return []
+            events = [first]
+            while not sub.queue.empty():
+                events.append(sub.queue.get_nowait())
+            return events
+        finally:
+            self.unsubscribe(sub)
+
+
+post_event_hub = PostEventHub()
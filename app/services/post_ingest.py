@@ -0,0 +1,258 @@
+"""
+Write-behind ingestion queue for posts.
+
+Posts accepted in write-behind mode are placed on a bounded in-process queue and
+committed by a background flusher in batches, grouped by size or time window.
+A batch that fails to commit is retried one post at a time. Posts that fail
+because the database is unreachable, or are still queued at shutdown, are written
+to a local spill file that the flusher replays periodically and on the next start;
+posts the database rejects are moved to a dead-letter file instead.
+"""
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.config.sharding import shard_map
+from app.repositories.post_repository import PostRepository
+
+logger = logging.getLogger(__name__)
+
+# Failures that say nothing about the rows themselves; the rows are spilled and replayed later
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class IngestQueueFull(Exception):
+    """Raised when a post cannot be queued because the ingestion queue is full."""
+
+
+class PostIngestQueue:
+    """Bounded queue of pending posts with a background batch flusher."""
+
+    def __init__(self,
+                 maxsize: int = settings.POST_INGEST_QUEUE_SIZE,
+                 batch_size: int = settings.POST_INGEST_BATCH_SIZE,
+                 flush_interval_ms: int = settings.POST_INGEST_FLUSH_INTERVAL_MS,
+                 spill_path: str = settings.POST_INGEST_SPILL_PATH,
+                 dead_letter_path: str = settings.POST_INGEST_DEAD_LETTER_PATH,
+                 replay_interval_seconds: float = settings.POST_INGEST_REPLAY_INTERVAL_SECONDS,
+                 session_factory: Optional[Callable] = None,
+                 on_flush: Optional[Callable[[list[dict[str, Any]]], None]] = None):
+        """Initializes the queue without starting the flusher.
+
+        Args:
+            maxsize (int): Maximum number of posts held in memory.
+            batch_size (int): Maximum number of posts committed per batch.
+            flush_interval_ms (int): Maximum time a batch is held open waiting for more posts.
+            spill_path (str): Path of the local spill file.
+            dead_letter_path (str): Path of the file receiving posts the database rejected.
+            replay_interval_seconds (float): How often the flusher replays the spill file.
+            session_factory (Optional[Callable]): Factory returning a new database session for
+                every batch. If None, batches are split per user shard and each part is
+                committed on its shard.
+            on_flush (Optional[Callable]): Called with each batch after it has been committed.
+        """
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.spill_path = spill_path
+        self.dead_letter_path = dead_letter_path
+        self.replay_interval = replay_interval_seconds
+        if session_factory is None:
+            self._shard_for, self._session_for = shard_map.shard_for, shard_map.session_for
+        else:
+            self._shard_for, self._session_for = (lambda user_id: 0), (lambda user_id: session_factory())
+        self._on_flush = on_flush
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._spill_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """bool: Whether the background flusher is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def qsize(self) -> int:
+        """Returns the approximate number of posts waiting to be flushed."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Replays any spilled posts and starts the background flusher."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._replay_spill()
+        self._thread = threading.Thread(target=self._run, name="post-ingest-flusher", daemon=True)
+        self._thread.start()
+        logger.info("Post ingest flusher started")
+
+    def stop(self) -> None:
+        """Stops the flusher, committing what it can and spilling the rest to disk."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        remaining = self._drain(self._queue.qsize())
+        while remaining:
+            batch, remaining = remaining[:self.batch_size], remaining[self.batch_size:]
+            self._flush(batch)
+        logger.info("Post ingest flusher stopped")
+
+    def submit(self, post: dict[str, Any]) -> None:
+        """Queues a post for a later batched commit.
+
+        Never blocks, since it is called from the event loop: a full queue is
+        rejected at once and the client is asked to retry.
+
+        Args:
+            post (dict[str, Any]): Post row with `id`, `user_id`, `text` and `created_at` keys.
+
+        Raises:
+            IngestQueueFull: If the queue is full.
+        """
+        try:
+            self._queue.put_nowait(post)
+        except queue.Full:
+            raise IngestQueueFull("Post ingestion queue is full")
+
+    def _run(self) -> None:
+        """Flusher loop: collects batches by size or time window and commits them.
+
+        Every `replay_interval` the spill file is replayed too, so posts spilled
+        during a database outage are committed once it recovers rather than at the
+        next restart.
+        """
+        next_replay = time.monotonic() + self.replay_interval
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            if time.monotonic() >= next_replay:
+                self._replay_spill()
+                next_replay = time.monotonic() + self.replay_interval
+
+    def _collect(self) -> list[dict[str, Any]]:
+        """Waits for the first post, then gathers more until the batch is full or the window closes."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> list[dict[str, Any]]:
+        """Removes up to `limit` posts from the queue without blocking."""
+        items = []
+        for _ in range(limit):
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _flush(self, batch: list[dict[str, Any]]) -> None:
+        """Commits a batch, one transaction per shard, so a failing shard does not hold back the others."""
+        by_shard: dict[int, list[dict[str, Any]]] = {}
+        for post in batch:
+            by_shard.setdefault(self._shard_for(post["user_id"]), []).append(post)
+        for posts in by_shard.values():
+            self._flush_shard(posts)
+
+    def _flush_shard(self, batch: list[dict[str, Any]]) -> None:
+        """Commits posts that all live on one shard.
+
+        If the batch commit fails, the posts are retried one at a time so a single
+        bad row does not take the rest of the batch down with it. A post that fails
+        on its own is spilled for replay if the database was unreachable, and
+        dead-lettered if the database rejected it.
+        """
+        db = self._session_for(batch[0]["user_id"])
+        committed: list[dict[str, Any]] = []
+        try:
+            try:
+                PostRepository.bulk_create(db, batch)
+                committed = batch
+            except Exception as e:
+                db.rollback()
+                if isinstance(e, _TRANSIENT_ERRORS):
+                    logger.error("Failed to flush %d queued posts, spilling to disk: %s", len(batch), e)
+                    self._spill(batch)
+                    return
+                logger.warning("Failed to flush %d queued posts, retrying one at a time: %s", len(batch), e)
+                committed = self._flush_rows(db, batch)
+        finally:
+            db.close()
+        if committed and self._on_flush is not None:
+            try:
+                self._on_flush(committed)
+            except Exception as e:
+                logger.error("Post ingest flush callback failed: %s", e)
+
+    def _flush_rows(self, db: Session, posts: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Commits posts one per transaction, spilling or dead-lettering those that fail.
+
+        Returns:
+            list[dict[str, Any]]: The posts that were committed.
+        """
+        committed, spilled, rejected = [], [], []
+        for i, post in enumerate(posts):
+            try:
+                PostRepository.bulk_create(db, [post])
+                committed.append(post)
+            except _TRANSIENT_ERRORS as e:
+                db.rollback()
+                logger.error("Database unavailable, spilling %d queued posts: %s", len(posts) - i, e)
+                spilled = posts[i:]
+                break
+            except Exception as e:
+                db.rollback()
+                logger.error("Queued post %s was rejected, moving it to the dead-letter file: %s", post["id"], e)
+                rejected.append(post)
+        if spilled:
+            self._spill(spilled)
+        if rejected:
+            self._write_lines(self.dead_letter_path, rejected)
+        return committed
+
+    def _spill(self, posts: Iterable[dict[str, Any]]) -> None:
+        """Appends posts to the spill file as JSON lines and fsyncs it."""
+        self._write_lines(self.spill_path, posts)
+
+    def _write_lines(self, path: str, posts: Iterable[dict[str, Any]]) -> None:
+        """Appends posts to a local file as JSON lines and fsyncs it."""
+        with self._spill_lock, open(path, "a", encoding="utf-8") as f:
+            for post in posts:
+                f.write(json.dumps({**post, "created_at": post["created_at"].isoformat()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_spill(self) -> None:
+        """Commits posts left in the spill file by a previous run, then removes it."""
+        if not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            with open(self.spill_path, encoding="utf-8") as f:
+                posts = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spill_path)
+        for post in posts:
+            post["created_at"] = datetime.datetime.fromisoformat(post["created_at"])
+        logger.info("Replaying %d spilled posts", len(posts))
+        for i in range(0, len(posts), self.batch_size):
+            self._flush(posts[i:i + self.batch_size])
@@ -0,0 +1,182 @@
+"""
+Background purge of soft-deleted posts.
+
+Deleting a post only sets its `deleted_at` tombstone, so the request does a
+single-row UPDATE instead of removing a large `Text` row under load. This worker
+hard-deletes tombstones later, in small batches with a pause between them so the
+purge rate stays bounded, and optionally only inside an off-peak window.
+
+The purge backlog (how many tombstones are waiting and how old the oldest is) is
+kept in `metrics()` and logged, so a purge that falls behind is visible. Each
+shard has its own purger.
+"""
+import argparse
+import datetime
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.config.sharding import shard_map
+from app.repositories.post_repository import PostRepository
+
+logger = logging.getLogger(__name__)
+
+
+def parse_window(window: str) -> Optional[tuple[datetime.time, datetime.time]]:
+    """Parses an 'HH:MM-HH:MM' window; returns None for an empty string.
+
+    Raises:
+        ValueError: If the window is not in 'HH:MM-HH:MM' form.
+    """
+    if not window:
+        return None
+    try:
+        start, end = (datetime.time.fromisoformat(part.strip()) for part in window.split("-"))
+    except ValueError:
+        raise ValueError(f"Invalid purge window {window!r}, expected 'HH:MM-HH:MM'")
+    return start, end
+
+
+class PostPurger:
+    """Rate-limited background worker that hard-deletes soft-deleted posts."""
+
+    def __init__(self,
+                 batch_size: int = settings.POST_PURGE_BATCH_SIZE,
+                 batch_interval_ms: int = settings.POST_PURGE_BATCH_INTERVAL_MS,
+                 idle_seconds: int = settings.POST_PURGE_IDLE_SECONDS,
+                 grace_seconds: int = settings.POST_PURGE_GRACE_SECONDS,
+                 window: str = settings.POST_PURGE_WINDOW,
+                 session_factory: Callable = SessionLocal,
+                 clock: Callable[[], datetime.datetime] = datetime.datetime.now):
+        """Initializes the purger without starting it.
+
+        Args:
+            batch_size (int): Posts hard-deleted per transaction.
+            batch_interval_ms (int): Pause between batches while a backlog is being drained.
+            idle_seconds (int): Pause when nothing is due or the window is closed.
+            grace_seconds (int): Minimum tombstone age before a post is purged.
+            window (str): Off-peak window as 'HH:MM-HH:MM' in local time; empty means always.
+            session_factory (Callable): Factory returning a new database session.
+            clock (Callable): Returns the current local time.
+        """
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval_ms / 1000
+        self.idle_seconds = idle_seconds
+        self.grace = datetime.timedelta(seconds=grace_seconds)
+        self.window = parse_window(window)
+        self._session_factory = session_factory
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics_lock = threading.Lock()
+        self._metrics: dict[str, Any] = {
+            "backlog": None, "oldest_tombstone_age_seconds": None, "purged_total": 0, "last_purge_at": None
+        }
+
+    @property
+    def running(self) -> bool:
+        """bool: Whether the background worker is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_window(self, now: datetime.datetime) -> bool:
+        """Whether `now` falls inside the purge window."""
+        if self.window is None:
+            return True
+        start, end = self.window
+        current = now.time()
+        if start <= end:
+            return start <= current < end
+        return current >= start or current < end
+
+    def metrics(self) -> dict[str, Any]:
+        """Returns the purge backlog and progress as of the last pass.
+
+        Returns:
+            dict[str, Any]: `backlog` (tombstones waiting), `oldest_tombstone_age_seconds`,
+            `purged_total` since start and `last_purge_at` (ISO 8601 or None).
+        """
+        with self._metrics_lock:
+            return dict(self._metrics)
+
+    def refresh_backlog(self) -> int:
+        """Re-counts waiting tombstones into the metrics. Returns the backlog size."""
+        with self._session_factory() as db:
+            count, oldest = PostRepository.tombstone_backlog(db)
+        age = (self._clock() - oldest).total_seconds() if oldest is not None else None
+        with self._metrics_lock:
+            self._metrics["backlog"] = count
+            self._metrics["oldest_tombstone_age_seconds"] = age
+        return count
+
+    def purge_batch(self) -> int:
+        """Hard-deletes one batch of tombstones older than the grace period.
+
+        Returns:
+            int: The number of posts purged.
+        """
+        now = self._clock()
+        with self._session_factory() as db:
+            purged = PostRepository.purge_tombstones(db, now - self.grace, self.batch_size)
+        if purged:
+            with self._metrics_lock:
+                self._metrics["purged_total"] += purged
+                self._metrics["last_purge_at"] = now.isoformat()
+        return purged
+
+    def start(self) -> None:
+        """Starts the background worker."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="post-purger", daemon=True)
+        self._thread.start()
+        logger.info("Post purge worker started")
+
+    def stop(self) -> None:
+        """Stops the worker after its current batch."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logger.info("Post purge worker stopped")
+
+    def _run(self) -> None:
+        """Worker loop: drains due tombstones batch by batch while inside the window."""
+        while not self._stop.is_set():
+            try:
+                pause = self._pass()
+            except Exception as e:
+                logger.error("Post purge failed: %s", e)
+                pause = self.idle_seconds
+            self._stop.wait(pause)
+
+    def _pass(self) -> float:
+        """Runs one batch if due and returns how long to pause before the next."""
+        if not self.in_window(self._clock()):
+            return self.idle_seconds
+        purged = self.purge_batch()
+        if purged == self.batch_size:
+            logger.debug("Purged %d soft-deleted posts", purged)
+            return self.batch_interval
+        backlog = self.refresh_backlog()
+        if purged or backlog:
+            logger.info("Post purge pass done: %d purged, %d tombstones waiting", purged, backlog)
+        return self.idle_seconds
+
+
+# One purger per shard, each walking only its own shard's tombstones
+post_purgers = [PostPurger(session_factory=sessions) for sessions in shard_map.sessions]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report or drain the soft-deleted post backlog.")
+    parser.add_argument("--drain", action="store_true", help="Purge all due tombstones now, ignoring the window")
+    args = parser.parse_args()
+    for shard, purger in enumerate(post_purgers):
+        if args.drain:
+            while purger.purge_batch() == purger.batch_size:
+                pass
+        purger.refresh_backlog()
+        print(f"shard {shard}: {purger.metrics()}")
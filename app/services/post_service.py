@@ -1,84 +1,619 @@
 """
 Service for post storage with DB and cache.
 """
+import asyncio
 import datetime
-from typing import Any
+import heapq
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
 from threading import Lock
+import anyio
 from app.repositories.post_repository import PostRepository
+from app.repositories.post_stats_repository import PostStatsRepository, text_bytes
+from app.services.post_ingest import PostIngestQueue
+from app.services.post_events import post_event_hub
 from sqlalchemy.orm import Session
+from app.config.sharding import shard_map
 from app.config.settings import settings
+from app.utils.compression import compress
+from app.utils.cache_snapshot import CacheSnapshot, Fingerprint, SnapshotEntry, write_snapshot
+from app.schemas.post import PostListResponse, post_list_adapter
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPost:
+    """Compact cache record for a post.
+
+    The owning user ID is the cache key, so it is not repeated per post, and the
+    timestamp stays a datetime until the post is serialized.
+    """
+    __slots__ = ("post_id", "text", "created_at")
+
+    def __init__(self, post_id: str, text: str, created_at: datetime.datetime):
+        self.post_id = post_id
+        self.text = text
+        self.created_at = created_at
+
+    def to_dict(self, user_id: int) -> dict[str, Any]:
+        """Returns the post in its API form.
+
+        Args:
+            user_id (int): The ID of the user owning the post.
+
+        Returns:
+            dict[str, Any]: The post data.
+        """
+        return {
+            "post_id": self.post_id,
+            "user_id": user_id,
+            "text": self.text,
+            "created_at": self.created_at.isoformat()
+        }
+
+
+def _serialize(user_id: int, posts: list[CachedPost]) -> list[dict[str, Any]]:
+    """Converts a user's cached records into post data dicts."""
+    return [p.to_dict(user_id) for p in posts]
+
+
+def render_post_list(user_id: int, posts: list[CachedPost],
+                     fast: bool = settings.FAST_SERIALIZATION) -> bytes:
+    """Renders the post listing response body as JSON.
+
+    The fast path hands the records to `post_list_adapter.dump_json` without
+    re-validating them, since they came from the database. With `fast` disabled the
+    body goes through full `PostListResponse` validation instead, for debugging.
+
+    Args:
+        user_id (int): The ID of the user owning the posts.
+        posts (list[CachedPost]): The user's cached records.
+        fast (bool): Whether to skip validation.
+
+    Returns:
+        bytes: The JSON body.
+    """
+    if fast:
+        return post_list_adapter.dump_json({
+            "status": "success",
+            "data": [
+                {"post_id": p.post_id, "user_id": user_id, "text": p.text, "created_at": p.created_at}
+                for p in posts
+            ],
+            "errors": None
+        })
+    envelope = {"status": "success", "data": _serialize(user_id, posts), "errors": None}
+    return PostListResponse.model_validate(envelope).model_dump_json().encode()
+
 
 # Add cache: user_id -> (timestamp, posts)
-cache_store: dict[int, tuple[datetime.datetime, list]] = {}
+cache_store: dict[int, tuple[datetime.datetime, list[CachedPost]]] = {}
+# Per-user version, bumped on every write that touches the user's posts
+cache_versions: dict[int, int] = {}
+# Version of users without an entry in `cache_versions`; raised past every pruned version
+# so a load started before its user was pruned never matches the user's version again
+_version_floor = 0
+# Encoded listing bodies: user_id -> (cached post list they were rendered from, encoding -> body)
+cache_bodies: dict[int, tuple[list[CachedPost], dict[Optional[str], bytes]]] = {}
 cache_lock = Lock()
+# Reads per user since the last cache snapshot, used to pick the hottest entries to save
+cache_hits: dict[int, int] = {}
+# Users with a background refresh scheduled or running
+cache_refreshing: set[int] = set()
+# Background refreshes are capped at this many concurrent DB fetches
+cache_refresher = ThreadPoolExecutor(max_workers=settings.CACHE_REFRESH_MAX_CONCURRENCY,
+                                     thread_name_prefix="post-cache-refresh")
+
+
+def _set_entry(user_id: int, ts: datetime.datetime, posts: list[CachedPost]) -> None:
+    """Replaces a user's cache entry and drops bodies rendered from the previous one.
+
+    Must be called with `cache_lock` held.
+    """
+    cache_store[user_id] = (ts, posts)
+    cache_bodies.pop(user_id, None)
+
+
+def _version(user_id: int) -> int:
+    """Returns the cache version for a user. Must be called with `cache_lock` held."""
+    return cache_versions.get(user_id, _version_floor)
+
+
+def _bump_version(user_id: int) -> None:
+    """Increments the cache version for a user. Must be called with `cache_lock` held."""
+    cache_versions[user_id] = _version(user_id) + 1
+
+
+def _cache_prepend(user_id: int, post: CachedPost) -> None:
+    """Prepends a new post to a user's cached list, keeping the entry's timestamp.
+
+    The cached list is replaced rather than mutated so callers still holding the
+    previous list never see it change. If the entry was rebuilt after the post was
+    committed, the post is already at its head and is not added twice.
+    Must be called with `cache_lock` held.
+
+    Args:
+        user_id (int): The ID of the user whose entry is updated.
+        post (CachedPost): The new post.
+    """
+    _bump_version(user_id)
+    if user_id not in cache_store:
+        return
+    ts, cached = cache_store[user_id]
+    if cached and cached[0].post_id == post.post_id:
+        return
+    _set_entry(user_id, ts, [post] + cached)
+
+
+def _cache_remove(user_id: int, post_id: str) -> None:
+    """Removes a post from a user's cached list, keeping the entry's timestamp.
+
+    Must be called with `cache_lock` held.
+
+    Args:
+        user_id (int): The ID of the user whose entry is updated.
+        post_id (str): The ID of the removed post.
+    """
+    _bump_version(user_id)
+    if user_id in cache_store:
+        ts, posts = cache_store[user_id]
+        _set_entry(user_id, ts, [p for p in posts if p.post_id != post_id])
+
+
+def _load_posts(db: Session, user_id: int) -> list[CachedPost]:
+    """Fetches a user's posts from the database in their cached form."""
+    return [CachedPost(*row) for row in PostRepository.get_rows_by_user(db, user_id)]
+
+
+def _cache_store_if_current(user_id: int, version: int, ts: datetime.datetime,
+                            posts: list[CachedPost]) -> None:
+    """Stores freshly loaded posts unless a write touched the user while they were loading.
+
+    Must be called with `cache_lock` held.
+    """
+    if _version(user_id) == version:
+        _set_entry(user_id, ts, posts)
+
+
+def _refresh(user_id: int, version: int) -> None:
+    """Reloads a user's posts on a background thread with its own session on the user's shard."""
+    try:
+        now = datetime.datetime.now()
+        db = shard_map.session_for(user_id)
+        try:
+            posts = _load_posts(db, user_id)
+        finally:
+            db.close()
+        with cache_lock:
+            _cache_store_if_current(user_id, version, now, posts)
+    except Exception as e:
+        logger.error("Background cache refresh failed for user %s: %s", user_id, e)
+    finally:
+        with cache_lock:
+            cache_refreshing.discard(user_id)
+
+
+def _schedule_refresh(user_id: int) -> None:
+    """Schedules a single background refresh for a user. Must be called with `cache_lock` held."""
+    if user_id in cache_refreshing:
+        return
+    cache_refreshing.add(user_id)
+    try:
+        cache_refresher.submit(_refresh, user_id, _version(user_id))
+    except RuntimeError:
+        # Executor already shut down
+        cache_refreshing.discard(user_id)
+
+
+def _cached_posts(db: Session, user_id: int,
+                  cache_minutes: int = settings.CACHE_EXPIRE_MINUTES,
+                  stale_minutes: int = settings.CACHE_STALE_GRACE_MINUTES,
+                  refresh_ahead_seconds: int = settings.CACHE_REFRESH_AHEAD_SECONDS) -> list[CachedPost]:
+    """Returns a user's cached post records, loading or refreshing them as needed.
+
+    See `PostService.get_posts` for the freshness rules.
+    """
+    now = datetime.datetime.now()
+    ttl = datetime.timedelta(minutes=cache_minutes)
+    with cache_lock:
+        cache_hits[user_id] = cache_hits.get(user_id, 0) + 1
+        if user_id in cache_store:
+            ts, posts = cache_store[user_id]
+            age = now - ts
+            if age < ttl:
+                if refresh_ahead_seconds and age >= ttl - datetime.timedelta(seconds=refresh_ahead_seconds):
+                    _schedule_refresh(user_id)
+                return posts
+            if age < ttl + datetime.timedelta(minutes=stale_minutes):
+                _schedule_refresh(user_id)
+                return posts
+        version = _version(user_id)
+
+    # Cache miss or expired: fetch from DB, then end the read transaction so the
+    # connection goes back to the pool before the response is rendered
+    posts = _load_posts(db, user_id)
+    db.rollback()
+    with cache_lock:
+        _cache_store_if_current(user_id, version, now, posts)
+    return posts
+
+
+def _cached_body(user_id: int, posts: list[CachedPost],
+                 encoding: Optional[str]) -> tuple[Optional[bytes], Optional[bytes]]:
+    """Looks up the rendered bodies kept for `posts`.
+
+    Returns:
+        tuple[Optional[bytes], Optional[bytes]]: (body in `encoding`, uncompressed body), each None if not kept.
+    """
+    with cache_lock:
+        entry = cache_bodies.get(user_id)
+        variants = entry[1] if entry is not None and entry[0] is posts else {}
+        return variants.get(encoding), variants.get(None)
+
+
+def _estimated_body_size(posts: list[CachedPost]) -> int:
+    """Approximate size of the rendered listing: post text plus per-post JSON overhead."""
+    return sum(len(p.text) for p in posts) + 128 * len(posts)
+
+
+def _encode_body(user_id: int, posts: list[CachedPost], raw: Optional[bytes], encoding: Optional[str],
+                 min_compress_size: int) -> tuple[bytes, bytes, Optional[str]]:
+    """Renders (unless `raw` is given) and compresses a listing body.
+
+    Returns:
+        tuple[bytes, bytes, Optional[str]]: (body, uncompressed body, encoding applied or None)
+    """
+    if raw is None:
+        raw = render_post_list(user_id, posts)
+    if encoding is None or len(raw) < min_compress_size:
+        return raw, raw, None
+    return compress(raw, encoding), raw, encoding
+
+
+def _store_body(user_id: int, posts: list[CachedPost], raw: bytes, body: bytes, encoding: Optional[str]) -> None:
+    """Keeps rendered bodies next to the cached list, unless the list changed meanwhile."""
+    with cache_lock:
+        current = cache_store.get(user_id)
+        if current is not None and current[1] is posts:
+            entry = cache_bodies.get(user_id)
+            if entry is None or entry[0] is not posts:
+                entry = (posts, {})
+                cache_bodies[user_id] = entry
+            entry[1][None] = raw
+            entry[1][encoding] = body
+
+
+def _cache_flushed(batch: list[dict[str, Any]]) -> None:
+    """Adds posts committed by the write-behind flusher to their users' cached lists.
+
+    Queued posts only reach the cache and the users' streams from here, once
+    their commit has succeeded, so a batch that fails and is spilled is never
+    served as if it were stored.
+    """
+    by_user: dict[int, list[CachedPost]] = {}
+    for row in sorted(batch, key=lambda r: r["created_at"], reverse=True):
+        by_user.setdefault(row["user_id"], []).append(CachedPost(row["id"], row["text"], row["created_at"]))
+    with cache_lock:
+        for user_id, posts in by_user.items():
+            _bump_version(user_id)
+            if user_id in cache_store:
+                ts, cached = cache_store[user_id]
+                cached_ids = {p.post_id for p in cached}
+                posts = [p for p in posts if p.post_id not in cached_ids]
+                if posts:
+                    _set_entry(user_id, ts, posts + cached)
+    for user_id, posts in by_user.items():
+        for post in reversed(posts):
+            post_event_hub.publish(user_id, "post_created", post.to_dict(user_id))
+
+
+def prune_cache(cache_minutes: int = settings.CACHE_EXPIRE_MINUTES,
+                stale_minutes: int = settings.CACHE_STALE_GRACE_MINUTES) -> int:
+    """Drops cache entries past their stale grace, with every other per-user record.
+
+    Such entries are never served again, only reloaded, so dropping them frees
+    their memory without costing a query. Versions and read counts are then kept
+    only for users that still have an entry, so neither grows with every user
+    who ever posted or read.
+
+    Args:
+        cache_minutes (int): Cache expiration time in minutes.
+        stale_minutes (int): Minutes past expiry an entry may still be served.
+
+    Returns:
+        int: The number of cache entries dropped.
+    """
+    global _version_floor
+    cutoff = datetime.datetime.now() - datetime.timedelta(minutes=cache_minutes + stale_minutes)
+    with cache_lock:
+        expired = [user_id for user_id, (ts, _) in cache_store.items() if ts <= cutoff]
+        for user_id in expired:
+            del cache_store[user_id]
+            cache_bodies.pop(user_id, None)
+        pruned = [user_id for user_id in cache_versions if user_id not in cache_store]
+        if pruned:
+            _version_floor = max(_version_floor, *(cache_versions[user_id] for user_id in pruned)) + 1
+            for user_id in pruned:
+                del cache_versions[user_id]
+        for user_id in [user_id for user_id in cache_hits if user_id not in cache_store]:
+            del cache_hits[user_id]
+    return len(expired)
+
+
+async def prune_cache_periodically(interval: float = settings.CACHE_PRUNE_INTERVAL_SECONDS) -> None:
+    """Prunes the cache every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await anyio.to_thread.run_sync(prune_cache)
+        except Exception as e:
+            logger.error("Cache prune failed: %s", e)
+
+
+# Fingerprint of a user without a counters row
+_NO_POSTS = Fingerprint(0, 0, None)
+
+
+def _fingerprint(posts: list[CachedPost]) -> Fingerprint:
+    """Summarizes cached posts the way the user's post counters do."""
+    return Fingerprint(
+        len(posts),
+        sum(text_bytes(p.text) for p in posts),
+        max((p.created_at for p in posts), default=None)
+    )
+
+
+def snapshot_cache(path: str = settings.CACHE_SNAPSHOT_PATH,
+                   max_users: int = settings.CACHE_SNAPSHOT_MAX_USERS) -> int:
+    """Saves the most-read users' cached post lists to a snapshot file.
+
+    Users are ranked by reads since the previous snapshot; the counts are then
+    halved, so the ranking follows recent traffic. Cached lists are never mutated
+    in place, so they are only referenced under `cache_lock` and encoded after it
+    is released.
+
+    Args:
+        path (str): The snapshot file.
+        max_users (int): Maximum users saved.
+
+    Returns:
+        int: The number of users saved.
+    """
+    with cache_lock:
+        hottest = heapq.nlargest(max_users, (u for u in cache_hits if u in cache_store), key=cache_hits.__getitem__)
+        entries = [(user_id, cache_store[user_id][1]) for user_id in hottest]
+        for user_id, hits in list(cache_hits.items()):
+            if hits > 1:
+                cache_hits[user_id] = hits // 2
+            else:
+                del cache_hits[user_id]
+    return write_snapshot(path, (
+        (user_id, _fingerprint(posts), [(p.post_id, p.text, p.created_at) for p in posts])
+        for user_id, posts in entries
+    ))
+
+
+def restore_cache(path: str = settings.CACHE_SNAPSHOT_PATH,
+                  batch_size: int = settings.CACHE_SNAPSHOT_RESTORE_BATCH) -> int:
+    """Warms the cache from a snapshot, keeping only entries that still match the database.
+
+    A saved list is restored only if its post count, total text size and newest
+    post time equal the user's post counters, read in batches of primary-key
+    lookups per shard instead of one listing query per user. Users already cached,
+    or whose version changed while their batch was validated, are left alone.
+
+    Args:
+        path (str): The snapshot file.
+        batch_size (int): Users validated per query.
+
+    Returns:
+        int: The number of users restored.
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        snapshot = CacheSnapshot(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring cache snapshot: %s", e)
+        return 0
+    restored = 0
+    with snapshot:
+        by_shard: dict[int, list[SnapshotEntry]] = {}
+        for entry in snapshot.entries():
+            by_shard.setdefault(shard_map.shard_for(entry.user_id), []).append(entry)
+        try:
+            for shard, entries in by_shard.items():
+                for i in range(0, len(entries), batch_size):
+                    restored += _restore_batch(snapshot, shard, entries[i:i + batch_size])
+        except Exception as e:
+            logger.error("Cache snapshot restore stopped after %d users: %s", restored, e)
+            return restored
+    logger.info("Restored %d of %d cached users from snapshot", restored, snapshot.count)
+    return restored
+
+
+def _restore_batch(snapshot: CacheSnapshot, shard: int, batch: list[SnapshotEntry]) -> int:
+    """Validates a batch of one shard's snapshot entries and caches those still current."""
+    with cache_lock:
+        versions = {e.user_id: _version(e.user_id) for e in batch}
+    with shard_map.sessions[shard]() as db:
+        stats = {
+            s.user_id: Fingerprint(s.post_count, s.total_bytes, s.last_post_at)
+            for s in PostStatsRepository.get_many(db, list(versions))
+        }
+    now = datetime.datetime.now()
+    valid = [
+        (e.user_id, [CachedPost(*row) for row in snapshot.posts(e)])
+        for e in batch if stats.get(e.user_id, _NO_POSTS) == e.fingerprint
+    ]
+    restored = 0
+    with cache_lock:
+        for user_id, posts in valid:
+            if user_id not in cache_store and _version(user_id) == versions[user_id]:
+                _set_entry(user_id, now, posts)
+                restored += 1
+    return restored
+
+
+async def snapshot_periodically(interval: float = settings.CACHE_SNAPSHOT_INTERVAL_SECONDS,
+                                path: str = settings.CACHE_SNAPSHOT_PATH) -> None:
+    """Snapshots the cache every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await anyio.to_thread.run_sync(snapshot_cache, path)
+        except Exception as e:
+            logger.error("Cache snapshot failed: %s", e)
+
+
+# Write-behind queue used when POST_WRITE_BEHIND is enabled
+ingest_queue = PostIngestQueue(on_flush=_cache_flushed)
+
 
 class PostService:
     """Provides methods to create, retrieve, and delete posts using the database and in-memory cache."""
 
     @staticmethod
-    def add_post(db: Session, user_id: int, text: str) -> dict[str, Any]:
-        """Creates a new post for a user, stores it in the database, and invalidates the user's cache.
+    def add_post(db: Session, user_id: int, text: str,
+                 write_behind: bool = settings.POST_WRITE_BEHIND) -> dict[str, Any]:
+        """Creates a new post for a user, stores it in the database, and adds it to the user's cache.
+
+        The post is prepended to the cached list in place of invalidating it, so the
+        next read stays a cache hit, and a `post_created` event is published to the
+        user's open streams. In write-behind mode the post is assigned its ID
+        and timestamp here and queued for a batched commit instead; it is added
+        to the cache and published only after that commit succeeds.
 
         Args:
             db (Session): The database session used for creating the post.
             user_id (int): The ID of the user creating the post.
             text (str): The content of the post.
+            write_behind (bool): Whether to queue the post instead of committing it inline.
 
         Returns:
             dict[str, Any]: The created post data.
+
+        Raises:
+            IngestQueueFull: If the post is queued and the ingestion queue is full.
         """
-        post_obj = PostRepository.create(db, user_id, text)
-        post = {
-            "post_id": post_obj.id,
-            "user_id": post_obj.user_id,
-            "text": post_obj.text,
-            "created_at": post_obj.created_at.isoformat()
-        }
+        if write_behind:
+            row = {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "text": text,
+                "created_at": datetime.datetime.now()
+            }
+            ingest_queue.submit(row)
+            # Cached and published by `_cache_flushed` once the flusher has committed it
+            return CachedPost(row["id"], text, row["created_at"]).to_dict(user_id)
 
-        # Invalidate cache for this user
+        post_obj = PostRepository.create(db, user_id, text)
+        record = CachedPost(post_obj.id, post_obj.text, post_obj.created_at)
         with cache_lock:
-            if user_id in cache_store:
-                del cache_store[user_id]
+            _cache_prepend(user_id, record)
+        post = record.to_dict(user_id)
+        post_event_hub.publish(user_id, "post_created", post)
         return post
 
     @staticmethod
     def get_posts(db: Session, user_id: int,
-                  cache_minutes: int = settings.CACHE_EXPIRE_MINUTES) -> list[dict[str, Any]]:
+                  cache_minutes: int = settings.CACHE_EXPIRE_MINUTES,
+                  stale_minutes: int = settings.CACHE_STALE_GRACE_MINUTES,
+                  refresh_ahead_seconds: int = settings.CACHE_REFRESH_AHEAD_SECONDS) -> list[dict[str, Any]]:
         """Retrieves all posts for a user, using the cache if available and valid.
 
+        Entries past their validity period but within the stale grace window are
+        served as-is while a single background task reloads them. Fresh entries that
+        are read within `refresh_ahead_seconds` of expiring are refreshed the same way,
+        so hot users never expire. Only a miss or a fully expired entry waits on the DB,
+        and that fetch runs outside `cache_lock`. Cached records are turned into dicts
+        only here, after the lock is released.
+
         Args:
             db (Session): The database session used for fetching posts.
             user_id (int): The ID of the user whose posts are being fetched.
             cache_minutes (int): The cache validity period in minutes (from env).
+            stale_minutes (int): How long past expiry a stale entry may still be served.
+            refresh_ahead_seconds (int): How long before expiry a read triggers a refresh (0 disables).
 
         Returns:
             list[dict[str, Any]]: A list of post data for the user.
         """
-        now = datetime.datetime.now()
-        with cache_lock:
-            if user_id in cache_store:
-                ts, posts = cache_store[user_id]
-                if now - ts < datetime.timedelta(minutes=cache_minutes):
-                    return posts
-
-            # Cache miss or expired: fetch from DB
-            post_objs = PostRepository.get_by_user(db, user_id)
-            posts = [
-                {
-                    "post_id": p.id,
-                    "user_id": p.user_id,
-                    "text": p.text,
-                    "created_at": p.created_at.isoformat()
-                }
-                for p in post_objs
-            ]
-            cache_store[user_id] = (now, posts)
-            return posts
+        posts = _cached_posts(db, user_id, cache_minutes, stale_minutes, refresh_ahead_seconds)
+        return _serialize(user_id, posts)
+
+    @staticmethod
+    def get_posts_body(db: Session, user_id: int, encoding: Optional[str] = None,
+                       min_compress_size: int = settings.COMPRESSION_MIN_SIZE) -> tuple[bytes, Optional[str]]:
+        """Returns the JSON body of a user's post listing response, optionally compressed.
+
+        Rendered bodies are kept next to the cached post list, one per encoding, and
+        are dropped whenever the list changes, so repeated reads cost no serialization
+        or compression CPU. Cache freshness follows `get_posts`.
+
+        Args:
+            db (Session): The database session used for fetching posts.
+            user_id (int): The ID of the user whose posts are being fetched.
+            encoding (Optional[str]): The negotiated content encoding, or None for identity.
+            min_compress_size (int): Bodies smaller than this are returned uncompressed.
+
+        Returns:
+            tuple[bytes, Optional[str]]: (response body, content encoding applied or None)
+        """
+        posts = _cached_posts(db, user_id)
+        body, raw = _cached_body(user_id, posts, encoding)
+        if body is not None:
+            return body, encoding
+        body, raw, encoding = _encode_body(user_id, posts, raw, encoding, min_compress_size)
+        _store_body(user_id, posts, raw, body, encoding)
+        return body, encoding
+
+    @staticmethod
+    async def get_posts_body_async(db: Session, user_id: int, encoding: Optional[str] = None,
+                                   min_compress_size: int = settings.COMPRESSION_MIN_SIZE,
+                                   offload_size: int = settings.COMPRESSION_OFFLOAD_SIZE
+                                   ) -> tuple[bytes, Optional[str]]:
+        """`get_posts_body` for async handlers, rendering and compressing large bodies in a worker thread.
+
+        Like `CompressionMiddleware`, bodies expected to reach `offload_size` bytes are
+        rendered and compressed off the event loop; smaller ones inline, where a thread
+        hop would cost more than the work.
+
+        Args:
+            db (Session): The database session used for fetching posts.
+            user_id (int): The ID of the user whose posts are being fetched.
+            encoding (Optional[str]): The negotiated content encoding, or None for identity.
+            min_compress_size (int): Bodies smaller than this are returned uncompressed.
+            offload_size (int): Bodies at least this large are rendered and compressed in a thread.
+
+        Returns:
+            tuple[bytes, Optional[str]]: (response body, content encoding applied or None)
+        """
+        posts = _cached_posts(db, user_id)
+        body, raw = _cached_body(user_id, posts, encoding)
+        if body is not None:
+            return body, encoding
+        size = len(raw) if raw is not None else _estimated_body_size(posts)
+        if size >= offload_size:
+            body, raw, encoding = await anyio.to_thread.run_sync(
+                _encode_body, user_id, posts, raw, encoding, min_compress_size
+            )
+        else:
+            body, raw, encoding = _encode_body(user_id, posts, raw, encoding, min_compress_size)
+        _store_body(user_id, posts, raw, body, encoding)
+        return body, encoding
 
     @staticmethod
     def delete_post(db: Session, user_id: int, post_id: str) -> bool:
         """Deletes a post by ID for a user from both the database and the cache.
 
+        The post is soft-deleted: it disappears from every read immediately and its
+        row is hard-deleted later by the background purge worker. A `post_deleted`
+        event is published to the user's open streams.
+
         Args:
             db (Session): The database session used for deletion.
             user_id (int): The ID of the user who owns the post.
@@ -90,9 +625,8 @@ class PostService:
         deleted = PostRepository.delete(db, user_id, post_id)
 
         # Remove post from memory cache if present
-        with cache_lock:
-            if user_id in cache_store:
-                ts, posts = cache_store[user_id]
-                filtered_posts = [p for p in posts if p.get("post_id") != post_id]
-                cache_store[user_id] = (ts, filtered_posts)
+        if deleted:
+            with cache_lock:
+                _cache_remove(user_id, post_id)
+            post_event_hub.publish(user_id, "post_deleted", {"post_id": post_id})
         return deleted
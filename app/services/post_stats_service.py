@@ -0,0 +1,100 @@
+"""
+Service for per-user post counters and their reconciliation job.
+"""
+import argparse
+import logging
+from typing import Any, Callable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.config.sharding import shard_map
+from app.models.user import User
+from app.repositories.post_stats_repository import PostStatsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PostStatsService:
+    """Provides read access to per-user post counters and repairs counter drift."""
+
+    @staticmethod
+    def get_stats(db: Session, user_id: int) -> dict[str, Any]:
+        """Returns a user's post count, total text size and last post time.
+
+        A single primary-key lookup; users who never posted have no row and get zeros.
+
+        Args:
+            db (Session): The database session used for the lookup.
+            user_id (int): The ID of the user.
+
+        Returns:
+            dict[str, Any]: `post_count`, `total_bytes` and `last_post_at` (ISO 8601 or None).
+        """
+        stats = PostStatsRepository.get(db, user_id)
+        if stats is None:
+            return {"post_count": 0, "total_bytes": 0, "last_post_at": None}
+        return {
+            "post_count": stats.post_count,
+            "total_bytes": stats.total_bytes,
+            "last_post_at": stats.last_post_at.isoformat() if stats.last_post_at else None
+        }
+
+    @staticmethod
+    def reconcile(session_factory: Callable[[], Session] = SessionLocal, batch_size: int = 500) -> int:
+        """Recomputes counters from the live (not soft-deleted) posts and fixes any that drifted.
+
+        Users are walked in ID order, `batch_size` at a time, each batch in its own
+        short transaction. The batch's counter rows are locked while one grouped
+        aggregate over the stored `text_size` recomputes them, so no post text is
+        read and posts written concurrently are not lost.
+
+        Args:
+            session_factory (Callable[[], Session]): Factory returning a new database session.
+            batch_size (int): Users recomputed per transaction.
+
+        Returns:
+            int: The number of users whose counters were corrected.
+        """
+        fixed = 0
+        last_user_id = 0
+        while True:
+            with session_factory() as db:
+                user_ids = db.scalars(
+                    select(User.id).where(User.id > last_user_id).order_by(User.id).limit(batch_size)
+                ).all()
+                if not user_ids:
+                    return fixed
+                # Lock the stored counters first: a concurrent insert or delete blocks on its
+                # counter update until this batch commits, and so is either already in the
+                # aggregate below or applied on top of the corrected row afterwards.
+                stored = {
+                    s.user_id: (s.post_count, s.total_bytes, s.last_post_at)
+                    for s in PostStatsRepository.get_many(db, list(user_ids), for_update=True)
+                }
+                actual = PostStatsRepository.live_totals(db, list(user_ids))
+                drifted = []
+                for user_id in user_ids:
+                    count, total_bytes, last_post_at = actual.get(user_id, (0, 0, None))
+                    if stored.get(user_id, (0, 0, None)) != (count, total_bytes, last_post_at):
+                        drifted.append({
+                            "user_id": user_id,
+                            "post_count": count,
+                            "total_bytes": total_bytes,
+                            "last_post_at": last_post_at,
+                        })
+                if drifted:
+                    PostStatsRepository.replace(db, drifted)
+                    db.commit()
+                    logger.info("Corrected post stats for %d users", len(drifted))
+            fixed += len(drifted)
+            last_user_id = user_ids[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute per-user post counters and fix drift.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    for shard, sessions in enumerate(shard_map.sessions):
+        print(f"shard {shard}: corrected {PostStatsService.reconcile(sessions, args.batch_size)} users")
@@ -0,0 +1,88 @@
+import datetime
+
+import pytest
+
+from app.config.database import Base, create_db_engine
+from app.config.sharding import ShardMap
+from app.models.user import User
+from app.repositories.post_repository import PostRepository
+from app.services import post_service
+from app.services.post_service import PostService, restore_cache, snapshot_cache
+from app.utils.cache_snapshot import CacheSnapshot, Fingerprint, write_snapshot
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    shards = ShardMap([engine], engine)
+    with shards.sessions[0]() as db:
+        db.add_all([User(id=1, email="a@b.com", password="x"), User(id=2, email="c@d.com", password="x")])
+        db.commit()
+    monkeypatch.setattr("app.services.post_service.shard_map", shards)
+    _fresh_cache(monkeypatch)
+    return shards
+
+
+def _fresh_cache(monkeypatch):
+    for name in ("cache_store", "cache_versions", "cache_bodies", "cache_hits"):
+        monkeypatch.setattr(f"app.services.post_service.{name}", {})
+
+
+def test_snapshot_file_round_trips_posts(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    created = datetime.datetime(2030, 1, 2, 3, 4, 5, 678901)
+    write_snapshot(path, [
+        (7, Fingerprint(2, 9, created), [("p2", "héllo", created), ("p1", "", datetime.datetime(1999, 1, 1))]),
+        (8, Fingerprint(0, 0, None), []),
+    ])
+
+    with CacheSnapshot(path) as snapshot:
+        first, second = snapshot.entries()
+        assert (first.user_id, first.fingerprint) == (7, Fingerprint(2, 9, created))
+        assert snapshot.posts(first) == [("p2", "héllo", created), ("p1", "", datetime.datetime(1999, 1, 1))]
+        assert second.fingerprint.last_post_at is None and snapshot.posts(second) == []
+
+
+def test_corrupt_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "cache.snapshot"
+    write_snapshot(str(path), [(1, Fingerprint(1, 1, None), [("p", "x", datetime.datetime(2030, 1, 1))])])
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        CacheSnapshot(str(path))
+    assert restore_cache(str(path)) == 0
+
+
+def test_restore_skips_users_changed_since_the_snapshot(shards, tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.snapshot")
+    with shards.sessions[0]() as db:
+        for user_id in (1, 2):
+            PostRepository.create(db, user_id, f"first post of {user_id}")
+            PostService.get_posts(db, user_id)
+        expected = PostService.get_posts(db, 1)
+        assert snapshot_cache(path) == 2
+
+        _fresh_cache(monkeypatch)
+        PostRepository.create(db, 2, "written after the snapshot")
+
+    assert restore_cache(path) == 1
+    assert set(post_service.cache_store) == {1}
+    with shards.sessions[0]() as db:
+        assert PostService.get_posts(db, 1) == expected
+
+
+def test_snapshot_keeps_the_most_read_users(shards, tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    with shards.sessions[0]() as db:
+        for user_id, reads in ((1, 1), (2, 3)):
+            PostRepository.create(db, user_id, "post")
+            for _ in range(reads):
+                PostService.get_posts(db, user_id)
+
+    assert snapshot_cache(path, max_users=1) == 1
+    with CacheSnapshot(path) as snapshot:
+        assert [e.user_id for e in snapshot.entries()] == [2]
+    assert post_service.cache_hits == {2: 1}
@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware
+from app.services.post_service import PostService, CachedPost
+from app.utils.compression import negotiate
+
+
+def test_negotiate_honours_q_values_and_wildcard():
+    assert negotiate(None) is None
+    assert negotiate("identity") is None
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") is not None
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, offload_size=1000)
+
+    @app.get("/small")
+    async def small():
+        return {"a": 1}
+
+    @app.get("/large")
+    async def large():
+        return {"text": "x" * 5000}
+
+    @app.get("/image")
+    async def image():
+        return PlainTextResponse("x" * 5000, media_type="image/png")
+
+    return app
+
+
+def test_middleware_compresses_large_json_only():
+    client = TestClient(make_app())
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    large = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in large.headers["vary"]
+    assert large.json() == {"text": "x" * 5000}
+
+    image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+
+
+def test_get_posts_body_reuses_compressed_variant(monkeypatch):
+    user_id = 9
+    posts = [CachedPost(str(i), "text " * 100, datetime(2025, 6, 10)) for i in range(5)]
+    monkeypatch.setattr("app.services.post_service.cache_store", {user_id: (datetime.now(), posts)})
+    monkeypatch.setattr("app.services.post_service.cache_bodies", {})
+    calls = []
+
+    def counting_compress(data, encoding):
+        calls.append(encoding)
+        return gzip.compress(data)
+
+    monkeypatch.setattr("app.services.post_service.compress", counting_compress)
+
+    body, encoding = PostService.get_posts_body(None, user_id, "gzip", min_compress_size=10)
+    again, _ = PostService.get_posts_body(None, user_id, "gzip", min_compress_size=10)
+
+    assert encoding == "gzip" and again is body
+    assert calls == ["gzip"]
+    payload = json.loads(gzip.decompress(body))
+    assert payload["status"] == "success" and len(payload["data"]) == 5
+    assert payload["data"][0]["user_id"] == user_id
+
+    raw, encoding = PostService.get_posts_body(None, user_id, None)
+    assert encoding is None and json.loads(raw) == payload
+
+
+
+def test_large_listing_bodies_are_encoded_off_the_event_loop(monkeypatch):
+    user_id = 10
+    posts = [CachedPost(str(i), "text " * 100, datetime(2025, 6, 10)) for i in range(5)]
+    monkeypatch.setattr("app.services.post_service.cache_store", {user_id: (datetime.now(), posts)})
+    monkeypatch.setattr("app.services.post_service.cache_bodies", {})
+    threads = []
+
+    async def run_sync(fn, *args):
+        threads.append(fn.__name__)
+        return fn(*args)
+
+    monkeypatch.setattr("app.services.post_service.anyio.to_thread.run_sync", run_sync)
+
+    async def scenario():
+        small = await PostService.get_posts_body_async(None, user_id, None, offload_size=1 << 20)
+        large = await PostService.get_posts_body_async(None, user_id, "gzip", min_compress_size=10, offload_size=100)
+        return small, large
+
+    (raw, _), (body, encoding) = asyncio.run(scenario())
+    assert threads == ["_encode_body"]
+    assert encoding == "gzip" and gzip.decompress(body) == raw
@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base, create_db_engine, get_db
+from app.config.settings import Settings
+from app.config.sharding import get_user_db
+
+DB_FIELDS = ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD")
+
+
+def test_settings_need_only_database_url_for_sqlite(monkeypatch):
+    for name in DB_FIELDS + ("DATABASE_URL",):
+        monkeypatch.delenv(name, raising=False)
+    config = Settings(_env_file=None, DATABASE_URL="sqlite://")
+    assert config.DATABASE_URL == "sqlite://" and config.DB_HOST is None
+
+    mysql = Settings(_env_file=None, DATABASE_URL="", DB_HOST="db", DB_PORT="3306", DB_NAME="blog",
+                     DB_USER="u", DB_PASSWORD="p")
+    assert mysql.DATABASE_URL.startswith("mysql+pymysql://u:p@db:3306/blog?")
+
+    with pytest.raises(ValidationError, match="Set DATABASE_URL"):
+        Settings(_env_file=None, DATABASE_URL="", DB_HOST="db", DB_PORT="")
+
+
+def test_sqlite_memory_engine_shares_one_connection():
+    engine = create_db_engine("sqlite://")
+    assert isinstance(engine.pool, StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+
+
+def test_sqlite_file_engine_uses_wal(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_full_app_runs_on_in_memory_sqlite():
+    from main import app
+
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def sqlite_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = app.dependency_overrides[get_user_db] = sqlite_db
+    try:
+        client = TestClient(app)
+        signup = client.post("/api/v1/auth/signup", json={"email": "int@example.com", "password": "Passw0rd!x"})
+        assert signup.status_code == 201
+        headers = {"Authorization": f"Bearer {signup.json()['data']['token']}"}
+
+        created = client.post("/api/v1/posts/", json={"text": "hello"}, headers=headers)
+        assert created.status_code == 201
+        listing = client.get("/api/v1/posts/", headers=headers)
+        assert [p["text"] for p in listing.json()["data"]] == ["hello"]
+        stats = client.get("/api/v1/posts/stats", headers=headers).json()["data"]
+        assert stats["post_count"] == 1 and stats["total_bytes"] == 5
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_user_db, None)
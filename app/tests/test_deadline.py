@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.config.database import _mysql_execution_time_hint, create_db_engine
+from app.middleware.deadline import DeadlineMiddleware
+from app.utils.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope, parse_budgets
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) SELECT count(*) FROM c"
+)
+
+
+def test_parse_budgets_orders_longest_prefix_first():
+    rules = parse_budgets("GET /api/v1/posts=3000, get /api/v1/posts/stream=0")
+    assert rules == (("GET", "/api/v1/posts/stream", 0), ("GET", "/api/v1/posts", 3000))
+    middleware = DeadlineMiddleware(None, default_ms=500, routes="GET /api/v1/posts=3000,GET /api/v1/posts/stream=0")
+    assert middleware.budget_ms("GET", "/api/v1/posts/stream") == 0
+    assert middleware.budget_ms("GET", "/api/v1/posts/") == 3000
+    assert middleware.budget_ms("POST", "/api/v1/posts/") == 500
+    with pytest.raises(ValueError):
+        parse_budgets("GET /api/v1/posts=soon")
+
+
+def test_deadline_expires_and_cancels():
+    now = [100.0]
+    deadline = Deadline(2.0, clock=lambda: now[0])
+    assert deadline.remaining() == 2.0 and not deadline.expired()
+    now[0] = 102.5
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+    unlimited = Deadline(None)
+    assert unlimited.remaining() is None and not unlimited.expired()
+    unlimited.cancel()
+    assert unlimited.expired()
+
+
+def test_sqlite_statement_is_interrupted_at_the_deadline():
+    engine = create_db_engine("sqlite://")
+    with deadline_scope(Deadline(0.1)):
+        with pytest.raises(DeadlineExceeded):
+            with engine.connect() as conn:
+                conn.execute(SLOW_QUERY)
+
+    cancelled = Deadline(None)
+    cancelled.cancel()
+    with deadline_scope(cancelled):
+        with pytest.raises(DeadlineExceeded):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+    # Outside a request the same connection runs without a limit
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    assert current_deadline() is None
+
+
+def test_mysql_selects_get_the_remaining_time_as_a_hint():
+    now = [0.0]
+    with deadline_scope(Deadline(1.5, clock=lambda: now[0])):
+        statement, _ = _mysql_execution_time_hint(None, None, "SELECT id FROM posts", {}, None, False)
+        assert statement == "SELECT /*+ MAX_EXECUTION_TIME(1500) */ id FROM posts"
+        statement, _ = _mysql_execution_time_hint(None, None, "UPDATE posts SET text = %s", {}, None, False)
+        assert statement == "UPDATE posts SET text = %s"
+    statement, _ = _mysql_execution_time_hint(None, None, "SELECT 1", {}, None, False)
+    assert statement == "SELECT 1"
+
+
+def _app(**options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware, **options)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(5)
+        return {}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        remaining = current_deadline().remaining()
+        return {"body": (await request.body()).decode(), "has_deadline": 0 < remaining <= 1}
+
+    return app
+
+
+def test_handler_past_its_budget_gets_504():
+    client = TestClient(_app(default_ms=1000, routes="GET /slow=50"))
+    response = client.get("/slow")
+    assert response.status_code == 504
+    assert client.post("/echo", content=b"hello").json() == {"body": "hello", "has_deadline": True}
+
+
+def test_client_disconnect_cancels_the_handler_and_deadline():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["deadline"] = current_deadline()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            seen["cancelled"] = True
+            raise
+
+    middleware = DeadlineMiddleware(app, default_ms=10000, routes="")
+    messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return messages.pop(0)
+
+    async def send(message):
+        seen.setdefault("sent", []).append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/posts/"}
+    asyncio.run(asyncio.wait_for(middleware(scope, receive, send), timeout=2))
+    assert seen["cancelled"] and seen["deadline"].cancelled
+    assert "sent" not in seen
@@ -0,0 +1,196 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base, create_db_engine, get_db
+from app.config.sharding import get_user_db
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.services.idempotency_service import (
+    DatabaseIdempotencyStore, IdempotencyConflict, IdempotencyInProgress, MemoryIdempotencyStore, StoredResponse,
+)
+
+RESPONSE = StoredResponse(201, b'{"id":"p1"}')
+
+
+def test_memory_store_replays_and_rejects_different_payload():
+    async def scenario():
+        store = MemoryIdempotencyStore(ttl_seconds=60, max_keys=10)
+        assert await store.begin("1:k", "fp", "owner-1") is None
+        await store.complete("1:k", RESPONSE, "owner-1")
+        assert await store.begin("1:k", "fp", "owner-2") == RESPONSE
+        with pytest.raises(IdempotencyConflict):
+            await store.begin("1:k", "other", "owner-3")
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_duplicate_waits_for_the_first_request():
+    async def scenario():
+        store = MemoryIdempotencyStore(ttl_seconds=60, max_keys=10, wait_seconds=5)
+        assert await store.begin("1:k", "fp", "owner-1") is None
+        waiter = asyncio.create_task(store.begin("1:k", "fp", "owner-2"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await store.complete("1:k", RESPONSE, "owner-1")
+        assert await waiter == RESPONSE
+
+    asyncio.run(scenario())
+
+
+def test_released_key_is_taken_over_and_wait_times_out():
+    async def scenario():
+        store = MemoryIdempotencyStore(ttl_seconds=60, max_keys=10, wait_seconds=0.05)
+        assert await store.begin("1:k", "fp", "owner-1") is None
+        waiter = asyncio.create_task(store.begin("1:k", "fp", "owner-2"))
+        await asyncio.sleep(0.01)
+        await store.release("1:k", "owner-1")
+        assert await waiter is None  # the retry now owns the key
+
+        with pytest.raises(IdempotencyInProgress):
+            await store.begin("1:k", "fp", "owner-3")
+
+    asyncio.run(scenario())
+
+
+def test_memory_store_is_bounded_and_expires():
+    async def scenario():
+        now = [0.0]
+        store = MemoryIdempotencyStore(ttl_seconds=10, max_keys=2, clock=lambda: now[0])
+        for key in ("a", "b", "c"):
+            await store.begin(key, "fp", "owner-1")
+            await store.complete(key, RESPONSE, "owner-1")
+        assert len(store) == 2 and await store.begin("c", "fp", "owner-2") == RESPONSE
+
+        now[0] = 11.0
+        assert await store.purge_expired() == 2
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_key_is_taken_over_after_its_lease():
+    async def scenario():
+        now = [0.0]
+        store = MemoryIdempotencyStore(ttl_seconds=600, lease_seconds=5, max_keys=10, wait_seconds=0,
+                                       clock=lambda: now[0])
+        assert await store.begin("1:k", "fp", "owner-1") is None  # owner never completes or releases
+        with pytest.raises(IdempotencyInProgress):
+            await store.begin("1:k", "fp", "owner-2")
+        now[0] = 6.0
+        assert await store.begin("1:k", "fp", "owner-3") is None
+        await store.complete("1:k", RESPONSE, "owner-3")
+        now[0] = 500.0  # completed responses are kept for the full TTL
+        assert await store.begin("1:k", "fp", "owner-4") == RESPONSE
+
+    asyncio.run(scenario())
+
+
+def test_database_store_takes_over_a_crashed_workers_key(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    async def scenario():
+        crashed = DatabaseIdempotencyStore(Session, MemoryIdempotencyStore(lease_seconds=0.2), poll_interval=0.01)
+        assert await crashed.begin("1:k", "fp", "owner-1") is None
+        retry = DatabaseIdempotencyStore(Session, MemoryIdempotencyStore(lease_seconds=0.2, wait_seconds=5),
+                                         poll_interval=0.01)
+        assert await retry.begin("1:k", "fp", "owner-2") is None
+        await retry.complete("1:k", RESPONSE, "owner-2")
+        with Session() as db:
+            row = IdempotencyRepository.get(db, "1:k")
+            assert row.status_code == 201 and row.expires_at > datetime.datetime.now() + datetime.timedelta(hours=1)
+
+    asyncio.run(scenario())
+
+
+def test_memory_store_ignores_complete_and_release_from_a_superseded_owner():
+    async def scenario():
+        now = [0.0]
+        store = MemoryIdempotencyStore(ttl_seconds=600, lease_seconds=5, max_keys=10, wait_seconds=0,
+                                       clock=lambda: now[0])
+        assert await store.begin("1:k", "fp", "slow") is None
+        now[0] = 6.0
+        assert await store.begin("1:k", "fp", "retry") is None
+        assert await store.complete("1:k", StoredResponse(500, b"late"), "slow") is False
+        await store.release("1:k", "slow")
+        assert await store.complete("1:k", RESPONSE, "retry") is True
+        assert await store.begin("1:k", "fp", "third") == RESPONSE
+
+    asyncio.run(scenario())
+
+
+def test_database_store_superseded_owner_cannot_overwrite(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    async def scenario():
+        slow = DatabaseIdempotencyStore(Session, MemoryIdempotencyStore(lease_seconds=0.2), poll_interval=0.01)
+        assert await slow.begin("1:k", "fp", "slow") is None
+        retry = DatabaseIdempotencyStore(Session, MemoryIdempotencyStore(lease_seconds=0.2, wait_seconds=5),
+                                         poll_interval=0.01)
+        assert await retry.begin("1:k", "fp", "retry") is None
+        assert await slow.complete("1:k", StoredResponse(500, b"late"), "slow") is False
+        await slow.release("1:k", "slow")
+        with Session() as db:
+            row = IdempotencyRepository.get(db, "1:k")
+            assert row.owner == "retry" and row.status_code is None
+        assert await retry.complete("1:k", RESPONSE, "retry") is True
+        assert await slow.begin("1:k", "fp", "third") == RESPONSE
+
+    asyncio.run(scenario())
+
+
+def test_database_store_dedupes_across_workers(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    async def scenario():
+        worker_a = DatabaseIdempotencyStore(Session, MemoryIdempotencyStore(wait_seconds=5), poll_interval=0.01)
+        worker_b = DatabaseIdempotencyStore(Session, MemoryIdempotencyStore(wait_seconds=5), poll_interval=0.01)
+        assert await worker_a.begin("1:k", "fp", "owner-1") is None
+        waiter = asyncio.create_task(worker_b.begin("1:k", "fp", "owner-2"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await worker_a.complete("1:k", RESPONSE, "owner-1")
+        assert await waiter == RESPONSE
+        with pytest.raises(IdempotencyConflict):
+            await worker_b.begin("1:k", "other", "owner-3")
+
+    asyncio.run(scenario())
+
+
+def test_retried_post_with_same_key_creates_one_post(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr("app.controllers.post_controller.idempotency_store", MemoryIdempotencyStore())
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def sqlite_db():
+        with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = app.dependency_overrides[get_user_db] = sqlite_db
+    try:
+        client = TestClient(app)
+        signup = client.post("/api/v1/auth/signup", json={"email": "idem@example.com", "password": "Passw0rd!x"})
+        headers = {"Authorization": f"Bearer {signup.json()['data']['token']}", "Idempotency-Key": "retry-1"}
+
+        first = client.post("/api/v1/posts/", json={"text": "once"}, headers=headers)
+        second = client.post("/api/v1/posts/", json={"text": "once"}, headers=headers)
+        different = client.post("/api/v1/posts/", json={"text": "twice"}, headers=headers)
+
+        assert first.status_code == second.status_code == 201
+        assert second.json() == first.json()
+        assert second.headers["idempotent-replayed"] == "true"
+        assert different.status_code == 422
+        assert client.get("/api/v1/posts/stats", headers=headers).json()["data"]["post_count"] == 1
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_user_db, None)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.load_shedding import LoadSheddingMiddleware, parse_routes
+from app.utils.load_monitor import LoadMonitor
+
+
+def _app(monitor: LoadMonitor) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LoadSheddingMiddleware, monitor=monitor,
+                       low_priority="GET /api/v1/posts,GET /docs", retry_after_seconds=2)
+
+    @app.get("/api/v1/posts/")
+    async def list_posts():
+        return []
+
+    @app.get("/api/v1/posts/stats")
+    async def post_stats():
+        return {}
+
+    @app.post("/api/v1/posts/")
+    async def add_post():
+        return {"seen_pending": monitor.pending}
+
+    @app.post("/api/v1/auth/login")
+    async def login():
+        return {}
+
+    return app
+
+
+def test_parse_routes():
+    assert parse_routes("get /docs, POST /api/v1/posts,") == (("GET", "/docs"), ("POST", "/api/v1/posts"))
+    with pytest.raises(ValueError):
+        parse_routes("GET docs")
+
+
+def test_lag_average_overloads_and_recovers_with_hysteresis():
+    monitor = LoadMonitor(lag_threshold_ms=100, smoothing=0.5)
+    monitor.record_lag(0.4)
+    assert monitor.overloaded and monitor.should_shed()
+    monitor.record_lag(0.0)  # average 0.1: still above half the threshold
+    assert monitor.overloaded
+    monitor.record_lag(0.0)
+    monitor.record_lag(0.0)
+    assert not monitor.overloaded
+
+    metrics = monitor.metrics()
+    assert metrics["loop_lag_max_ms"] == 400.0 and metrics["shedding"] is False
+    assert monitor.metrics()["loop_lag_max_ms"] == 0.0
+
+
+def test_monitor_measures_a_blocked_loop():
+    monitor = LoadMonitor(interval_ms=10, lag_threshold_ms=50, smoothing=1.0)
+
+    async def main():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+        time.sleep(0.15)  # blocking work on the loop, like a synchronous DB call
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(main())
+    assert monitor.lag_max >= 0.1
+    assert monitor.overloaded
+
+
+def test_sheds_only_low_priority_routes_when_overloaded():
+    monitor = LoadMonitor()
+    client = TestClient(_app(monitor))
+    assert client.get("/api/v1/posts/").status_code == 200
+
+    monitor.overloaded = True
+    response = client.get("/api/v1/posts/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+    assert client.get("/docs").status_code == 503
+    assert client.post("/api/v1/auth/login").status_code == 200
+    assert client.post("/api/v1/posts/").status_code == 200
+    assert client.get("/api/v1/posts/stats").status_code == 200
+    assert monitor.shed_total == 2
+
+
+def test_sheds_on_pending_requests_and_counts_them():
+    monitor = LoadMonitor(max_pending=0)
+    client = TestClient(_app(monitor))
+    assert client.post("/api/v1/posts/").json() == {"seen_pending": 1}
+    assert monitor.pending == 0
+
+    monitor.request_started()  # another request still waiting for its response
+    assert client.get("/api/v1/posts/").status_code == 503
+    monitor.request_answered()
+    assert client.get("/api/v1/posts/").status_code == 200
+
+
+def test_shed_responses_from_the_app_carry_cors_headers(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr("app.utils.load_monitor.load_monitor.overloaded", True)
+    response = TestClient(app).get("/docs", headers={"Origin": "https://example.com"})
+    assert response.status_code == 503
+    assert "access-control-allow-origin" in response.headers
@@ -0,0 +1,52 @@
+import io
+import json
+import logging
+import queue
+import random
+
+from app.config.logging_config import (
+    BatchedStreamHandler, BatchingQueueListener, DroppingQueueHandler, JsonFormatter, SamplingFilter,
+)
+
+
+def make_record(level, msg, *args, **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(make_record(logging.INFO, "hello %s", "world", user_id=7))
+    entry = json.loads(line)
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO" and entry["user_id"] == 7
+
+
+def test_sampling_filter_only_samples_debug():
+    sampler = SamplingFilter(0.0, rng=random.Random(0))
+    assert not sampler.filter(make_record(logging.DEBUG, "noisy"))
+    assert sampler.filter(make_record(logging.INFO, "kept"))
+
+
+def test_queue_handler_drops_when_full():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    handler.handle(make_record(logging.INFO, "a"))
+    handler.handle(make_record(logging.INFO, "b"))
+    assert handler.dropped == 1
+
+
+def test_listener_writes_batched_json_lines():
+    stream = io.StringIO()
+    log_queue = queue.Queue()
+    writer = BatchedStreamHandler(stream, batch_size=100)
+    writer.setFormatter(JsonFormatter())
+    listener = BatchingQueueListener(log_queue, writer)
+    handler = DroppingQueueHandler(log_queue)
+
+    listener.start()
+    for i in range(10):
+        handler.handle(make_record(logging.INFO, "line %d", i))
+    listener.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [f"line {i}" for i in range(10)]
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.controllers.post_controller import _event_stream
+from app.services.post_events import RESYNC, PostEventHub, TooManySubscribers
+from app.utils.jwt import create_access_token
+
+
+def test_subscriber_receives_own_events_only():
+    async def scenario():
+        hub = PostEventHub(queue_size=8)
+        sub = hub.subscribe(1)
+        hub.publish(2, "post_created", {"post_id": "other"})
+        hub.publish(1, "post_created", {"post_id": "mine"})
+        event = await sub.next(1)
+        assert event.data == {"post_id": "mine"}
+        assert await sub.next(0.01) is None
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_another_thread_is_delivered():
+    async def scenario():
+        hub = PostEventHub(queue_size=8)
+        sub = hub.subscribe(1)
+        threading.Thread(target=hub.publish, args=(1, "post_deleted", {"post_id": "x"})).start()
+        event = await sub.next(2)
+        assert event.type == "post_deleted"
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_dropped_and_stream_ends():
+    async def scenario():
+        hub = PostEventHub(queue_size=2)
+        sub = hub.subscribe(1)
+        for i in range(3):
+            hub.publish(1, "post_created", {"post_id": str(i)})
+        assert sub.dropped
+
+        messages = [m async for m in _event_stream(sub, hub)]
+        assert len(messages) == 3  # retry hint + the two queued events
+        assert hub.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_resume_replays_backlog_or_asks_for_resync():
+    async def scenario():
+        hub = PostEventHub(queue_size=8, backlog_size=2)
+        first = hub.publish(1, "post_created", {"post_id": "a"})
+        hub.publish(1, "post_created", {"post_id": "b"})
+        assert [e.data["post_id"] for e in await hub.wait(1, first.id, 0.01)] == ["b"]
+
+        hub.publish(1, "post_created", {"post_id": "c"})
+        assert [e.type for e in await hub.wait(1, first.id - 1, 0.01)] == [RESYNC]
+        assert await hub.wait(2, first.id, 0.01) == []
+
+    asyncio.run(scenario())
+
+
+def test_backlog_eviction_survives_tiny_or_empty_backlogs():
+    async def scenario():
+        hub = PostEventHub(queue_size=8, backlog_size=2, backlog_users=0)
+        first = hub.publish(1, "post_created", {"post_id": "a"})
+        second = hub.publish(2, "post_created", {"post_id": "b"})
+        # User 1's backlog was evicted, so resuming it asks for a resync
+        assert [e.type for e in await hub.wait(1, first.id - 1, 0.01)] == [RESYNC]
+        assert await hub.wait(2, second.id, 0.01) == []
+
+    asyncio.run(scenario())
+
+
+def test_subscriptions_per_user_are_capped():
+    async def scenario():
+        hub = PostEventHub(max_per_user=1)
+        sub = hub.subscribe(1)
+        with pytest.raises(TooManySubscribers):
+            hub.subscribe(1)
+        hub.unsubscribe(sub)
+        hub.subscribe(1)
+
+    asyncio.run(scenario())
+
+
+def test_long_poll_endpoint_returns_missed_events(monkeypatch):
+    from main import app
+
+    hub = PostEventHub()
+    monkeypatch.setattr("app.controllers.post_controller.post_event_hub", hub)
+    before = hub.publish(5, "post_created", {"post_id": "old"})
+    hub.publish(5, "post_deleted", {"post_id": "old"})
+
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': 5, 'email': 'e@x.com'})}"}
+    response = TestClient(app).get(f"/api/v1/posts/stream?mode=poll&timeout=0&since={before.id}", headers=headers)
+
+    assert response.status_code == 200
+    assert [e["type"] for e in response.json()["data"]] == ["post_deleted"]
@@ -0,0 +1,143 @@
+import datetime
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.post_ingest import PostIngestQueue, IngestQueueFull
+from app.services.post_service import PostService
+
+
+def make_row(i, user_id=1):
+    return {"id": f"pid-{i}", "user_id": user_id, "text": f"post {i}",
+            "created_at": datetime.datetime(2025, 6, 10, 14, 56, i % 60)}
+
+
+def test_flusher_commits_in_batches(monkeypatch):
+    batches = []
+    monkeypatch.setattr("app.services.post_ingest.PostRepository.bulk_create",
+                        lambda db, posts: batches.append(list(posts)) or len(posts))
+    flushed = []
+    q = PostIngestQueue(maxsize=100, batch_size=4, flush_interval_ms=20, session_factory=MagicMock,
+                        on_flush=flushed.extend)
+    for i in range(10):
+        q.submit(make_row(i))
+    q.start()
+    deadline = time.time() + 2
+    while sum(len(b) for b in batches) < 10 and time.time() < deadline:
+        time.sleep(0.01)
+    q.stop()
+
+    assert [p["id"] for b in batches for p in b] == [f"pid-{i}" for i in range(10)]
+    assert all(len(b) <= 4 for b in batches)
+    assert len(flushed) == 10
+
+
+def test_submit_applies_backpressure_when_full():
+    q = PostIngestQueue(maxsize=1, session_factory=MagicMock)
+    q.submit(make_row(0))
+    with pytest.raises(IngestQueueFull):
+        q.submit(make_row(1))
+
+
+def test_failed_flush_spills_and_replays(monkeypatch, tmp_path):
+    spill = tmp_path / "ingest.spill"
+
+    def failing_bulk_create(db, posts):
+        raise OperationalError("INSERT", {}, Exception("db down"))
+
+    monkeypatch.setattr("app.services.post_ingest.PostRepository.bulk_create", failing_bulk_create)
+    q = PostIngestQueue(maxsize=10, spill_path=str(spill), session_factory=MagicMock)
+    q.submit(make_row(0))
+    q.submit(make_row(1))
+    q.stop()
+    assert len(spill.read_text().splitlines()) == 2
+
+    replayed = []
+    monkeypatch.setattr("app.services.post_ingest.PostRepository.bulk_create",
+                        lambda db, posts: replayed.extend(posts) or len(posts))
+    q = PostIngestQueue(maxsize=10, spill_path=str(spill), session_factory=MagicMock)
+    q.start()
+    q.stop()
+    assert [p["id"] for p in replayed] == ["pid-0", "pid-1"]
+    assert isinstance(replayed[0]["created_at"], datetime.datetime)
+    assert not spill.exists()
+
+
+def test_failed_batch_is_retried_row_by_row_and_rejects_dead_lettered(monkeypatch, tmp_path):
+    spill, dead = tmp_path / "ingest.spill", tmp_path / "ingest.dead"
+    committed = []
+
+    def bulk_create(db, posts):
+        if len(posts) > 1 or posts[0]["id"] == "pid-1":
+            raise IntegrityError("INSERT", {}, Exception("bad row"))
+        committed.extend(posts)
+        return len(posts)
+
+    monkeypatch.setattr("app.services.post_ingest.PostRepository.bulk_create", bulk_create)
+    flushed = []
+    q = PostIngestQueue(maxsize=10, spill_path=str(spill), dead_letter_path=str(dead),
+                        session_factory=MagicMock, on_flush=flushed.extend)
+    for i in range(3):
+        q.submit(make_row(i))
+    q.stop()
+
+    assert [p["id"] for p in committed] == ["pid-0", "pid-2"]
+    assert [p["id"] for p in flushed] == ["pid-0", "pid-2"]
+    assert [json.loads(line)["id"] for line in dead.read_text().splitlines()] == ["pid-1"]
+    assert not spill.exists()
+
+
+def test_flusher_replays_spill_periodically(monkeypatch, tmp_path):
+    spill = tmp_path / "ingest.spill"
+    monkeypatch.setattr("app.services.post_ingest.PostRepository.bulk_create",
+                        MagicMock(side_effect=OperationalError("INSERT", {}, Exception("db down"))))
+    q = PostIngestQueue(maxsize=10, flush_interval_ms=10, replay_interval_seconds=0.05,
+                        spill_path=str(spill), session_factory=MagicMock)
+    q.start()
+    q.submit(make_row(0))
+    deadline = time.time() + 2
+    while not spill.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert spill.exists()
+
+    replayed = []
+    monkeypatch.setattr("app.services.post_ingest.PostRepository.bulk_create",
+                        lambda db, posts: replayed.extend(posts) or len(posts))
+    deadline = time.time() + 2
+    while not replayed and time.time() < deadline:
+        time.sleep(0.01)
+    q.stop()
+    assert [p["id"] for p in replayed] == ["pid-0"]
+    assert not spill.exists()
+
+
+def test_add_post_write_behind_queues_post(monkeypatch):
+    submitted = []
+    monkeypatch.setattr("app.services.post_service.ingest_queue.submit", submitted.append)
+    monkeypatch.setattr("app.services.post_service.PostRepository.create",
+                        MagicMock(side_effect=AssertionError("should not commit inline")))
+
+    post = PostService.add_post(MagicMock(), 5, "queued", write_behind=True)
+    assert submitted[0]["id"] == post["post_id"]
+    assert submitted[0]["user_id"] == 5 and post["text"] == "queued"
+
+
+def test_write_behind_post_reaches_cache_only_after_flush(monkeypatch):
+    from app.services import post_service
+    monkeypatch.setattr("app.services.post_service.ingest_queue.submit", lambda row: None)
+    published = []
+    monkeypatch.setattr("app.services.post_service.post_event_hub.publish",
+                        lambda user_id, event_type, data: published.append(data["post_id"]))
+    post_service.cache_store[6] = (datetime.datetime.now(), [])
+
+    post = PostService.add_post(MagicMock(), 6, "queued", write_behind=True)
+    assert post_service.cache_store[6][1] == [] and published == []
+
+    post_service._cache_flushed([{"id": post["post_id"], "user_id": 6, "text": "queued",
+                                  "created_at": datetime.datetime.now()}])
+    assert [p.post_id for p in post_service.cache_store[6][1]] == [post["post_id"]]
+    assert published == [post["post_id"]]
+    post_service.cache_store.pop(6)
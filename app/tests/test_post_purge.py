@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base, create_db_engine
+from app.models.post import Post
+from app.models.user import User
+from app.repositories.post_repository import PostRepository
+from app.services.post_purge import PostPurger, parse_window
+from app.services.post_stats_service import PostStatsService
+
+
+@pytest.fixture
+def Session():
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add(User(id=1, email="a@b.com", password="x"))
+        db.commit()
+    return Session
+
+
+def _row_count(Session) -> int:
+    with Session() as db:
+        return db.scalar(select(func.count()).select_from(Post))
+
+
+def test_delete_tombstones_and_hides_post_from_reads(Session):
+    with Session() as db:
+        kept = PostRepository.create(db, 1, "kept").id
+        gone = PostRepository.create(db, 1, "gone").id
+        assert PostRepository.delete(db, 1, gone) is True
+
+        assert [p.id for p in PostRepository.get_by_user(db, 1)] == [kept]
+        assert [row[0] for row in PostRepository.get_rows_by_user(db, 1)] == [kept]
+        assert PostStatsService.reconcile(Session) == 0
+    assert _row_count(Session) == 2
+
+
+def test_purge_respects_grace_period_and_batch_size(Session):
+    now = [datetime.datetime.now()]
+    with Session() as db:
+        post_ids = [PostRepository.create(db, 1, f"post {i}").id for i in range(5)]
+        for post_id in post_ids:
+            PostRepository.delete(db, 1, post_id)
+
+    purger = PostPurger(batch_size=2, grace_seconds=60, session_factory=Session, clock=lambda: now[0])
+    assert purger.purge_batch() == 0
+    assert purger.refresh_backlog() == 5
+
+    now[0] += datetime.timedelta(seconds=61)
+    assert purger._pass() == purger.batch_interval
+    assert purger._pass() == purger.batch_interval
+    assert purger._pass() == purger.idle_seconds
+    assert _row_count(Session) == 0
+    metrics = purger.metrics()
+    assert metrics["purged_total"] == 5
+    assert metrics["backlog"] == 0 and metrics["oldest_tombstone_age_seconds"] is None
+
+
+def test_purge_only_runs_inside_window(Session):
+    with Session() as db:
+        PostRepository.delete(db, 1, PostRepository.create(db, 1, "x").id)
+    clock = [datetime.datetime(2030, 1, 1, 12, 0)]
+    purger = PostPurger(grace_seconds=0, window="23:00-04:00", session_factory=Session, clock=lambda: clock[0])
+
+    assert purger._pass() == purger.idle_seconds
+    assert _row_count(Session) == 1
+    clock[0] = datetime.datetime(2030, 1, 2, 1, 30)
+    purger._pass()
+    assert _row_count(Session) == 0
+
+
+def test_parse_window_rejects_bad_format():
+    assert parse_window("") is None
+    with pytest.raises(ValueError):
+        parse_window("late night")
@@ -1,6 +1,8 @@
+import json
 from unittest.mock import patch, MagicMock
-from app.services.post_service import PostService
-from datetime import datetime
+from app.services import post_service
+from app.services.post_service import PostService, CachedPost
+from datetime import datetime, timedelta
 
 class DummyPost:
     def __init__(self, id, user_id, text, created_at):
@@ -12,22 +14,41 @@ class DummyPost:
 class DummyDB:
     def __init__(self):
         self.query = MagicMock()
+        self.rollback = MagicMock()
 
 
-def test_add_post_invalidates_cache(monkeypatch):
+def test_add_post_updates_cache_in_place(monkeypatch):
     db = DummyDB()
     user_id = 1
     text = "Test post"
     post_obj = DummyPost("pid", user_id, text, MagicMock(isoformat=lambda: "now"))
     monkeypatch.setattr("app.services.post_service.PostRepository.create", lambda db, uid, txt: post_obj)
 
-    cache_dict = {user_id: (None, ["old post"])}
+    ts = datetime(2025, 6, 10, 14, 56, 25)
+    old_post = CachedPost("old", "old", ts)
+    cache_dict = {user_id: (ts, [old_post])}
     monkeypatch.setattr("app.services.post_service.cache_store", cache_dict)
-    PostService.cache_store = cache_dict  # Same object, not a new dict
+    monkeypatch.setattr("app.services.post_service.cache_versions", {})
 
-    post = PostService.add_post(db, user_id, text)
+    post = PostService.add_post(db, user_id, text, write_behind=False)
     assert post["user_id"] == user_id
-    assert user_id not in PostService.cache_store
+
+    cached_ts, cached_posts = cache_dict[user_id]
+    assert cached_ts == ts
+    assert [p.post_id for p in cached_posts] == ["pid", "old"]
+    assert post_service.cache_versions[user_id] == 1
+
+
+def test_add_post_does_not_duplicate_rebuilt_entry(monkeypatch):
+    user_id = 4
+    post_obj = DummyPost("pid", user_id, "new", MagicMock(isoformat=lambda: "now"))
+    monkeypatch.setattr("app.services.post_service.PostRepository.create", lambda db, uid, txt: post_obj)
+    cached = [CachedPost("pid", "new", post_obj.created_at)]
+    cache_dict = {user_id: (datetime(2025, 6, 10), cached)}
+    monkeypatch.setattr("app.services.post_service.cache_store", cache_dict)
+
+    PostService.add_post(DummyDB(), user_id, "new", write_behind=False)
+    assert cache_dict[user_id][1] == cached
 
 
 def test_get_posts_cache_and_db(monkeypatch):
@@ -37,30 +58,33 @@ def test_get_posts_cache_and_db(monkeypatch):
     # Test cache hit
     now = datetime(2025, 6, 10, 14, 56, 25)
     monkeypatch.setattr("app.services.post_service.cache_store",
-                        {user_id: (
-                        now, [{"post_id": "1", "user_id": user_id, "text": "cached", "created_at": "now"}])})
+                        {user_id: (now, [CachedPost("1", "cached", now)])})
 
     with patch("app.services.post_service.datetime.datetime") as mock_datetime:
         mock_datetime.now.return_value = now
         posts = PostService.get_posts(db, user_id)
         assert posts[0]["text"] == "cached"
+        assert posts[0]["user_id"] == user_id
+        assert posts[0]["created_at"] == now.isoformat()
 
     # Test cache miss
     monkeypatch.setattr("app.services.post_service.cache_store", {})
-    dummy_post = DummyPost("2", user_id, "from db", MagicMock(isoformat=lambda: "now"))
-    monkeypatch.setattr("app.services.post_service.PostRepository.get_by_user", lambda db, uid: [dummy_post])
+    row = ("2", "from db", MagicMock(isoformat=lambda: "now"))
+    monkeypatch.setattr("app.services.post_service.PostRepository.get_rows_by_user", lambda db, uid: [row])
     with patch("app.services.post_service.datetime.datetime") as mock_datetime:
         mock_datetime.now.return_value = now
         posts = PostService.get_posts(db, user_id, cache_minutes=0)
 
         assert posts, "Returned posts is empty!"
         assert posts[0]["text"] == "from db"
+        db.rollback.assert_called_once()  # read transaction ended before rendering
 
 def test_delete_post_removes_from_cache(monkeypatch):
     db = DummyDB()
     user_id = 3
     post_id = "pid"
-    cache_dict = {user_id: (MagicMock(), [{"post_id": post_id}, {"post_id": "other"}])}
+    now = datetime(2025, 6, 10, 14, 56, 25)
+    cache_dict = {user_id: (MagicMock(), [CachedPost(post_id, "a", now), CachedPost("other", "b", now)])}
 
     monkeypatch.setattr("app.services.post_service.cache_store", cache_dict)
     PostService.cache_store = cache_dict
@@ -70,4 +94,88 @@ def test_delete_post_removes_from_cache(monkeypatch):
     assert deleted is True
 
     # Check that the post was removed from cache
-    assert all(p["post_id"] != post_id for p in PostService.cache_store[user_id][1])
+    assert all(p.post_id != post_id for p in PostService.cache_store[user_id][1])
+
+
+def test_get_posts_serves_stale_and_refreshes_once(monkeypatch):
+    user_id = 5
+    now = datetime(2025, 6, 10, 15, 0, 0)
+    stale = [CachedPost("old", "stale", now - timedelta(minutes=10))]
+    monkeypatch.setattr("app.services.post_service.cache_store", {user_id: (now - timedelta(minutes=7), stale)})
+    monkeypatch.setattr("app.services.post_service.cache_refreshing", set())
+    scheduled = []
+    monkeypatch.setattr("app.services.post_service.cache_refresher.submit",
+                        lambda fn, *args: scheduled.append(args))
+    monkeypatch.setattr("app.services.post_service.PostRepository.get_rows_by_user",
+                        MagicMock(side_effect=AssertionError("stale read must not hit the DB inline")))
+
+    with patch("app.services.post_service.datetime.datetime") as mock_datetime:
+        mock_datetime.now.return_value = now
+        first = PostService.get_posts(DummyDB(), user_id, cache_minutes=5, stale_minutes=5)
+        second = PostService.get_posts(DummyDB(), user_id, cache_minutes=5, stale_minutes=5)
+
+    assert first == second == [stale[0].to_dict(user_id)]
+    assert len(scheduled) == 1
+
+
+def test_get_posts_past_grace_fetches_inline(monkeypatch):
+    user_id = 6
+    now = datetime(2025, 6, 10, 15, 0, 0)
+    monkeypatch.setattr("app.services.post_service.cache_store", {user_id: (now - timedelta(minutes=30), [])})
+    row = ("1", "fresh", MagicMock(isoformat=lambda: "now"))
+    monkeypatch.setattr("app.services.post_service.PostRepository.get_rows_by_user", lambda db, uid: [row])
+
+    with patch("app.services.post_service.datetime.datetime") as mock_datetime:
+        mock_datetime.now.return_value = now
+        posts = PostService.get_posts(DummyDB(), user_id, cache_minutes=5, stale_minutes=5)
+
+    assert posts[0]["text"] == "fresh"
+    ts, cached = post_service.cache_store[user_id]
+    assert ts == now and cached[0].post_id == "1"
+
+
+def test_refresh_is_discarded_after_concurrent_write(monkeypatch):
+    user_id = 7
+    ts = datetime(2025, 6, 10, 15, 0, 0)
+    cached = [{"post_id": "a"}]
+    monkeypatch.setattr("app.services.post_service.cache_store", {user_id: (ts, cached)})
+    monkeypatch.setattr("app.services.post_service.cache_versions", {user_id: 2})
+    monkeypatch.setattr("app.services.post_service.cache_refreshing", {user_id})
+    monkeypatch.setattr("app.services.post_service.shard_map.session_for", lambda uid: MagicMock())
+    monkeypatch.setattr("app.services.post_service.PostRepository.get_rows_by_user", lambda db, uid: [])
+
+    post_service._refresh(user_id, version=1)
+
+    assert post_service.cache_store[user_id] == (ts, cached)
+    assert user_id not in post_service.cache_refreshing
+
+
+def test_prune_drops_dead_entries_with_their_versions_and_hits(monkeypatch):
+    now = datetime.now()
+    monkeypatch.setattr("app.services.post_service.cache_store", {1: (now - timedelta(minutes=11), []),
+                                                                   2: (now, [])})
+    monkeypatch.setattr("app.services.post_service.cache_bodies", {1: ([], {}), 2: ([], {})})
+    monkeypatch.setattr("app.services.post_service.cache_versions", {1: 5, 2: 1, 3: 2})
+    monkeypatch.setattr("app.services.post_service.cache_hits", {1: 4, 2: 1, 3: 9})
+    monkeypatch.setattr("app.services.post_service._version_floor", 0)
+
+    assert post_service.prune_cache(cache_minutes=5, stale_minutes=5) == 1
+    assert list(post_service.cache_store) == [2] and list(post_service.cache_bodies) == [2]
+    assert post_service.cache_versions == {2: 1} and post_service.cache_hits == {2: 1}
+
+    # A load of user 1 that started before the prune must not be stored afterwards
+    with post_service.cache_lock:
+        post_service._cache_store_if_current(1, 5, now, [])
+        post_service._cache_store_if_current(3, 0, now, [])
+        assert 1 not in post_service.cache_store and 3 not in post_service.cache_store
+        post_service._cache_store_if_current(3, post_service._version(3), now, [])
+        assert 3 in post_service.cache_store
+
+
+def test_fast_and_validated_listing_render_match():
+    posts = [CachedPost("1", "a é \"quoted\"", datetime(2025, 6, 10, 14, 56, 25, 123456)),
+             CachedPost("2", "b", datetime(2025, 6, 10))]
+    fast = json.loads(post_service.render_post_list(3, posts, fast=True))
+    slow = json.loads(post_service.render_post_list(3, posts, fast=False))
+    assert fast == slow
+    assert fast["data"][0]["created_at"] == "2025-06-10T14:56:25.123456"
@@ -0,0 +1,124 @@
+import re
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base, create_db_engine
+from app.models.user import User
+from app.models.user_post_stats import UserPostStats
+from app.repositories import post_stats_repository
+from app.repositories.post_repository import PostRepository
+from app.repositories.post_stats_repository import PostStatsRepository
+from app.services.post_stats_service import PostStatsService
+
+
+@pytest.fixture
+def Session():
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add_all([User(id=1, email="a@b.com", password="x"), User(id=2, email="c@d.com", password="x")])
+        db.commit()
+    return Session
+
+
+def test_counters_follow_create_bulk_create_and_delete(Session):
+    with Session() as db:
+        first_id = PostRepository.create(db, 1, "héllo").id
+        PostRepository.bulk_create(db, [
+            {"id": str(uuid.uuid4()), "user_id": 1, "text": "abc", "created_at": datetime(2030, 1, 1)},
+            {"id": str(uuid.uuid4()), "user_id": 2, "text": "xy", "created_at": datetime(2030, 1, 2)},
+        ])
+        assert PostStatsService.get_stats(db, 1) == {
+            "post_count": 2, "total_bytes": 9, "last_post_at": "2030-01-01T00:00:00"
+        }
+        assert PostStatsService.get_stats(db, 2)["post_count"] == 1
+
+        assert PostRepository.delete(db, 2, first_id) is False
+        assert PostRepository.delete(db, 1, first_id) is True
+        db.expire_all()
+        assert PostStatsService.get_stats(db, 1)["post_count"] == 1
+        assert PostStatsService.get_stats(db, 1)["total_bytes"] == 3
+
+
+def test_delete_of_newest_post_moves_last_post_at_back(Session):
+    with Session() as db:
+        PostRepository.bulk_create(db, [
+            {"id": "old", "user_id": 1, "text": "a", "created_at": datetime(2030, 1, 1)},
+            {"id": "new", "user_id": 1, "text": "b", "created_at": datetime(2030, 1, 2)},
+        ])
+        PostRepository.delete(db, 1, "new")
+        db.expire_all()
+        assert PostStatsService.get_stats(db, 1)["last_post_at"] == "2030-01-01T00:00:00"
+
+
+def test_delete_reads_stored_size_not_text(Session):
+    with Session() as db:
+        post_id = PostRepository.create(db, 1, "é" * 10).id
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        assert PostRepository.delete(db, 1, post_id) is True
+        assert not any(s.startswith("SELECT") and re.search(r"posts\.text\b", s) for s in statements)
+        db.expire_all()
+        assert PostStatsService.get_stats(db, 1)["total_bytes"] == 0
+
+
+def test_user_without_posts_gets_zeros(Session):
+    with Session() as db:
+        assert PostStatsService.get_stats(db, 2) == {"post_count": 0, "total_bytes": 0, "last_post_at": None}
+
+
+def test_reconcile_fixes_drift_in_batches(Session):
+    with Session() as db:
+        PostRepository.create(db, 1, "one")
+        PostRepository.create(db, 2, "two")
+        db.execute(update(UserPostStats).where(UserPostStats.user_id == 2).values(post_count=7, total_bytes=0))
+        db.commit()
+
+    assert PostStatsService.reconcile(Session, batch_size=1) == 1
+    assert PostStatsService.reconcile(Session, batch_size=1) == 0
+    with Session() as db:
+        assert PostStatsService.get_stats(db, 2)["post_count"] == 1
+        assert PostStatsService.get_stats(db, 2)["total_bytes"] == 3
+
+
+def test_reconcile_aggregates_stored_sizes_under_a_row_lock(Session):
+    with Session() as db:
+        PostRepository.create(db, 1, "é" * 10)
+        db.execute(update(UserPostStats).where(UserPostStats.user_id == 1).values(total_bytes=0))
+        db.commit()
+
+    statements = []
+    engine = Session.kw["bind"]
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert PostStatsService.reconcile(Session) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any(re.search(r"posts\.text\b", s) for s in statements)
+    assert any("GROUP BY posts.user_id" in s for s in statements)
+    with Session() as db:
+        assert PostStatsService.get_stats(db, 1)["total_bytes"] == 20
+
+
+def test_stats_fall_back_to_update_then_insert_without_an_upsert(Session, monkeypatch):
+    monkeypatch.setattr(post_stats_repository, "_upsert_statement", lambda dialect, increment: None)
+    with Session() as db:
+        PostRepository.create(db, 1, "abc")
+        PostRepository.bulk_create(db, [
+            {"id": str(uuid.uuid4()), "user_id": 1, "text": "de", "created_at": datetime(2030, 1, 1)},
+        ])
+        PostStatsRepository.replace(db, [
+            {"user_id": 2, "post_count": 4, "total_bytes": 8, "last_post_at": None},
+        ])
+        db.commit()
+        assert PostStatsService.get_stats(db, 1) == {
+            "post_count": 2, "total_bytes": 5, "last_post_at": "2030-01-01T00:00:00"
+        }
+        assert PostStatsService.get_stats(db, 2)["post_count"] == 4
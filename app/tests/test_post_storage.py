@@ -0,0 +1,88 @@
+from sqlalchemy import Column, LargeBinary, MetaData, String, Table, Text, insert, select, text
+
+from app.config.database import create_db_engine
+from app.models.types import RAW, ZLIB, CompressedText, PlainText, decode_text, encode_text
+from app.utils.post_storage import check_post_storage, migrate_post_storage, prepare_post_storage
+
+
+def posts_table(text_type):
+    return Table("posts", MetaData(), Column("id", String(36), primary_key=True), Column("text", text_type))
+
+
+def test_encode_compresses_only_large_compressible_bodies():
+    assert encode_text("short", min_size=100, codec="zlib")[0] == RAW
+    large = "lorem ipsum " * 1000
+    packed = encode_text(large, min_size=100, codec="zlib")
+    assert packed[0] == ZLIB and len(packed) < len(large) // 10
+    assert decode_text(packed) == large
+    assert decode_text("legacy".encode()) == "legacy"
+
+
+def test_compressed_column_round_trips_through_the_database():
+    engine = create_db_engine("sqlite://")
+    posts = posts_table(CompressedText(min_size=100, codec="zlib"))
+    posts.metadata.create_all(engine)
+    body = "é compressible body " * 500
+    with engine.begin() as conn:
+        conn.execute(insert(posts), [{"id": "a", "text": body}, {"id": "b", "text": "tiny"}])
+        stored = conn.execute(text("SELECT length(text) FROM posts WHERE id = 'a'")).scalar()
+        assert stored < len(body.encode()) // 10
+        assert dict(conn.execute(select(posts.c.id, posts.c.text)).all()) == {"a": body, "b": "tiny"}
+
+
+def test_backfill_converts_existing_rows_both_ways(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'posts.db'}")
+    plain = posts_table(Text)
+    plain.metadata.create_all(engine)
+    bodies = {str(i): f"post {i} " * (50 * i + 1) for i in range(10)}
+    with engine.begin() as conn:
+        conn.execute(insert(plain), [{"id": k, "text": v} for k, v in bodies.items()])
+
+    assert migrate_post_storage(engine, "compressed", batch_size=3, min_size=100, codec="zlib") == 10
+    assert migrate_post_storage(engine, "compressed", batch_size=3, min_size=100, codec="zlib") == 0
+    compressed = posts_table(CompressedText(min_size=100, codec="zlib"))
+    with engine.connect() as conn:
+        assert dict(conn.execute(select(compressed.c.id, compressed.c.text)).all()) == bodies
+
+    assert migrate_post_storage(engine, "text", batch_size=4) == 10
+    with engine.connect() as conn:
+        assert dict(conn.execute(select(plain.c.id, plain.c.text)).all()) == bodies
+
+
+def test_plain_column_reads_bodies_left_in_binary_form():
+    engine = create_db_engine("sqlite://")
+    raw = posts_table(LargeBinary)
+    raw.metadata.create_all(engine)
+    body = "compressible body " * 500
+    with engine.begin() as conn:
+        conn.execute(insert(raw), [
+            {"id": "a", "text": encode_text(body, min_size=100, codec="zlib")},
+            {"id": "b", "text": encode_text("tiny", min_size=100, codec="zlib")},
+            {"id": "c", "text": "legacy".encode()},
+        ])
+    plain = posts_table(PlainText())
+    with engine.connect() as conn:
+        assert dict(conn.execute(select(plain.c.id, plain.c.text)).all()) == {"a": body, "b": "tiny", "c": "legacy"}
+
+
+def test_legacy_rows_starting_with_control_characters_survive_the_backfill(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'posts.db'}")
+    raw = posts_table(LargeBinary)
+    raw.metadata.create_all(engine)
+    bodies = {"a": "\x00hello", "b": "\x01hello", "c": "\x02hello"}
+    with engine.begin() as conn:
+        # As left by --prepare: plain UTF-8 bodies in a binary column
+        conn.execute(insert(raw), [{"id": k, "text": v.encode()} for k, v in bodies.items()])
+    assert {k: decode_text(v.encode()) for k, v in bodies.items()} == bodies
+
+    assert migrate_post_storage(engine, "compressed", min_size=100, codec="zlib") == 3
+    compressed = posts_table(CompressedText(min_size=100, codec="zlib"))
+    with engine.connect() as conn:
+        assert dict(conn.execute(select(compressed.c.id, compressed.c.text)).all()) == bodies
+
+
+def test_prepare_and_check_are_noops_off_mysql():
+    engine = create_db_engine("sqlite://")
+    posts_table(Text).metadata.create_all(engine)
+    assert prepare_post_storage(engine) is False
+    check_post_storage(engine, compression=True)
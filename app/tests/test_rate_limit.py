@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.rate_limit import ip_rate_limiter, user_rate_limiter
+from app.utils.auth import get_current_user
+from app.utils.rate_limit import MemoryRateLimitStore, RateLimit, ConcurrencyLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rate_limit():
+    assert RateLimit.parse("10/minute") == RateLimit(burst=10, rate=10 / 60)
+    with pytest.raises(ValueError):
+        RateLimit.parse("ten/minute")
+
+
+def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(compact_interval=60, clock=clock)
+    limit = RateLimit(burst=2, rate=1.0)
+
+    assert store.acquire("k", limit).allowed
+    assert store.acquire("k", limit).allowed
+    denied = store.acquire("k", limit)
+    assert not denied.allowed and denied.remaining == 0
+    assert denied.retry_after == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert store.acquire("k", limit).allowed
+
+
+def test_compaction_drops_refilled_buckets():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(compact_interval=10, clock=clock)
+    limit = RateLimit(burst=5, rate=1.0)
+    store.acquire("idle", limit)
+    clock.now += 5
+    store.acquire("busy", limit)
+    clock.now += 6
+    store.acquire("busy", limit)
+    assert len(store) == 1
+
+
+def test_concurrency_limiter():
+    limiter = ConcurrencyLimiter()
+    assert limiter.try_acquire("u", 1)
+    assert not limiter.try_acquire("u", 1)
+    limiter.release("u")
+    assert limiter.try_acquire("u", 1)
+
+
+def test_limiter_dependencies_return_429(monkeypatch):
+    monkeypatch.setattr("app.middleware.rate_limit.rate_limit_store", MemoryRateLimitStore())
+    app = FastAPI()
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": 1, "email": "a@b.com"}
+
+    @app.post("/login", dependencies=[Depends(ip_rate_limiter("login", "1/minute"))])
+    async def login():
+        return {"ok": True}
+
+    @app.get("/posts", dependencies=[Depends(user_rate_limiter("posts", "2/minute"))])
+    async def posts():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/login").status_code == 200
+    limited = client.post("/login")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "60"
+
+    first = client.get("/posts")
+    assert first.status_code == 200 and first.headers["X-RateLimit-Remaining"] == "1"
+    assert client.get("/posts").status_code == 200
+    assert client.get("/posts").status_code == 429
+
+
+def test_blocking_store_is_called_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    class SlowStore(MemoryRateLimitStore):
+        blocking = True
+
+        def acquire(self, key, limit):
+            threads["store"] = threading.get_ident()
+            return super().acquire(key, limit)
+
+    monkeypatch.setattr("app.middleware.rate_limit.rate_limit_store", SlowStore())
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(ip_rate_limiter("login", "5/minute"))])
+    async def login():
+        threads["loop"] = threading.get_ident()
+        return {"ok": True}
+
+    response = TestClient(app).post("/login")
+    assert response.status_code == 200 and response.headers["X-RateLimit-Remaining"] == "4"
+    assert threads["store"] != threads["loop"]
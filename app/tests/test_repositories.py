@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base, create_db_engine
+from app.models.user import User
+from app.repositories.post_repository import PostRepository
+from app.repositories.user_repository import UserRepository
+
+
+@pytest.fixture
+def db():
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add_all([User(id=1, email="a@b.com", password="x"), User(id=2, email="c@d.com", password="x")])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_get_by_email_uses_bound_parameter(db):
+    assert UserRepository.get_by_email(db, "c@d.com").id == 2
+    assert UserRepository.get_by_email(db, "missing@b.com") is None
+
+
+def test_get_by_user_orders_newest_first(db):
+    first = PostRepository.create(db, 1, "first")
+    second = PostRepository.create(db, 1, "second")
+    PostRepository.create(db, 2, "other user")
+
+    assert [p.id for p in PostRepository.get_by_user(db, 1)] == [second.id, first.id]
+    rows = list(PostRepository.get_rows_by_user(db, 1))
+    assert [(row[0], row[1]) for row in rows] == [(second.id, "second"), (first.id, "first")]
+
+
+def test_delete_only_removes_own_post(db):
+    post_id = PostRepository.create(db, 1, "mine").id
+
+    assert PostRepository.delete(db, 2, post_id) is False
+    assert PostRepository.delete(db, 1, post_id) is True
+    assert PostRepository.delete(db, 1, post_id) is False
+    assert PostRepository.get_by_user(db, 1) == []
@@ -0,0 +1,59 @@
+import logging
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config.server import server_options
+from app.config.settings import settings
+from app.middleware.access_log import SampledAccessLogMiddleware
+
+
+def test_default_profile_keeps_development_options():
+    options = server_options("default")
+    assert options == {"host": settings.HOST, "port": settings.PORT,
+                       "reload": settings.DEBUG, "log_level": "info"}
+
+
+def test_production_profile_tunes_server():
+    options = server_options("production")
+    assert options["loop"] in ("uvloop", "asyncio")
+    assert options["http"] in ("httptools", "h11")
+    assert options["access_log"] is False
+    assert options["limit_concurrency"] == settings.SERVER_LIMIT_CONCURRENCY
+    assert options["backlog"] == settings.SERVER_BACKLOG
+    assert options["timeout_keep_alive"] == settings.SERVER_KEEPALIVE_TIMEOUT
+
+    with pytest.raises(ValueError):
+        server_options("turbo")
+
+
+def test_production_profile_refuses_workers_without_shared_revocations():
+    config = settings.model_copy(update={"SERVER_WORKERS": 4, "REVOCATION_BACKEND": "memory"})
+    with pytest.raises(ValueError, match="REVOCATION_BACKEND"):
+        server_options("production", config)
+    config = settings.model_copy(update={"SERVER_WORKERS": 4, "REVOCATION_BACKEND": "database"})
+    assert server_options("production", config)["workers"] == 4
+
+
+def test_access_log_samples_requests_and_always_logs_errors(caplog):
+    app = FastAPI()
+    app.add_middleware(SampledAccessLogMiddleware, sample_rate=0.0, rng=random.Random(0))
+
+    @app.get("/ok")
+    async def ok():
+        return {}
+
+    @app.get("/fail")
+    async def fail():
+        raise RuntimeError
+
+    client = TestClient(app, raise_server_exceptions=False)
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        client.get("/ok")
+        client.get("/fail")
+
+    records = [r for r in caplog.records if r.name == "app.access"]
+    assert len(records) == 1
+    assert records[0].path == "/fail" and records[0].status == 500
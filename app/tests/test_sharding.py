@@ -0,0 +1,148 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.config.database import get_db
+from app.config.sharding import ShardMap, shard_index
+from app.models.post import Post
+from app.models.user import User
+from app.models.user_directory import UserDirectoryEntry
+from app.repositories.post_repository import PostRepository
+from app.repositories.user_directory_repository import UserDirectoryRepository
+from app.schemas.user import UserCreate
+from app.services.auth_service import AuthService
+from app.utils.jwt import decode_token
+from app.utils.resharding import backfill_directory, reshard
+
+
+def _urls(tmp_path, count, prefix="shard"):
+    return [f"sqlite:///{tmp_path / f'{prefix}{i}.db'}" for i in range(count)]
+
+
+def _counts(shards: ShardMap, model) -> list[int]:
+    counts = []
+    for sessions in shards.sessions:
+        with sessions() as db:
+            counts.append(db.scalar(select(func.count()).select_from(model)))
+    return counts
+
+
+def _seed(shards: ShardMap, user_ids):
+    for user_id in user_ids:
+        with shards.session_for(user_id) as db:
+            db.add(User(id=user_id, email=f"u{user_id}@example.com", password="x"))
+            db.commit()
+            PostRepository.bulk_create(db, [
+                {"id": str(uuid.uuid4()), "user_id": user_id, "text": f"post {i}",
+                 "created_at": datetime(2030, 1, 1, 0, i)}
+                for i in range(2)
+            ])
+
+
+def test_jump_hash_is_stable_and_only_moves_users_to_the_new_shard():
+    assignments = {user_id: shard_index(user_id, 3) for user_id in range(1, 3001)}
+    assert set(assignments.values()) == {0, 1, 2}
+    assert all(600 < list(assignments.values()).count(shard) < 1400 for shard in range(3))
+    for user_id, shard in assignments.items():
+        grown = shard_index(user_id, 4)
+        assert grown in (shard, 3)
+
+
+def test_signup_login_and_posts_are_routed_to_the_users_shard(tmp_path, monkeypatch):
+    from main import app
+
+    shards = ShardMap.from_urls(_urls(tmp_path, 3), directory_url=f"sqlite:///{tmp_path / 'global.db'}")
+    shards.init_schema()
+    for module in ("app.config.sharding", "app.services.auth_service", "app.services.post_service"):
+        monkeypatch.setattr(f"{module}.shard_map", shards)
+    monkeypatch.setattr("app.middleware.rate_limit.settings.RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr("app.services.post_service.cache_store", {})
+    monkeypatch.setattr("app.services.post_service.cache_versions", {})
+    monkeypatch.setattr("app.services.post_service.cache_bodies", {})
+
+    def directory_db():
+        with shards.directory_session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = directory_db
+    try:
+        client = TestClient(app)
+        tokens = {}
+        for i in range(6):
+            email = f"user{i}@example.com"
+            signup = client.post("/api/v1/auth/signup", json={"email": email, "password": "Passw0rd!x"})
+            assert signup.status_code == 201
+            user_id = decode_token(signup.json()["data"]["token"])["user_id"]
+            headers = {"Authorization": f"Bearer {signup.json()['data']['token']}"}
+            assert client.post("/api/v1/posts/", json={"text": email}, headers=headers).status_code == 201
+            tokens[user_id] = headers
+
+        duplicate = client.post("/api/v1/auth/signup", json={"email": "user0@example.com", "password": "Passw0rd!x"})
+        assert duplicate.json()["errors"] == ["Email already registered"]
+        login = client.post("/api/v1/auth/login", json={"email": "user3@example.com", "password": "Passw0rd!x"})
+        assert login.json()["status"] == "success"
+
+        assert sum(_counts(shards, User)) == 6 and sum(_counts(shards, Post)) == 6
+        for user_id, headers in tokens.items():
+            with shards.sessions[shards.shard_for(user_id)]() as db:
+                assert db.get(User, user_id) is not None
+            listing = client.get("/api/v1/posts/", headers=headers).json()["data"]
+            assert len(listing) == 1 and listing[0]["user_id"] == user_id
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+def test_signup_reclaims_an_old_directory_entry_left_without_a_user(tmp_path, monkeypatch):
+    shards = ShardMap.from_urls(_urls(tmp_path, 2), directory_url=f"sqlite:///{tmp_path / 'global.db'}")
+    shards.init_schema()
+    monkeypatch.setattr("app.services.auth_service.shard_map", shards)
+    with shards.directory_session() as db:
+        db.add_all([
+            UserDirectoryEntry(user_id=7, email="old@example.com", registered_at=datetime(2020, 1, 1)),
+            UserDirectoryEntry(user_id=8, email="new@example.com", registered_at=datetime.now()),
+        ])
+        db.commit()
+
+        token, user, error = AuthService.signup(db, UserCreate(email="old@example.com", password="Passw0rd!x"))
+        assert error is None and user["id"] != 7
+        assert UserDirectoryRepository.get_user_id(db, "old@example.com") == user["id"]
+        # A recent entry may belong to a signup still running, so the email stays taken
+        assert AuthService.signup(db, UserCreate(email="new@example.com", password="Passw0rd!x"))[2] == (
+            "Email already registered"
+        )
+
+
+def test_reshard_moves_only_users_whose_shard_changed(tmp_path):
+    source = ShardMap.from_urls(_urls(tmp_path, 2))
+    source.init_schema()
+    _seed(source, range(1, 41))
+    target = ShardMap.from_urls(_urls(tmp_path, 3))
+    target.init_schema()
+
+    moved = reshard(source, target, batch_size=7)
+
+    expected_moves = sum(1 for user_id in range(1, 41) if shard_index(user_id, 3) == 2)
+    assert moved == expected_moves > 0
+    assert sum(_counts(target, User)) == 40 and sum(_counts(target, Post)) == 80
+    for user_id in range(1, 41):
+        with target.session_for(user_id) as db:
+            assert len(PostRepository.get_by_user(db, user_id)) == 2
+    assert reshard(target, target) == 0
+
+
+def test_backfill_directory_registers_existing_users(tmp_path):
+    shards = ShardMap.from_urls(_urls(tmp_path, 2), directory_url=f"sqlite:///{tmp_path / 'global.db'}")
+    shards.init_schema()
+    _seed(shards, range(1, 11))
+
+    assert backfill_directory(shards, batch_size=3) == 10
+    assert backfill_directory(shards) == 0
+
+
+def test_duplicate_shard_urls_are_rejected(tmp_path):
+    url = _urls(tmp_path, 1)[0]
+    with pytest.raises(ValueError):
+        ShardMap.from_urls([url, url])
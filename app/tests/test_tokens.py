@@ -0,0 +1,120 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base, create_db_engine
+from app.models.revoked_token import RevokedToken
+from app.services.auth_service import AuthService
+from app.utils.auth import get_current_user
+from app.utils.jwt import create_access_token, create_refresh_token, decode_token
+from app.utils.revocation import DatabaseRevocationIndex, RevocationIndex
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = RevocationIndex(capacity=1000)
+    monkeypatch.setattr("app.utils.auth.revocation_index", index)
+    monkeypatch.setattr("app.services.auth_service.revocation_index", index)
+    return index
+
+
+def test_revocation_index_membership_and_prune():
+    now = [1000.0]
+    index = RevocationIndex(capacity=100, clock=lambda: now[0])
+    index.revoke("a", expires_at=1500)
+    index.revoke("b", expires_at=2500)
+    assert index.is_revoked("a") and index.is_revoked("b")
+    assert not index.is_revoked("c")
+
+    now[0] = 2000.0
+    assert index.prune() == 1
+    assert not index.is_revoked("a") and index.is_revoked("b")
+
+
+def test_tokens_carry_type_and_jti():
+    access = decode_token(create_access_token({"user_id": 1, "email": "a@b.com"}))
+    refresh = decode_token(create_refresh_token({"user_id": 1, "email": "a@b.com"}))
+    assert access["type"] == "access" and refresh["type"] == "refresh"
+    assert access["jti"] != refresh["jti"]
+
+
+def test_get_current_user_rejects_refresh_and_revoked_tokens(index):
+    access = create_access_token({"user_id": 1, "email": "a@b.com"})
+    user = get_current_user(None, bearer(access))
+    assert user["user_id"] == 1
+
+    with pytest.raises(HTTPException):
+        get_current_user(None, bearer(create_refresh_token({"user_id": 1, "email": "a@b.com"})))
+
+    AuthService.logout(user)
+    with pytest.raises(HTTPException) as exc:
+        get_current_user(None, bearer(access))
+    assert exc.value.detail == "Token has been revoked"
+
+
+def test_refresh_rotates_and_rejects_reuse(index):
+    refresh_token = AuthService.issue_refresh_token({"id": 1, "email": "a@b.com"})
+
+    access, rotated, error = AuthService.refresh(refresh_token)
+    assert error is None
+    assert decode_token(access)["user_id"] == 1
+    assert decode_token(rotated)["type"] == "refresh"
+
+    assert AuthService.refresh(refresh_token) == (None, None, "Refresh token has been revoked")
+    assert AuthService.refresh(access)[2] == "Invalid or expired refresh token"
+    assert AuthService.refresh("garbage")[2] == "Invalid or expired refresh token"
+
+
+def test_database_index_shares_revocations_between_workers(tmp_path, monkeypatch):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'revocations.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    now = [1000.0]
+    first = DatabaseRevocationIndex(Session, capacity=100, clock=lambda: now[0])
+    second = DatabaseRevocationIndex(Session, capacity=100, clock=lambda: now[0])
+
+    assert first.revoke("a", 1500) is True
+    assert not second.is_revoked("a")
+    assert second.sync() == 1 and second.is_revoked("a")
+    # The shared row makes a token revoked on another worker count as already revoked
+    assert second.revoke("a", 1500) is False
+
+    monkeypatch.setattr("app.services.auth_service.revocation_index", first)
+    refresh_token = AuthService.issue_refresh_token({"id": 1, "email": "a@b.com"})
+    assert AuthService.refresh(refresh_token)[2] is None
+    monkeypatch.setattr("app.services.auth_service.revocation_index", second)
+    assert AuthService.refresh(refresh_token)[2] == "Refresh token has been revoked"
+
+    now[0] = 2000.0
+    assert first.prune() == 1
+    third = DatabaseRevocationIndex(Session, capacity=100, clock=lambda: now[0])
+    third.sync()
+    assert not third.is_revoked("a") and len(third) == 1
+
+
+def test_database_index_sync_catches_revocations_committed_out_of_order(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'revocations.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    index = DatabaseRevocationIndex(Session, capacity=100, overlap_seconds=60)
+    at = datetime.datetime(2030, 1, 1, 12, 0, 0)
+    with Session() as db:
+        db.add(RevokedToken(id=2, jti="later-id", expires_at=4_000_000_000, revoked_at=at))
+        db.commit()
+    assert index.sync() == 1
+
+    # ID 1 was inserted first but its transaction committed after ID 2 was loaded
+    with Session() as db:
+        db.add(RevokedToken(id=1, jti="earlier-id", expires_at=4_000_000_000,
+                            revoked_at=at - datetime.timedelta(seconds=1)))
+        db.commit()
+    assert index.sync() == 1
+    assert index.is_revoked("earlier-id") and index.is_revoked("later-id")
+    assert index.sync() == 0
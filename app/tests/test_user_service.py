@@ -1,4 +1,12 @@
+import threading
 from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.models.user import User
 from app.services.auth_service import AuthService
 from app.schemas.user import UserCreate, UserLogin
 
@@ -67,3 +75,82 @@ def test_login_success(monkeypatch):
     assert token == "token"
     assert user_data["email"] == "a@b.com"
     assert error is None
+
+def test_login_rehashes_outdated_hash(monkeypatch):
+    db = MagicMock()
+    user_in = UserLogin(email="a@b.com", password="pw00bdswuruwiu")
+    user = DummyUser(password="old-cost-hash")
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.get_by_email", lambda db, email: user)
+    monkeypatch.setattr("app.services.auth_service.verify_password", lambda plain, hashed: True)
+    monkeypatch.setattr("app.services.auth_service.needs_rehash", lambda hashed: hashed == "old-cost-hash")
+    monkeypatch.setattr("app.services.auth_service.hash_password", lambda pw: "new-cost-hash")
+    monkeypatch.setattr("app.services.auth_service.create_access_token", lambda payload: "token")
+    updates = []
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.update_password",
+                        lambda db, u, hashed: updates.append(hashed))
+
+    token, user_data, error = AuthService.login(db, user_in)
+
+    assert token == "token" and error is None
+    assert updates == ["new-cost-hash"]
+
+def test_login_skips_rehash_for_current_hash(monkeypatch):
+    db = MagicMock()
+    user_in = UserLogin(email="a@b.com", password="pw00bdswuruwiu")
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.get_by_email", lambda db, email: DummyUser())
+    monkeypatch.setattr("app.services.auth_service.verify_password", lambda plain, hashed: True)
+    monkeypatch.setattr("app.services.auth_service.needs_rehash", lambda hashed: False)
+    monkeypatch.setattr("app.services.auth_service.create_access_token", lambda payload: "token")
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.update_password",
+                        MagicMock(side_effect=AssertionError("should not rehash")))
+
+    token, _, error = AuthService.login(db, user_in)
+    assert token == "token" and error is None
+
+def test_signup_maps_integrity_error_to_duplicate(monkeypatch):
+    db = MagicMock()
+    user_in = UserCreate(email="race@b.com", password="pwasw99onwjw")
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.get_by_email", lambda db, email: None)
+    monkeypatch.setattr("app.services.auth_service.hash_password", lambda pw: "hashed")
+
+    def duplicate_insert(db, user_in, hashed_pw):
+        raise IntegrityError("INSERT INTO users", {}, Exception("Duplicate entry"))
+
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.create", duplicate_insert)
+    token, user_data, error = AuthService.signup(db, user_in)
+
+    assert token is None and user_data is None and error == "Email already registered"
+    db.rollback.assert_called_once()
+
+def test_concurrent_signups_for_same_email(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'signup.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    Session = sessionmaker(bind=engine, autoflush=False)
+    monkeypatch.setattr("app.services.auth_service.hash_password", lambda pw: "hashed")
+    # Let every request slip past the pre-check so only the unique index can stop duplicates
+    monkeypatch.setattr("app.repositories.user_repository.UserRepository.get_by_email", lambda db, email: None)
+
+    attempts = 8
+    barrier = threading.Barrier(attempts)
+    results = []
+
+    def signup():
+        db = Session()
+        try:
+            barrier.wait()
+            results.append(AuthService.signup(db, UserCreate(email="same@b.com", password="pwasw99onwjw")))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=signup) for _ in range(attempts)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    successes = [r for r in results if r[2] is None]
+    assert len(results) == attempts
+    assert len(successes) == 1
+    assert all(r[2] == "Email already registered" for r in results if r[2] is not None)
+    with Session() as db:
+        assert db.query(User).filter(User.email == "same@b.com").count() == 1
@@ -5,3 +5,16 @@ def test_hash_and_verify_password():
     hashed = hash_password(pw)
     assert verify_password(pw, hashed)
     assert not verify_password("wrong", hashed)
+
+def test_needs_rehash_tracks_configured_cost():
+    from passlib.hash import bcrypt
+    from app.config.settings import settings
+    from app.utils.hashing import needs_rehash
+
+    other = bcrypt.using(rounds=settings.BCRYPT_ROUNDS - 1).hash("super-secret")
+    current = bcrypt.using(rounds=settings.BCRYPT_ROUNDS).hash("super-secret")
+    stronger = bcrypt.using(rounds=settings.BCRYPT_ROUNDS + 1).hash("super-secret")
+    assert needs_rehash(other)
+    assert not needs_rehash(current)
+    assert not needs_rehash(stronger)
+    assert not needs_rehash("not-a-hash")
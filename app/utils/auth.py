@@ -1,7 +1,8 @@
 from fastapi import HTTPException, status, Request, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
-from app.config.settings import settings
+from jose import JWTError
+from app.utils.jwt import decode_token
+from app.utils.revocation import revocation_index
 from typing import Dict, Any
 
 bearer_scheme = HTTPBearer()
@@ -13,27 +14,32 @@ def get_current_user(request: Request,
 
     This dependency retrieves the JWT from the request's Authorization header, decodes and verifies it,
     and returns the user's information if the token is valid.
-    If the token is missing, invalid, or expired, it raises an HTTPException with 401 Unauthorized.
+    If the token is missing, invalid, expired, revoked, or is a refresh token, it raises an
+    HTTPException with 401 Unauthorized. The revocation check is an O(1) in-memory lookup.
 
     Args:
         request (Request): The incoming HTTP request object.
         credentials (HTTPAuthorizationCredentials): The bearer token credentials extracted from the header.
 
     Returns:
-        Dict[str, Any]: A dictionary containing the user's ID and email if authentication is successful.
+        Dict[str, Any]: A dictionary containing the user's ID and email, plus the token's `jti` and `exp`
+        claims, if authentication is successful.
 
     Raises:
-        HTTPException: If the token is missing, invalid, expired, or the payload is malformed.
+        HTTPException: If the token is missing, invalid, expired, revoked, or the payload is malformed.
     """
     token = credentials.credentials if credentials else None
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid token")
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = decode_token(token)
         user_id = payload.get("user_id")
         email = payload.get("email")
-        if user_id is None or email is None:
+        jti = payload.get("jti")
+        if user_id is None or email is None or payload.get("type", "access") != "access":
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-        return {"user_id": user_id, "email": email}
+        if jti is not None and revocation_index.is_revoked(jti):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+        return {"user_id": user_id, "email": email, "jti": jti, "exp": payload.get("exp")}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
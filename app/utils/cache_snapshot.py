@@ -0,0 +1,168 @@
+"""Compact binary snapshot file for the post list cache.
+
+Layout (little-endian):
+
+- Header: magic `PCS1`, format version, entry count, write time (Unix seconds)
+  and the CRC32 of everything after the header.
+- Index: one fixed-size record per user with the user ID, the offset and length
+  of the user's posts, and the fingerprint the posts are validated with on load
+  (post count, total text bytes, newest post time).
+- Data: each user's posts, newest first, as length-prefixed ID and text with the
+  creation time in microseconds.
+
+The file is memory-mapped when read, so only the index is parsed up front and a
+user's posts are decoded only if that user passes validation. Files are written
+to a temporary path and renamed into place, so a reader never sees a partial
+file.
+"""
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Iterable, NamedTuple, Optional
+
+MAGIC = b"PCS1"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHIdI")
+_INDEX = struct.Struct("<qQIIQq")
+_POST = struct.Struct("<HqI")
+_NO_TIME = -(2 ** 63)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class Fingerprint(NamedTuple):
+    """Summary of a user's posts, compared with the user's post counters on load."""
+    post_count: int
+    total_bytes: int
+    last_post_at: Optional[datetime.datetime]
+
+
+class SnapshotEntry(NamedTuple):
+    """Index record of one user's posts in a snapshot."""
+    user_id: int
+    offset: int
+    length: int
+    fingerprint: Fingerprint
+
+
+def _to_micros(value: Optional[datetime.datetime]) -> int:
+    return _NO_TIME if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> Optional[datetime.datetime]:
+    return None if value == _NO_TIME else _EPOCH + datetime.timedelta(microseconds=value)
+
+
+def _encode_posts(posts: Iterable[tuple[str, str, datetime.datetime]]) -> bytes:
+    """Encodes `(post_id, text, created_at)` rows."""
+    parts = []
+    for post_id, text, created_at in posts:
+        raw_id, raw_text = post_id.encode("utf-8"), text.encode("utf-8")
+        parts += (_POST.pack(len(raw_id), _to_micros(created_at), len(raw_text)), raw_id, raw_text)
+    return b"".join(parts)
+
+
+def write_snapshot(path: str,
+                   entries: Iterable[tuple[int, Fingerprint, list[tuple[str, str, datetime.datetime]]]]) -> int:
+    """Writes a snapshot atomically.
+
+    Args:
+        path (str): Destination file.
+        entries: `(user_id, fingerprint, posts)` per user, posts as `(post_id, text, created_at)`.
+
+    Returns:
+        int: The number of users written.
+    """
+    entries = list(entries)
+    blobs = [_encode_posts(posts) for _, _, posts in entries]
+    offset = _HEADER.size + _INDEX.size * len(entries)
+    index = []
+    for (user_id, fp, _), blob in zip(entries, blobs):
+        index.append(_INDEX.pack(user_id, offset, len(blob), fp.post_count, fp.total_bytes,
+                                 _to_micros(fp.last_post_at)))
+        offset += len(blob)
+    body = b"".join(index) + b"".join(blobs)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), time.time(), zlib.crc32(body))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".cache-snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(entries)
+
+
+class CacheSnapshot:
+    """A memory-mapped snapshot file. Use as a context manager."""
+
+    def __init__(self, path: str):
+        """Maps and checks a snapshot file.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a valid snapshot of this format version.
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Cache snapshot {path} is truncated")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.count, self.written_at, crc = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} cache snapshot")
+            view = memoryview(self._map)
+            body = view[_HEADER.size:]
+            try:
+                intact = zlib.crc32(body) == crc
+            finally:
+                body.release()
+                view.release()
+            if not intact:
+                raise ValueError(f"Cache snapshot {path} is corrupt")
+        except BaseException:
+            self._map.close()
+            raise
+
+    def __enter__(self) -> "CacheSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmaps the file."""
+        self._map.close()
+
+    def entries(self) -> list[SnapshotEntry]:
+        """Returns the index records, in the order they were written."""
+        result = []
+        for i in range(self.count):
+            user_id, offset, length, count, total, last = _INDEX.unpack_from(self._map, _HEADER.size + i * _INDEX.size)
+            result.append(SnapshotEntry(user_id, offset, length, Fingerprint(count, total, _from_micros(last))))
+        return result
+
+    def posts(self, entry: SnapshotEntry) -> list[tuple[str, str, datetime.datetime]]:
+        """Decodes one user's posts as `(post_id, text, created_at)` rows, newest first."""
+        data = self._map
+        pos, end = entry.offset, entry.offset + entry.length
+        rows = []
+        while pos < end:
+            id_len, created, text_len = _POST.unpack_from(data, pos)
+            pos += _POST.size
+            post_id = data[pos:pos + id_len].decode("utf-8")
+            pos += id_len
+            text = data[pos:pos + text_len].decode("utf-8")
+            pos += text_len
+            rows.append((post_id, text, _from_micros(created)))
+        return rows
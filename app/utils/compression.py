@@ -0,0 +1,83 @@
+"""HTTP response compression utilities.
+
+Provides content-encoding negotiation and compression for gzip, and for brotli
+and zstd when their optional packages (`brotli`, `zstandard`) are installed.
+"""
+
+import gzip
+from typing import Callable, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Available codecs, in server preference order
+CODECS: dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    CODECS["zstd"] = lambda data: zstandard.ZstdCompressor(level=3).compress(data)
+if brotli is not None:
+    CODECS["br"] = lambda data: brotli.compress(data, quality=5)
+CODECS["gzip"] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "image/svg+xml")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Picks the best available content encoding for an Accept-Encoding header.
+
+    The client's q-values take precedence; ties are broken by server preference
+    (zstd, br, gzip). `*` matches any available codec not listed explicitly.
+
+    Args:
+        accept_encoding: The raw Accept-Encoding header value, if any.
+
+    Returns:
+        Optional[str]: The chosen encoding, or None to send the body uncompressed.
+    """
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for codec in CODECS:
+        q = weights.get(codec, wildcard)
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """Returns whether a response with this Content-Type is worth compressing."""
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compresses data with the given content encoding.
+
+    Args:
+        data: The uncompressed body.
+        encoding: A key of `CODECS`.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    return CODECS[encoding](data)
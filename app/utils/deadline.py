@@ -0,0 +1,90 @@
+"""
+Per-request deadlines.
+
+`DeadlineMiddleware` gives each request a time budget and stores it in a context
+variable for the duration of the request. The database engines read it before
+every statement (see `app.config.database`), so a query gets at most the time the
+request has left: MySQL receives a `MAX_EXECUTION_TIME` hint and SQLite is
+interrupted by a progress handler. A deadline is also marked cancelled when the
+client disconnects, so no further statements run for a request nobody is waiting
+for. Work outside a request (background threads, CLIs) has no deadline.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time or its client disconnected."""
+
+
+class Deadline:
+    """A point in time by which a request's work must finish, or None for no limit."""
+
+    def __init__(self, budget: Optional[float], clock: Callable[[], float] = time.monotonic):
+        """Starts the budget now.
+
+        Args:
+            budget (Optional[float]): Seconds the request may take; None for no time limit.
+            clock (Callable[[], float]): Monotonic clock in seconds.
+        """
+        self._clock = clock
+        self.expires_at = None if budget is None else clock() + budget
+        self.cancelled = False
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (0 once cancelled or expired), or None without a time limit."""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        """Whether the work should stop: the budget is spent or the request was cancelled."""
+        return self.remaining() == 0.0
+
+    def cancel(self) -> None:
+        """Marks the deadline as passed, e.g. because the client went away."""
+        self.cancelled = True
+
+    def check(self) -> None:
+        """Raises DeadlineExceeded if the deadline has passed."""
+        if self.expired():
+            raise DeadlineExceeded("Client disconnected" if self.cancelled else "Request deadline exceeded")
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Returns the deadline of the request being handled, or None."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Makes `deadline` the current deadline within the block."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def parse_budgets(spec: str) -> tuple[tuple[str, str, int], ...]:
+    """Parses comma-separated `METHOD /path-prefix=milliseconds` rules, longest prefix first.
+
+    Raises:
+        ValueError: If a rule is malformed.
+    """
+    rules = []
+    for rule in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, budget = rule.rpartition("=")
+        method, _, prefix = route.strip().partition(" ")
+        prefix = prefix.strip()
+        if not method or not prefix.startswith("/") or not budget.strip().isdigit():
+            raise ValueError(f"Invalid deadline rule {rule!r}, expected 'METHOD /path=milliseconds'")
+        rules.append((method.upper(), prefix, int(budget)))
+    return tuple(sorted(rules, key=lambda r: len(r[1]), reverse=True))
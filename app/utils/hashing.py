@@ -1,9 +1,27 @@
-"""Password hashing and verification utilities."""
+"""Password hashing and verification utilities.
+
+The bcrypt cost comes from `BCRYPT_ROUNDS`. Stored hashes made with a lower
+cost are reported by `needs_rehash` so they can be upgraded on the next
+successful login; stronger hashes are kept, so lowering the setting never
+weakens existing passwords. Run `python -m app.utils.hashing --target-ms 250`
+to pick a cost for this machine.
+"""
+
+import argparse
+import time
 
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from app.config.settings import settings
 
-# Initialize password hashing context with bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Initialize password hashing context with bcrypt; the configured cost is a floor, with no ceiling
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     """Hashes a plain text password using bcrypt.
@@ -30,3 +48,58 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         bool: True if the password matches the hash, False otherwise.
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Checks whether a stored hash was made with a cost below `BCRYPT_ROUNDS`.
+
+    Args:
+        hashed_password: The stored password hash.
+
+    Returns:
+        bool: True if the hash should be replaced after the next successful verify.
+            Hashes that cannot be identified are reported as up to date.
+    """
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        return False
+
+
+def calibrate_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> int:
+    """Finds the highest bcrypt cost whose verify time stays within a target on this machine.
+
+    Each extra round doubles the work, so the search stops at the first cost over target.
+
+    Args:
+        target_ms: The target verify latency in milliseconds.
+        min_rounds: The lowest cost considered; returned even if it is over target.
+        max_rounds: The highest cost considered.
+        samples: Verifications timed per cost; the fastest is used.
+
+    Returns:
+        int: The recommended `BCRYPT_ROUNDS`.
+    """
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        hashed = bcrypt.using(rounds=rounds).hash("calibration-password")
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            bcrypt.verify("calibration-password", hashed)
+            timings.append((time.perf_counter() - start) * 1000)
+        elapsed = min(timings)
+        print(f"rounds={rounds:<3} verify={elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = rounds
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick BCRYPT_ROUNDS for a target verify latency.")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target verify latency in milliseconds")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+    print(f"BCRYPT_ROUNDS={calibrate_rounds(args.target_ms, args.min_rounds, args.max_rounds)}")
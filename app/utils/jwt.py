@@ -1,14 +1,17 @@
 """JSON Web Token (JWT) utility functions.
 
-This module provides functionality for creating JWT access tokens used for
-authentication and authorization in the application. It uses the python-jose
-library for JWT operations and handles token expiration.
+This module provides functionality for creating JWT access and refresh tokens used
+for authentication and authorization in the application. It uses the python-jose
+library for JWT operations and handles token expiration. Every token carries a
+unique `jti` claim so it can be revoked, and a `type` claim ("access" or "refresh").
 """
 
+import uuid
+
 from jose import jwt
 from datetime import datetime, timedelta
 try:
-    from datetime import UTC  
+    from datetime import UTC
 except ImportError:
     from datetime import timezone
     UTC = timezone.utc
@@ -18,6 +21,16 @@ from app.config.settings import settings
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_MINUTES = settings.REFRESH_TOKEN_EXPIRE_MINUTES
+
+def _create_token(data: dict, token_type: str, expires_minutes: int) -> str:
+    """Signs a token of the given type with a fresh `jti` and expiry."""
+    to_encode = data.copy()
+    expire = datetime.now(UTC) + timedelta(minutes=expires_minutes)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": token_type})
+
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
 
 def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
     """Creates a new JWT access token with the provided data.
@@ -32,8 +45,35 @@ def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MIN
     Returns:
         str: A JWT token string that can be used for authentication.
     """
-    to_encode = data.copy()
-    expire = datetime.now(UTC) + timedelta(minutes=expires_delta or ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    return _create_token(data, "access", expires_delta or ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_refresh_token(data: dict, expires_delta: int = REFRESH_TOKEN_EXPIRE_MINUTES) -> str:
+    """Creates a new long-lived JWT refresh token with the provided data.
+
+    Refresh tokens are only accepted by the refresh endpoint, which exchanges them
+    for a new access token without re-checking the password.
+
+    Args:
+        data: Dictionary containing the claims to include in the token.
+        expires_delta: int. Token expiration time in minutes.
+
+    Returns:
+        str: A JWT refresh token string.
+    """
+    return _create_token(data, "refresh", expires_delta or REFRESH_TOKEN_EXPIRE_MINUTES)
+
+
+def decode_token(token: str) -> dict:
+    """Verifies a token's signature and expiry and returns its claims.
+
+    Args:
+        token: The encoded JWT.
+
+    Returns:
+        dict: The token claims.
+
+    Raises:
+        JWTError: If the token is malformed, tampered with or expired.
+    """
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -0,0 +1,108 @@
+"""
+Event-loop lag and request backlog monitoring.
+
+Handlers still do blocking work (database calls, bcrypt) on the event loop, so
+when traffic outgrows a worker the loop stalls and every request waits behind
+it. `LoadMonitor` measures that directly: a task sleeps for a fixed interval and
+records how much later than scheduled it woke up. Together with the number of
+requests accepted but not yet answered, this decides whether the worker is
+overloaded, which `LoadSheddingMiddleware` uses to turn away low-priority
+requests early.
+"""
+import asyncio
+import threading
+from typing import Any
+
+from app.config.settings import settings
+
+
+class LoadMonitor:
+    """Tracks event-loop lag and pending requests and decides when to shed load.
+
+    Lag is smoothed with an exponential moving average. The worker counts as
+    overloaded once the average exceeds `lag_threshold_ms`, and recovers only when
+    it falls below half of it, so shedding does not flap around the threshold.
+    Independently, any request arriving while more than `max_pending` requests
+    await a response is a candidate for shedding.
+    """
+
+    def __init__(self, interval_ms: int = settings.LOAD_MONITOR_INTERVAL_MS,
+                 lag_threshold_ms: int = settings.LOAD_SHED_LAG_MS,
+                 max_pending: int = settings.LOAD_SHED_MAX_PENDING,
+                 smoothing: float = 0.3):
+        """Initializes the monitor without starting it.
+
+        Args:
+            interval_ms (int): How often the loop is probed.
+            lag_threshold_ms (int): Average lag above which the worker is overloaded.
+            max_pending (int): Pending requests above which low-priority requests are shed.
+            smoothing (float): Weight of the newest sample in the lag average.
+        """
+        self.interval = interval_ms / 1000
+        self.lag_threshold = lag_threshold_ms / 1000
+        self.max_pending = max_pending
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self.lag_avg = 0.0
+        self.lag_max = 0.0
+        self.pending = 0
+        self.overloaded = False
+        self.shed_total = 0
+        self._lock = threading.Lock()
+
+    def record_lag(self, lag: float) -> None:
+        """Adds a lag sample in seconds and updates the overload state."""
+        self.lag = lag
+        self.lag_avg += self.smoothing * (lag - self.lag_avg)
+        self.lag_max = max(self.lag_max, lag)
+        if self.lag_avg > self.lag_threshold:
+            self.overloaded = True
+        elif self.lag_avg < self.lag_threshold / 2:
+            self.overloaded = False
+
+    def should_shed(self) -> bool:
+        """Whether a low-priority request arriving now should be rejected."""
+        return self.overloaded or self.pending > self.max_pending
+
+    def request_started(self) -> None:
+        """Counts a request that has not been answered yet."""
+        with self._lock:
+            self.pending += 1
+
+    def request_answered(self) -> None:
+        """Uncounts a request once its response has started (or it failed)."""
+        with self._lock:
+            self.pending -= 1
+
+    def request_shed(self) -> None:
+        """Counts a request rejected by load shedding."""
+        with self._lock:
+            self.shed_total += 1
+
+    def metrics(self) -> dict[str, Any]:
+        """Returns the current load figures and resets the peak lag.
+
+        Returns:
+            dict[str, Any]: `loop_lag_ms` (last sample), `loop_lag_avg_ms`, `loop_lag_max_ms`
+            (peak since the previous call), `pending_requests`, `shedding` and `shed_total`.
+        """
+        peak, self.lag_max = self.lag_max, self.lag
+        return {
+            "loop_lag_ms": round(self.lag * 1000, 2),
+            "loop_lag_avg_ms": round(self.lag_avg * 1000, 2),
+            "loop_lag_max_ms": round(peak * 1000, 2),
+            "pending_requests": self.pending,
+            "shedding": self.should_shed(),
+            "shed_total": self.shed_total,
+        }
+
+    async def run(self) -> None:
+        """Probes the running loop every `interval` seconds until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, loop.time() - scheduled))
+
+
+load_monitor = LoadMonitor()
@@ -0,0 +1,160 @@
+"""Migration and backfill between plain and compressed post body storage.
+
+Switching `POST_TEXT_COMPRESSION` changes how `posts.text` is stored, so existing
+rows must be rewritten. On MySQL compressed bodies need a `LONGBLOB` column, and
+the column type must change before the encoder does:
+
+- To enable: run `python -m app.utils.post_storage --prepare` to alter the column
+  to `LONGBLOB` (a no-op elsewhere or if already done), then set
+  `POST_TEXT_COMPRESSION=True` and deploy, then run
+  `python -m app.utils.post_storage --to compressed` to re-encode existing rows in
+  batches. Uncompressed workers read the binary column fine, and rows not yet
+  backfilled are still readable, since values without a codec marker are decoded
+  as plain UTF-8.
+- To disable: set `POST_TEXT_COMPRESSION=False` and deploy, then run
+  `python -m app.utils.post_storage --to text`, which decodes the rows and alters
+  the column back to `LONGTEXT`. Uncompressed workers decode compressed rows
+  while this runs.
+
+Workers refuse to start with compression enabled on a MySQL column that has not
+been prepared (see `check_post_storage`).
+
+Rows are walked in primary-key order and each batch is committed separately, so
+the command can be interrupted and rerun; already converted rows are skipped.
+"""
+import argparse
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.config.settings import settings
+from app.models.types import MARKERS, decode_text, encode_text
+
+logger = logging.getLogger(__name__)
+
+_select_batch = text("SELECT id, text FROM posts WHERE id > :last_id ORDER BY id LIMIT :limit")
+_update_text = text("UPDATE posts SET text = :value WHERE id = :id")
+
+
+def _is_encoded(value) -> bool:
+    """Whether a stored value already carries a codec marker."""
+    return isinstance(value, bytes) and bool(value) and value[0] in MARKERS
+
+
+def _convert(value, to: str, min_size: int, codec: str):
+    """Returns the new stored value for a row, or None if it is already in the target format."""
+    if to == "compressed":
+        if _is_encoded(value):
+            return None
+        plain = value.decode("utf-8") if isinstance(value, bytes) else value
+        return encode_text(plain, min_size, codec)
+    if isinstance(value, str):
+        return None
+    return decode_text(value)
+
+
+def _is_binary_column(engine: Engine) -> bool:
+    """Whether `posts.text` is a binary column on a MySQL database."""
+    column = next(c for c in inspect(engine).get_columns("posts") if c["name"] == "text")
+    return "BLOB" in str(column["type"]).upper()
+
+
+def prepare_post_storage(engine: Engine) -> bool:
+    """Alters `posts.text` to `LONGBLOB` on MySQL so it can hold compressed bodies.
+
+    Must run before `POST_TEXT_COMPRESSION` is enabled. Other databases store the
+    values as they are, so nothing is done there.
+
+    Args:
+        engine: The engine of the database to prepare.
+
+    Returns:
+        bool: True if the column was altered, False if there was nothing to do.
+    """
+    if engine.dialect.name != "mysql" or _is_binary_column(engine):
+        return False
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE posts MODIFY COLUMN text LONGBLOB NOT NULL")
+    logger.info("Altered posts.text to LONGBLOB")
+    return True
+
+
+def check_post_storage(engine: Engine, compression: bool = settings.POST_TEXT_COMPRESSION) -> None:
+    """Refuses compressed writes into a MySQL text column.
+
+    Raises:
+        RuntimeError: If compression is enabled but `posts.text` has not been prepared.
+    """
+    if compression and engine.dialect.name == "mysql" and not _is_binary_column(engine):
+        raise RuntimeError(
+            "POST_TEXT_COMPRESSION is enabled but posts.text is not LONGBLOB; "
+            "run `python -m app.utils.post_storage --prepare` first"
+        )
+
+
+def migrate_post_storage(engine: Engine, to: str, batch_size: int = 500,
+                         min_size: int = settings.POST_TEXT_COMPRESSION_MIN_SIZE,
+                         codec: str = settings.POST_TEXT_COMPRESSION_CODEC) -> int:
+    """Rewrites every post body into the target storage format.
+
+    Args:
+        engine: The engine of the database to migrate.
+        to: "compressed" or "text".
+        batch_size: Rows read and updated per transaction.
+        min_size: Bodies smaller than this are stored uncompressed (compressed mode only).
+        codec: "zstd" or "zlib" (compressed mode only).
+
+    Returns:
+        int: The number of rows rewritten.
+
+    Raises:
+        ValueError: If `to` is not a known format.
+    """
+    if to not in ("compressed", "text"):
+        raise ValueError(f"Unknown storage format: {to!r}")
+    mysql = engine.dialect.name == "mysql"
+    if to == "compressed":
+        prepare_post_storage(engine)
+
+    rewritten = 0
+    last_id = ""
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(_select_batch, {"last_id": last_id, "limit": batch_size}).all()
+            if not rows:
+                break
+            updates = []
+            for post_id, value in rows:
+                converted = _convert(value, to, min_size, codec)
+                if converted is not None:
+                    updates.append({"id": post_id, "value": converted})
+            if updates:
+                conn.execute(_update_text, updates)
+        rewritten += len(updates)
+        last_id = rows[-1][0]
+        logger.info("Rewrote %d post bodies (through id %s)", rewritten, last_id)
+
+    if to == "text" and mysql:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "ALTER TABLE posts MODIFY COLUMN text LONGTEXT CHARACTER SET utf8mb4 NOT NULL"
+            )
+    return rewritten
+
+
+if __name__ == "__main__":
+    from app.config.sharding import shard_map
+
+    parser = argparse.ArgumentParser(description="Convert stored post bodies between plain and compressed form.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--prepare", action="store_true",
+                        help="Alter the column for compressed storage; run before enabling compression")
+    action.add_argument("--to", choices=("compressed", "text"))
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    for shard, engine in enumerate(shard_map.engines):
+        if args.prepare:
+            print(f"shard {shard}: {'altered' if prepare_post_storage(engine) else 'already prepared'}")
+        else:
+            print(f"shard {shard}: rewrote {migrate_post_storage(engine, args.to, args.batch_size)} posts")
@@ -0,0 +1,218 @@
+"""Token bucket rate limiting stores.
+
+`MemoryRateLimitStore` keeps one small bucket per key in-process with an O(1)
+check and periodic compaction of idle buckets. `RedisRateLimitStore` applies
+the same algorithm atomically in Redis so limits hold across workers; it needs
+the optional `redis` package.
+"""
+
+import math
+import time
+from threading import Lock
+from typing import Callable, NamedTuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from app.config.settings import settings
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit(NamedTuple):
+    """A limit of `burst` requests, refilled at `rate` requests per second."""
+    burst: int
+    rate: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """Parses a limit such as `"10/minute"` or `"5/second"`.
+
+        Args:
+            spec: `<count>/<second|minute|hour|day>`.
+
+        Returns:
+            RateLimit: The parsed limit.
+
+        Raises:
+            ValueError: If the spec is malformed.
+        """
+        count, _, period = spec.partition("/")
+        if period not in PERIODS or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid rate limit: {spec!r}")
+        return cls(burst=int(count), rate=int(count) / PERIODS[period])
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+class _Bucket:
+    """Token bucket state. `full_at` is when the bucket will have refilled completely."""
+    __slots__ = ("tokens", "updated", "full_at")
+
+    def __init__(self, tokens: float, updated: float, full_at: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.full_at = full_at
+
+
+class MemoryRateLimitStore:
+    """In-process token bucket store, one bucket per key."""
+
+    # `acquire` only touches memory and can run on the event loop
+    blocking = False
+
+    def __init__(self, compact_interval: float = settings.RATE_LIMIT_COMPACT_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initializes an empty store.
+
+        Args:
+            compact_interval: Seconds between sweeps that drop buckets which have refilled.
+            clock: Monotonic time source in seconds.
+        """
+        self._buckets: dict[str, _Bucket] = {}
+        self._lock = Lock()
+        self._clock = clock
+        self._compact_interval = compact_interval
+        self._next_compact = clock() + compact_interval
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """Takes one token from the key's bucket if one is available.
+
+        Args:
+            key: The bucket key, e.g. `"login:203.0.113.7"`.
+            limit: The limit applying to the key.
+
+        Returns:
+            RateLimitResult: Whether the request is allowed and the bucket state.
+        """
+        now = self._clock()
+        with self._lock:
+            if now >= self._next_compact:
+                self._compact(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(limit.burst)
+            else:
+                tokens = min(limit.burst, bucket.tokens + (now - bucket.updated) * limit.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            full_at = now + (limit.burst - tokens) / limit.rate
+            if bucket is None:
+                self._buckets[key] = _Bucket(tokens, now, full_at)
+            else:
+                bucket.tokens, bucket.updated, bucket.full_at = tokens, now, full_at
+        retry_after = 0.0 if allowed else (1 - tokens) / limit.rate
+        return RateLimitResult(allowed, limit.burst, int(tokens), retry_after)
+
+    def _compact(self, now: float) -> None:
+        """Drops buckets that have refilled, since a missing bucket is equivalent to a full one.
+
+        Must be called with the store lock held.
+        """
+        self._buckets = {k: b for k, b in self._buckets.items() if b.full_at > now}
+        self._next_compact = now + self._compact_interval
+
+
+class RedisRateLimitStore:
+    """Token bucket store shared between workers through Redis."""
+
+    # `acquire` makes a network round trip, so callers on the event loop run it in a thread
+    blocking = True
+
+    _SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str = settings.RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:"):
+        """Connects to Redis.
+
+        Args:
+            url: Redis connection URL.
+            prefix: Prefix for bucket keys.
+
+        Raises:
+            RuntimeError: If the `redis` package is not installed.
+        """
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+        self._prefix = prefix
+
+    def acquire(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """Takes one token from the key's bucket if one is available. See `MemoryRateLimitStore.acquire`."""
+        allowed, tokens = self._script(keys=[self._prefix + key], args=[limit.burst, limit.rate, time.time()])
+        tokens = float(tokens)
+        retry_after = 0.0 if allowed else (1 - tokens) / limit.rate
+        return RateLimitResult(bool(allowed), limit.burst, int(tokens), retry_after)
+
+
+class ConcurrencyLimiter:
+    """Counts in-flight requests per key and refuses those above a maximum."""
+
+    def __init__(self):
+        self._active: dict[str, int] = {}
+        self._lock = Lock()
+
+    def try_acquire(self, key: str, max_concurrent: int) -> bool:
+        """Registers an in-flight request for `key` unless `max_concurrent` are already running."""
+        with self._lock:
+            active = self._active.get(key, 0)
+            if active >= max_concurrent:
+                return False
+            self._active[key] = active + 1
+            return True
+
+    def release(self, key: str) -> None:
+        """Marks one in-flight request for `key` as finished."""
+        with self._lock:
+            active = self._active.get(key, 0) - 1
+            if active > 0:
+                self._active[key] = active
+            else:
+                self._active.pop(key, None)
+
+
+def create_store(backend: str = settings.RATE_LIMIT_BACKEND) -> "MemoryRateLimitStore | RedisRateLimitStore":
+    """Creates the rate limit store configured in settings."""
+    if backend == "redis":
+        return RedisRateLimitStore()
+    if backend == "memory":
+        return MemoryRateLimitStore()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend!r}")
+
+
+def retry_after_header(seconds: float) -> str:
+    """Formats a Retry-After value, rounding up to whole seconds."""
+    return str(max(1, math.ceil(seconds)))
+
+
+rate_limit_store = create_store()
+concurrency_limiter = ConcurrencyLimiter()
+
@@ -0,0 +1,143 @@
+"""Resharding and directory backfill for sharded users.
+
+Appending a shard to `DB_SHARD_URLS` changes which shard some users hash to.
+Before deploying the new list, move those users with:
+
+    python -m app.utils.resharding --from <old shard urls> --to <new shard urls>
+
+Each user whose shard changes is copied with their posts (including
+soft-deleted ones) and counters into the new shard, then removed from the old
+one, a batch of users at a time. A batch that was copied but not yet removed is
+overwritten when the command is rerun, so it can be interrupted and restarted.
+Writes must be paused while it runs, since requests would still be routed by
+the old shard list.
+
+Moving from a single database to shards needs the email directory filled from
+the existing users first:
+
+    python -m app.utils.resharding --backfill-directory
+"""
+import argparse
+import logging
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Engine
+
+from app.config.sharding import ShardMap
+from app.models.post import Post
+from app.models.user import User
+from app.models.user_post_stats import UserPostStats
+from app.repositories.user_directory_repository import UserDirectoryRepository
+
+logger = logging.getLogger(__name__)
+
+_users, _posts, _stats = User.__table__, Post.__table__, UserPostStats.__table__
+
+
+def _same_database(a: Engine, b: Engine) -> bool:
+    """Whether two engines point at the same database."""
+    return a is b or a.url.render_as_string(hide_password=False) == b.url.render_as_string(hide_password=False)
+
+
+def _copy_users(source: Engine, target: Engine, user_ids: list[int]) -> None:
+    """Copies users with their posts and counters, replacing any partial copy left on the target."""
+    with source.connect() as conn:
+        users = [row._asdict() for row in conn.execute(select(_users).where(_users.c.id.in_(user_ids)))]
+        posts = [row._asdict() for row in conn.execute(select(_posts).where(_posts.c.user_id.in_(user_ids)))]
+        stats = [row._asdict() for row in conn.execute(select(_stats).where(_stats.c.user_id.in_(user_ids)))]
+    with target.begin() as conn:
+        _delete_users(conn, user_ids)
+        for table, rows in ((_users, users), (_posts, posts), (_stats, stats)):
+            if rows:
+                conn.execute(insert(table), rows)
+
+
+def _delete_users(conn, user_ids: list[int]) -> None:
+    """Deletes users with their posts and counters, children first."""
+    conn.execute(delete(_posts).where(_posts.c.user_id.in_(user_ids)))
+    conn.execute(delete(_stats).where(_stats.c.user_id.in_(user_ids)))
+    conn.execute(delete(_users).where(_users.c.id.in_(user_ids)))
+
+
+def reshard(source: ShardMap, target: ShardMap, batch_size: int = 100) -> int:
+    """Moves every user whose shard differs between two shard maps.
+
+    Args:
+        source (ShardMap): The shards users currently live on.
+        target (ShardMap): The shards users should live on.
+        batch_size (int): Users read per batch from a source shard.
+
+    Returns:
+        int: The number of users moved.
+    """
+    moved = 0
+    for shard, source_engine in enumerate(source.engines):
+        last_user_id = 0
+        while True:
+            with source_engine.connect() as conn:
+                user_ids = conn.scalars(
+                    select(_users.c.id).where(_users.c.id > last_user_id).order_by(_users.c.id).limit(batch_size)
+                ).all()
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+            by_target: dict[int, list[int]] = {}
+            for user_id in user_ids:
+                if not _same_database(source_engine, target.engine_for(user_id)):
+                    by_target.setdefault(target.shard_for(user_id), []).append(user_id)
+            for target_shard, batch in by_target.items():
+                _copy_users(source_engine, target.engines[target_shard], batch)
+                with source_engine.begin() as conn:
+                    _delete_users(conn, batch)
+                moved += len(batch)
+                logger.info("Moved %d users from shard %d to shard %d", len(batch), shard, target_shard)
+    return moved
+
+
+def backfill_directory(shards: ShardMap, batch_size: int = 500) -> int:
+    """Adds every user found on the shards to the global email directory.
+
+    Args:
+        shards (ShardMap): The shards to read users from; entries go to its directory.
+        batch_size (int): Users read and registered per batch.
+
+    Returns:
+        int: The number of directory entries added.
+    """
+    added = 0
+    for shard_engine in shards.engines:
+        last_user_id = 0
+        while True:
+            with shard_engine.connect() as conn:
+                users = conn.execute(
+                    select(_users.c.id, _users.c.email)
+                    .where(_users.c.id > last_user_id).order_by(_users.c.id).limit(batch_size)
+                ).all()
+            if not users:
+                break
+            with shards.directory_session() as db:
+                added += UserDirectoryRepository.add_missing(db, [(user_id, email) for user_id, email in users])
+            last_user_id = users[-1][0]
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move users between shard layouts or backfill the email directory.")
+    parser.add_argument("--from", dest="source", help="Comma-separated current shard URLs")
+    parser.add_argument("--to", dest="target", help="Comma-separated new shard URLs")
+    parser.add_argument("--backfill-directory", action="store_true",
+                        help="Register the users of the configured shards in the email directory")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    if args.backfill_directory:
+        from app.config.sharding import shard_map
+
+        shard_map.init_schema()
+        print(f"Added {backfill_directory(shard_map, args.batch_size)} directory entries")
+    elif args.source and args.target:
+        source_map = ShardMap.from_urls(args.source.split(","))
+        target_map = ShardMap.from_urls(args.target.split(","))
+        target_map.init_schema()
+        print(f"Moved {reshard(source_map, target_map, args.batch_size)} users")
+    else:
+        parser.error("pass --from and --to, or --backfill-directory")
@@ -0,0 +1,228 @@
+"""Revocation index for JWT token IDs.
+
+Revoked token IDs (`jti` claims) are kept in an exact dict mapping each ID to
+its expiry, fronted by a bloom filter so the common case - a token that was
+never revoked - is rejected by a few bit tests without touching the dict.
+Entries are pruned once their token would have expired anyway.
+
+`RevocationIndex` is per process, so a revocation only reaches the worker that
+handled it; it is only safe with a single worker. `DatabaseRevocationIndex`
+also records revocations in the shared `revoked_tokens` table, loads them at
+startup and syncs new ones every `REVOCATION_SYNC_INTERVAL_SECONDS` (re-reading
+`REVOCATION_SYNC_OVERLAP_SECONDS` of history for late commits), so checks
+stay in memory while every worker converges on the same set.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import math
+import time
+from threading import Lock
+from typing import Callable, Iterable, Optional
+
+import anyio
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.repositories.revocation_repository import RevocationRepository
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """Sizes the filter for `capacity` items at the given false positive rate."""
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        """Adds an item to the filter."""
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationIndex:
+    """Set of revoked token IDs with O(1) membership checks."""
+
+    def __init__(self, capacity: int = settings.REVOCATION_BLOOM_CAPACITY,
+                 clock: Callable[[], float] = time.time):
+        """Initializes an empty index.
+
+        Args:
+            capacity: Expected number of live revocations; sizes the bloom filter.
+            clock: Time source returning epoch seconds.
+        """
+        self.capacity = capacity
+        self._clock = clock
+        self._revoked: dict[str, float] = {}
+        self._bloom = BloomFilter(capacity)
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        """Revokes a token ID until its token expires.
+
+        Args:
+            jti: The token's `jti` claim.
+            expires_at: The token's `exp` claim, in epoch seconds.
+
+        Returns:
+            bool: True if this call revoked it, False if it was already revoked.
+        """
+        with self._lock:
+            if jti in self._revoked:
+                return False
+            self._revoked[jti] = expires_at
+            self._bloom.add(jti)
+            return True
+
+    def is_revoked(self, jti: str) -> bool:
+        """Checks whether a token ID has been revoked."""
+        return jti in self._bloom and jti in self._revoked
+
+    def prune(self) -> int:
+        """Drops revocations of tokens that have expired and rebuilds the bloom filter.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        now = self._clock()
+        with self._lock:
+            live = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            removed = len(self._revoked) - len(live)
+            if removed:
+                bloom = BloomFilter(max(self.capacity, len(live)))
+                for jti in live:
+                    bloom.add(jti)
+                self._revoked, self._bloom = live, bloom
+        return removed
+
+    def sync(self) -> int:
+        """Loads revocations made by other workers; a per-process index has none.
+
+        Returns:
+            int: The number of revocations loaded.
+        """
+        return 0
+
+
+class DatabaseRevocationIndex(RevocationIndex):
+    """Revocation index shared across workers through the `revoked_tokens` table.
+
+    Checks only consult the in-memory index. A revocation is written to the table
+    first, whose unique `jti` decides which worker revoked a token, so a refresh
+    token is accepted once even when two workers see it at the same time.
+    """
+
+    def __init__(self, session_factory: Callable = SessionLocal,
+                 capacity: int = settings.REVOCATION_BLOOM_CAPACITY,
+                 clock: Callable[[], float] = time.time,
+                 overlap_seconds: float = settings.REVOCATION_SYNC_OVERLAP_SECONDS):
+        """Initializes an empty index; call `sync` to load the shared revocations.
+
+        Args:
+            session_factory: Factory returning a new database session.
+            capacity: Expected number of live revocations; sizes the bloom filter.
+            clock: Time source returning epoch seconds.
+            overlap_seconds: How far back each sync re-reads, to catch revocations
+                whose transactions committed after newer ones.
+        """
+        super().__init__(capacity, clock)
+        self._session_factory = session_factory
+        self.overlap = datetime.timedelta(seconds=overlap_seconds)
+        # Newest `revoked_at` loaded so far; None until the first sync
+        self._synced_through: Optional[datetime.datetime] = None
+        self._sync_lock = Lock()
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        """Records the revocation in the shared table, then locally. See `RevocationIndex.revoke`."""
+        with self._session_factory() as db:
+            revoked = RevocationRepository.add(db, jti, int(expires_at))
+        super().revoke(jti, expires_at)
+        return revoked
+
+    def sync(self) -> int:
+        """Loads every revocation recorded since the last sync, by any worker.
+
+        A revocation's `revoked_at` is taken when it is inserted, but it only
+        becomes visible when its transaction commits, possibly after newer ones.
+        So each sync starts `overlap` before the newest time already loaded;
+        revocations already in the index are skipped.
+        """
+        loaded = 0
+        with self._sync_lock:
+            newest = self._synced_through
+            after_at = datetime.datetime.min if newest is None else newest - self.overlap
+            after_id = 0
+            while True:
+                with self._session_factory() as db:
+                    rows = RevocationRepository.since(db, after_at, after_id)
+                if not rows:
+                    break
+                for _, jti, expires_at, _ in rows:
+                    loaded += super().revoke(jti, expires_at)
+                after_id, after_at = rows[-1][0], rows[-1][3]
+                newest = after_at if newest is None else max(newest, after_at)
+            self._synced_through = newest
+        return loaded
+
+    def prune(self) -> int:
+        """Drops expired revocations locally and a batch of them from the shared table."""
+        removed = super().prune()
+        with self._session_factory() as db:
+            RevocationRepository.purge_expired(db, int(self._clock()))
+        return removed
+
+
+def create_revocation_index(backend: str = settings.REVOCATION_BACKEND) -> RevocationIndex:
+    """Creates the revocation index configured in settings."""
+    if backend == "database":
+        return DatabaseRevocationIndex()
+    if backend == "memory":
+        return RevocationIndex()
+    raise ValueError(f"Unknown REVOCATION_BACKEND: {backend!r}")
+
+
+async def sync_periodically(index: RevocationIndex,
+                            interval: float = settings.REVOCATION_SYNC_INTERVAL_SECONDS) -> None:
+    """Loads other workers' revocations every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await anyio.to_thread.run_sync(index.sync)
+        except Exception as e:
+            logger.error("Token revocation sync failed: %s", e)
+
+
+async def prune_periodically(index: RevocationIndex,
+                             interval: float = settings.REVOCATION_PRUNE_INTERVAL_SECONDS) -> None:
+    """Prunes the index every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await anyio.to_thread.run_sync(index.prune)
+        except Exception as e:
+            logger.error("Token revocation prune failed: %s", e)
+            continue
+        if removed:
+            logger.debug("Pruned %d expired token revocations", removed)
+
+
+revocation_index = create_revocation_index()
@@ -0,0 +1,73 @@
+"""Warming the post cache from a snapshot vs cold listing queries.
+
+Seeds an in-memory SQLite database, then fills the cache for every user either
+with one listing query per user (what a fresh worker does on first reads) or by
+restoring a snapshot file, which validates users against their post counters in
+batched primary-key lookups.
+
+Usage:
+    python -m benchmarks.cache_snapshot [--users 2000] [--posts 20]
+"""
+import argparse
+import os
+import tempfile
+
+from sqlalchemy.orm import sessionmaker
+
+from app.config.sharding import ShardMap
+from app.models.user import User
+from app.services import post_service
+from app.services.post_stats_service import PostStatsService
+from benchmarks.harness import QueryCounter, make_engine, measure, print_table, seed_posts
+
+
+def _clear_cache() -> None:
+    for store in (post_service.cache_store, post_service.cache_versions, post_service.cache_bodies):
+        store.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.execute(User.__table__.insert(), [
+            {"id": user_id, "email": f"user{user_id}@example.com", "password": "x"}
+            for user_id in range(1, args.users + 1)
+        ])
+        seed_posts(db, users=args.users, posts_per_user=args.posts)
+    PostStatsService.reconcile(Session)
+    post_service.shard_map = ShardMap([engine], engine, [Session], Session)
+    user_ids = range(1, args.users + 1)
+
+    def cold() -> None:
+        _clear_cache()
+        with Session() as db:
+            for user_id in user_ids:
+                post_service._cached_posts(db, user_id)
+
+    path = os.path.join(tempfile.mkdtemp(), "cache.snapshot")
+    cold()
+    post_service.cache_hits.update(dict.fromkeys(user_ids, 1))
+    post_service.snapshot_cache(path, max_users=args.users)
+
+    def warm() -> None:
+        _clear_cache()
+        assert post_service.restore_cache(path) == args.users
+
+    rows = []
+    for name, fill in (("listing queries", cold), ("snapshot restore", warm)):
+        with QueryCounter(engine, "SELECT") as counter:
+            fill()
+        seconds = measure(fill, repeat=3)
+        rows.append([name, counter.count, f"{seconds * 1000:.1f}"])
+    print_table(["warm-up", "queries", "ms"], rows)
+    print(f"snapshot size: {os.path.getsize(path) / 1024:.0f} KiB for {args.users} users")
+
+
+if __name__ == "__main__":
+    main()
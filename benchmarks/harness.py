@@ -0,0 +1,89 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against an in-memory SQLite database so they need no outside
+services. They still import the application, so the usual `.env` settings
+must be loadable.
+"""
+import datetime
+import statistics
+import time
+import uuid
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config.database import Base, create_db_engine
+from app.models.post import Post  # noqa: F401  (register table)
+from app.models.user import User  # noqa: F401  (register table)
+
+
+def make_engine() -> Engine:
+    """Creates an in-memory SQLite engine with all application tables."""
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def make_session(engine: Engine) -> Session:
+    """Returns a new session bound to `engine`."""
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def seed_posts(db: Session, users: int, posts_per_user: int, text_size: int = 200) -> None:
+    """Inserts `posts_per_user` posts for each of `users` users."""
+    start = datetime.datetime(2025, 1, 1)
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "text": "x" * text_size,
+            "created_at": start + datetime.timedelta(seconds=i)
+        }
+        for user_id in range(1, users + 1)
+        for i in range(posts_per_user)
+    ]
+    db.execute(Post.__table__.insert(), rows)
+    db.commit()
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine while the context is active."""
+
+    def __init__(self, engine: Engine, prefix: str = ""):
+        self.engine = engine
+        self.prefix = prefix.upper()
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(self.prefix):
+            self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, number: int = 1) -> float:
+    """Returns the median wall time in seconds of `number` calls to `fn`, over `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+
+def print_table(headers: list[str], rows: Iterable[Iterable[Any]]) -> None:
+    """Prints rows as a simple aligned table."""
+    rows = [[str(c) for c in row] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(c.ljust(w) for c, w in zip(row, widths)))
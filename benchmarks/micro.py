@@ -0,0 +1,243 @@
+"""Microbenchmarks of the request building blocks, checked against a stored baseline.
+
+Times each piece on its own: `PostService.get_posts` cache hits and misses at
+several list sizes, access token creation and `get_current_user` decoding,
+`hash_password`/`verify_password` at several bcrypt costs, `PostCreate`
+validation from 1 KB to 1 MB, and listing/creation response serialization.
+Each case is run enough times per sample to be measurable and the median of
+the samples is reported.
+
+Save a baseline on the reference commit, then compare later runs against it;
+the exit status is 1 if any case is slower than its baseline by more than the
+threshold. Baselines are machine-specific, so keep them out of version control
+and compare only runs from the same machine; a warning is printed when the
+baseline was recorded with another Python version or machine type. Saving with
+`--only` updates just those cases in an existing baseline.
+
+Usage:
+    python -m benchmarks.micro --save [--baseline benchmarks/micro_baseline.json]
+    python -m benchmarks.micro [--threshold 20] [--only posts_get] [--rounds 4 10 12]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import timeit
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.config.settings import settings
+from app.schemas.post import PostCreate, post_created_adapter
+from app.services import post_service
+from app.services.post_service import CachedPost, PostService, render_post_list
+from app.utils import hashing
+from app.utils.auth import get_current_user
+from app.utils.jwt import create_access_token
+from benchmarks.harness import make_engine, make_session, measure, print_table, seed_posts
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "micro_baseline.json")
+LIST_SIZES = (10, 100, 1000)
+PAYLOAD_SIZES = (1024, 10 * 1024, 100 * 1024, 1024 * 1024)
+
+
+@contextmanager
+def _bcrypt_rounds(rounds: int) -> Iterator[None]:
+    """Temporarily makes the hashing helpers use a different bcrypt cost."""
+    original = hashing.pwd_context
+    hashing.pwd_context = original.copy(
+        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds
+    )
+    try:
+        yield
+    finally:
+        hashing.pwd_context = original
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    """Median seconds per call, with enough calls per sample to last about 0.2 s."""
+    number, _ = timeit.Timer(fn).autorange()
+    return measure(fn, repeat=repeat, number=number)
+
+
+def _posts_cases(repeat: int) -> dict[str, float]:
+    results = {}
+    for size in LIST_SIZES:
+        engine = make_engine()
+        db = make_session(engine)
+        seed_posts(db, users=1, posts_per_user=size)
+        post_service.cache_store.clear()
+        post_service.cache_versions.clear()
+        results[f"posts_get_miss[{size}]"] = _time(
+            lambda: PostService.get_posts(db, 1, cache_minutes=0, stale_minutes=0), repeat
+        )
+        PostService.get_posts(db, 1)
+        results[f"posts_get_hit[{size}]"] = _time(lambda: PostService.get_posts(db, 1), repeat)
+        db.close()
+        engine.dispose()
+    return results
+
+
+def _jwt_cases(repeat: int) -> dict[str, float]:
+    claims = {"user_id": 1, "email": "bench@example.com"}
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(claims))
+    return {
+        "jwt_create_access_token": _time(lambda: create_access_token(claims), repeat),
+        "jwt_get_current_user": _time(lambda: get_current_user(None, credentials), repeat),
+    }
+
+
+def _hashing_cases(repeat: int, rounds_list: list[int]) -> dict[str, float]:
+    results = {}
+    for rounds in rounds_list:
+        with _bcrypt_rounds(rounds):
+            hashed = hashing.hash_password("benchmark-password")
+            results[f"hash_password[rounds={rounds}]"] = _time(
+                lambda: hashing.hash_password("benchmark-password"), repeat
+            )
+            results[f"verify_password[rounds={rounds}]"] = _time(
+                lambda: hashing.verify_password("benchmark-password", hashed), repeat
+            )
+    return results
+
+
+def _validation_cases(repeat: int) -> dict[str, float]:
+    results = {}
+    for size in PAYLOAD_SIZES:
+        body = json.dumps({"text": "x" * size}).encode()
+        # Parsed then validated, as FastAPI does for a request body
+        label = f"{size // (1024 * 1024)}MB" if size >= 1024 * 1024 else f"{size // 1024}KB"
+        results[f"post_create_validate[{label}]"] = _time(
+            lambda: PostCreate.model_validate(json.loads(body)), repeat
+        )
+    return results
+
+
+def _serialization_cases(repeat: int) -> dict[str, float]:
+    results = {}
+    start = datetime.datetime(2025, 1, 1)
+    for size in LIST_SIZES:
+        posts = [
+            CachedPost(f"{i:08d}-0000-0000-0000-000000000000", "x" * 200, start + datetime.timedelta(seconds=i))
+            for i in range(size)
+        ]
+        results[f"render_post_list[{size}]"] = _time(lambda: render_post_list(1, posts), repeat)
+    envelope = {"status": "success", "data": {"id": "00000000-0000-0000-0000-000000000000"}, "errors": None}
+    results["post_created_dump_json"] = _time(lambda: post_created_adapter.dump_json(envelope), repeat)
+    return results
+
+
+def run(repeat: int, rounds_list: list[int], only: str = "") -> dict[str, float]:
+    """Runs every case group and returns seconds per call by case name, filtered by `only`."""
+    results: dict[str, float] = {}
+    groups = (
+        ("posts_get", lambda: _posts_cases(repeat)),
+        ("jwt", lambda: _jwt_cases(repeat)),
+        ("password", lambda: _hashing_cases(repeat, rounds_list)),
+        ("post_create_validate", lambda: _validation_cases(repeat)),
+        ("serialization", lambda: _serialization_cases(repeat)),
+    )
+    for group, cases in groups:
+        if only and only not in group:
+            continue
+        results.update(cases())
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            threshold: float) -> tuple[list[list[str]], list[str]]:
+    """Compares results with a baseline.
+
+    Args:
+        results (dict[str, float]): Seconds per call by case name.
+        baseline (dict[str, float]): Baseline seconds per call by case name.
+        threshold (float): Allowed slowdown in percent before a case counts as a regression.
+
+    Returns:
+        tuple[list[list[str]], list[str]]: Table rows, and the names of the regressed cases.
+    """
+    rows, regressions = [], []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append([name, f"{seconds * 1e6:.1f}", "-", "new"])
+            continue
+        change = (seconds / base - 1) * 100
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        rows.append([name, f"{seconds * 1e6:.1f}", f"{base * 1e6:.1f}",
+                     f"{change:+.1f}%" + (" REGRESSION" if regressed else "")])
+    return rows, regressions
+
+
+def _load_baseline(path: str) -> Optional[dict[str, Any]]:
+    """Reads a saved baseline, or returns None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _environment(baseline: dict[str, Any]) -> dict[str, Any]:
+    """The Python version and machine a baseline was recorded on."""
+    return {"python": baseline.get("python"), "machine": baseline.get("machine")}
+
+
+def _describe(environment: dict[str, Any]) -> str:
+    return f"Python {environment['python']} ({environment['machine']})"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="Allowed slowdown in percent over the baseline before failing")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per case; the median is reported")
+    parser.add_argument("--rounds", type=int, nargs="+", default=sorted({4, 10, settings.BCRYPT_ROUNDS}),
+                        help="bcrypt costs to time hash_password/verify_password at")
+    parser.add_argument("--only", default="",
+                        help="Run only groups whose name contains this (posts_get, jwt, password, "
+                             "post_create_validate, serialization)")
+    args = parser.parse_args()
+
+    stored = _load_baseline(args.baseline)
+    environment = {"python": platform.python_version(), "machine": platform.machine()}
+    # A partial run only replaces its own cases, so the rest must come from the same environment
+    merge = args.save and args.only and stored is not None
+    if merge and _environment(stored) != environment:
+        sys.exit(f"Refusing to merge into {args.baseline}: it was recorded on "
+                 f"{_describe(_environment(stored))}, this is {_describe(environment)}; "
+                 "save a full run without --only instead")
+
+    results = run(args.repeat, args.rounds, args.only)
+    if args.save:
+        saved = {**stored["results"], **results} if merge else results
+        with open(args.baseline, "w") as f:
+            json.dump({**environment, "results": saved}, f, indent=2, sort_keys=True)
+        print_table(["case", "us/call"], [[name, f"{s * 1e6:.1f}"] for name, s in results.items()])
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline: dict[str, float] = {}
+    if stored is None:
+        print(f"No baseline at {args.baseline}; run with --save first to enable regression checks")
+    else:
+        baseline = stored["results"]
+        if _environment(stored) != environment:
+            print(f"Warning: baseline recorded on {_describe(_environment(stored))}, "
+                  f"this run is on {_describe(environment)}; timings may not be comparable")
+    rows, regressions = compare(results, baseline, args.threshold)
+    print_table(["case", "us/call", "baseline", "change"], rows)
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:g}%: "
+              + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Bytes per cached post: dict entries vs compact `CachedPost` records.
+
+Loads posts from SQLite, then measures with tracemalloc what it costs to keep
+them in the previous 4-key dict form (with an isoformat timestamp string) and
+in the current `CachedPost` form. Post text is shared with the loaded rows in
+both forms, so the numbers are the per-post overhead on top of the text.
+
+Usage:
+    python -m benchmarks.post_cache_memory [--posts 10000]
+"""
+import argparse
+import gc
+import tracemalloc
+from typing import Any, Callable
+
+from app.repositories.post_repository import PostRepository
+from app.services.post_service import CachedPost
+from benchmarks.harness import make_engine, make_session, print_table, seed_posts
+
+
+def as_dicts(rows: list) -> list[dict[str, Any]]:
+    return [
+        {"post_id": p.id, "user_id": p.user_id, "text": p.text, "created_at": p.created_at.isoformat()}
+        for p in rows
+    ]
+
+
+def as_records(rows: list) -> list[CachedPost]:
+    return [CachedPost(p.id, p.text, p.created_at) for p in rows]
+
+
+def allocated(build: Callable[[list], Any], rows: list) -> int:
+    """Returns the bytes still allocated by `build(rows)` while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=10000)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    db = make_session(engine)
+    seed_posts(db, users=1, posts_per_user=args.posts)
+    rows = PostRepository.get_by_user(db, 1)
+    # Touch every attribute so lazy loading does not show up in the measurement
+    for p in rows:
+        p.id, p.user_id, p.text, p.created_at
+
+    results = []
+    for name, build in (("dict", as_dicts), ("CachedPost", as_records)):
+        total = allocated(build, rows)
+        results.append([name, len(rows), total, f"{total / len(rows):.1f}"])
+    print_table(["representation", "posts", "bytes", "bytes/post"], results)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""DB query rate of the post cache under mixed read/write load.
+
+Compares the previous behaviour (drop the user's cache entry on every write)
+with the incremental update path, counting the SELECTs each one sends to the
+database for the same randomized workload.
+
+Usage:
+    python -m benchmarks.post_cache_queries [--users 50] [--ops 20000] [--write-ratio 0.2]
+"""
+import argparse
+import random
+
+from app.services import post_service
+from app.services.post_service import PostService
+from benchmarks.harness import QueryCounter, make_engine, make_session, print_table, seed_posts
+
+
+def run(mode: str, users: int, ops: int, write_ratio: float, posts_per_user: int, seed: int) -> tuple[int, int]:
+    """Runs the workload and returns (SELECTs issued by reads, write count)."""
+    engine = make_engine()
+    db = make_session(engine)
+    seed_posts(db, users, posts_per_user)
+    post_service.cache_store.clear()
+    post_service.cache_versions.clear()
+
+    rng = random.Random(seed)
+    writes = read_selects = 0
+    with QueryCounter(engine, "SELECT") as counter:
+        for _ in range(ops):
+            user_id = rng.randint(1, users)
+            if rng.random() < write_ratio:
+                PostService.add_post(db, user_id, "benchmark post", write_behind=False)
+                if mode == "invalidate":
+                    with post_service.cache_lock:
+                        post_service.cache_store.pop(user_id, None)
+                writes += 1
+            else:
+                before = counter.count
+                PostService.get_posts(db, user_id)
+                read_selects += counter.count - before
+    db.close()
+    engine.dispose()
+    return read_selects, writes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--posts-per-user", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = []
+    for mode in ("invalidate", "incremental"):
+        selects, writes = run(mode, args.users, args.ops, args.write_ratio, args.posts_per_user, args.seed)
+        reads = args.ops - writes
+        rows.append([mode, args.ops, writes, selects, f"{selects / max(reads, 1):.3f}"])
+    print_table(["mode", "ops", "writes", "read selects", "selects/read"], rows)
+
+
+if __name__ == "__main__":
+    main()
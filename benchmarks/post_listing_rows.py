@@ -0,0 +1,48 @@
+"""Cost of ORM hydration vs column tuples when loading a post listing.
+
+Loads one user's posts into the cache format (`CachedPost`) from an in-memory
+SQLite database, either through full `Post` ORM instances (identity map and
+attribute instrumentation) or through the column-projection path that yields
+plain rows.
+
+Usage:
+    python -m benchmarks.post_listing_rows [--sizes 1000 10000]
+"""
+import argparse
+
+from app.repositories.post_repository import PostRepository
+from app.services.post_service import CachedPost
+from benchmarks.harness import make_engine, make_session, measure, print_table, seed_posts
+
+
+def orm_objects(db, user_id: int) -> list[CachedPost]:
+    posts = [CachedPost(p.id, p.text, p.created_at) for p in PostRepository.get_by_user(db, user_id)]
+    db.expunge_all()
+    return posts
+
+
+def row_tuples(db, user_id: int) -> list[CachedPost]:
+    return [CachedPost(*row) for row in PostRepository.get_rows_by_user(db, user_id)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        db = make_session(make_engine())
+        seed_posts(db, users=1, posts_per_user=size)
+        baseline = None
+        for path in (orm_objects, row_tuples):
+            assert len(path(db, 1)) == size
+            seconds = measure(lambda: path(db, 1), repeat=5)
+            baseline = baseline or seconds
+            rows.append([size, path.__name__, f"{seconds * 1000:.2f}", f"{baseline / seconds:.1f}x"])
+        db.close()
+    print_table(["posts", "path", "ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Storage size and read throughput of plain vs compressed post bodies.
+
+Builds a corpus of English-like posts whose sizes follow a long-tailed
+distribution (most a few hundred bytes, some up to 1MB), stores it in an
+in-memory SQLite table with a plain `Text` column and with `CompressedText`,
+and compares the bytes stored and the time to read every body back.
+
+Usage:
+    python -m benchmarks.post_storage [--posts 2000] [--min-size 4096] [--codec zstd]
+"""
+import argparse
+import random
+
+from sqlalchemy import Column, MetaData, String, Table, Text, insert, select, text
+
+from app.models.types import CompressedText, zstandard
+from benchmarks.harness import make_engine, measure, print_table
+
+WORDS = ("the of and to in is that for it as was with be by on not he this are or his from at which but "
+         "have an they you were her she there one all we their been has when who will more no if out so said "
+         "what up its about into than them can only other new some could time these two may then do first "
+         "any my now such like our over man me even most made after also did many before must through back "
+         "market revenue quarter growth forecast ledger balance account invoice payment report audit").split()
+
+
+def corpus(posts: int, seed: int = 0) -> list[str]:
+    """Generates `posts` bodies with Zipf-like word frequencies and log-normal sizes."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    bodies = []
+    for _ in range(posts):
+        size = min(int(rng.lognormvariate(6.5, 1.6)), 1024 * 1024)
+        words = rng.choices(WORDS, weights, k=max(1, size // 5))
+        bodies.append(" ".join(words)[:max(size, 1)])
+    return bodies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--min-size", type=int, default=4096)
+    parser.add_argument("--codec", choices=("zstd", "zlib"), default="zstd")
+    args = parser.parse_args()
+
+    bodies = corpus(args.posts)
+    raw_bytes = sum(len(b.encode()) for b in bodies)
+    codec = args.codec if args.codec == "zlib" or zstandard is not None else "zlib (zstandard not installed)"
+    rows = []
+    for name, column_type in (("Text", Text()), (f"CompressedText/{codec}",
+                                                 CompressedText(args.min_size, args.codec))):
+        engine = make_engine()
+        posts = Table("bench_posts", MetaData(), Column("id", String(36), primary_key=True),
+                      Column("text", column_type))
+        posts.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(posts), [{"id": f"{i:08d}", "text": b} for i, b in enumerate(bodies)])
+            stored = conn.execute(text("SELECT sum(length(CAST(text AS BLOB))) FROM bench_posts")).scalar()
+
+        def read_all():
+            with engine.connect() as conn:
+                return conn.execute(select(posts.c.text)).scalars().all()
+
+        assert read_all() == bodies
+        seconds = measure(read_all, repeat=5)
+        rows.append([name, f"{stored / 1e6:.2f}", f"{stored / raw_bytes:.2f}",
+                     f"{seconds * 1000:.1f}", f"{raw_bytes / 1e6 / seconds:.0f}"])
+    print(f"{args.posts} posts, {raw_bytes / 1e6:.2f} MB of text")
+    print_table(["storage", "stored MB", "ratio", "read ms", "read MB/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Serialization time of the post listing response at 1k and 10k posts.
+
+Compares the default FastAPI path for a returned dict (`jsonable_encoder` then
+`json.dumps`), plain `json.dumps`, the validated `PostListResponse` path used
+when FAST_SERIALIZATION is off, and the `TypeAdapter.dump_json` fast path.
+
+Usage:
+    python -m benchmarks.serialization [--sizes 1000 10000] [--text-size 200]
+"""
+import argparse
+import datetime
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.post_service import CachedPost, _serialize, render_post_list
+from benchmarks.harness import measure, print_table
+
+
+def jsonable_encoder_path(user_id: int, posts: list[CachedPost]) -> bytes:
+    envelope = {"status": "success", "data": _serialize(user_id, posts), "errors": None}
+    return json.dumps(jsonable_encoder(envelope)).encode()
+
+
+def json_dumps_path(user_id: int, posts: list[CachedPost]) -> bytes:
+    envelope = {"status": "success", "data": _serialize(user_id, posts), "errors": None}
+    return json.dumps(envelope, separators=(",", ":")).encode()
+
+
+def validated_path(user_id: int, posts: list[CachedPost]) -> bytes:
+    return render_post_list(user_id, posts, fast=False)
+
+
+def type_adapter_path(user_id: int, posts: list[CachedPost]) -> bytes:
+    return render_post_list(user_id, posts, fast=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--text-size", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = (jsonable_encoder_path, json_dumps_path, validated_path, type_adapter_path)
+    rows = []
+    for size in args.sizes:
+        start = datetime.datetime(2025, 1, 1)
+        posts = [
+            CachedPost(f"{i:08d}-0000-0000-0000-000000000000", "x" * args.text_size,
+                       start + datetime.timedelta(seconds=i, microseconds=i))
+            for i in range(size)
+        ]
+        baseline = None
+        for path in paths:
+            seconds = measure(lambda: path(1, posts), repeat=5)
+            baseline = baseline or seconds
+            rows.append([size, path.__name__, f"{seconds * 1000:.2f}", f"{baseline / seconds:.1f}x"])
+    print_table(["posts", "path", "ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
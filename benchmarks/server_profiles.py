@@ -0,0 +1,109 @@
+"""Throughput of the default vs the production uvicorn profile.
+
+Boots `main:app` under each profile from `app.config.server.server_options` in
+a subprocess (single worker, lifespan off so no database is needed) and drives
+the health check endpoint over persistent HTTP/1.1 keep-alive connections with
+a minimal asyncio client, reporting requests per second and latency
+percentiles.
+
+Usage:
+    python -m benchmarks.server_profiles [--connections 64] [--seconds 5]
+"""
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+import uvicorn
+
+from app.config.server import server_options
+from benchmarks.harness import print_table
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: bench\r\n\r\n"
+
+
+def serve(profile: str, port: int) -> None:
+    options = server_options(profile)
+    options.update(host="127.0.0.1", port=port, reload=False, workers=1, lifespan="off")
+    uvicorn.run("main:app", **options)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def connection(port: int, stop_at: float, latencies: list[float]) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            writer.write(REQUEST)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = next(int(line.split(b":")[1]) for line in headers.split(b"\r\n")
+                          if line.lower().startswith(b"content-length"))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def drive(port: int, connections: int, seconds: float) -> list[float]:
+    await wait_until_up(port)
+    latencies: list[float] = []
+    stop_at = time.perf_counter() + seconds
+    await asyncio.gather(*(connection(port, stop_at, latencies) for _ in range(connections)))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    rows = []
+    for profile in ("default", "production"):
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.server_profiles", "--serve", profile, "--port", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            latencies = sorted(asyncio.run(drive(port, args.connections, args.seconds)))
+        finally:
+            server.terminate()
+            server.wait()
+        options = server_options(profile)
+        rows.append([
+            profile, options.get("loop", "auto"), options.get("http", "auto"),
+            f"{len(latencies) / args.seconds:.0f}",
+            f"{latencies[len(latencies) // 2] * 1000:.2f}",
+            f"{latencies[int(len(latencies) * 0.99)] * 1000:.2f}",
+        ])
+    print_table(["profile", "loop", "http", "req/s", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
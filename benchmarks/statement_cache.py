@@ -0,0 +1,80 @@
+"""Per-query Python overhead of the repository statements.
+
+Runs the post listing and email lookup queries against a tiny in-memory SQLite
+database, so the time is dominated by SQLAlchemy's statement construction,
+compilation and result processing rather than by the database. Compares the
+legacy `db.query(...).filter(...)` form, the module-level `select()` statements
+the repositories now use, and `lambda_stmt`, each with the compiled cache
+enabled and disabled.
+
+Usage:
+    python -m benchmarks.statement_cache [--number 2000]
+"""
+import argparse
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.post import Post
+from app.models.user import User
+from app.repositories.post_repository import PostRepository
+from app.repositories.user_repository import UserRepository
+from benchmarks.harness import make_engine, measure, print_table, seed_posts
+
+EMAIL = "bench@example.com"
+
+
+def legacy_posts(db):
+    return db.query(Post).filter(Post.user_id == 1).order_by(Post.created_at.desc()).all()
+
+
+def legacy_user(db):
+    return db.query(User).filter(User.email == EMAIL).first()
+
+
+def module_posts(db):
+    return PostRepository.get_by_user(db, 1)
+
+
+def module_user(db):
+    return UserRepository.get_by_email(db, EMAIL)
+
+
+def lambda_posts(db):
+    user_id = 1
+    stmt = lambda_stmt(lambda: select(Post))
+    stmt += lambda s: s.where(Post.user_id == user_id).order_by(Post.created_at.desc())
+    return list(db.scalars(stmt))
+
+
+def lambda_user(db):
+    email = EMAIL
+    stmt = lambda_stmt(lambda: select(User).where(User.email == email).limit(1))
+    return db.scalars(stmt).first()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    with sessionmaker(bind=engine)() as db:
+        seed_posts(db, users=1, posts_per_user=1)
+        db.add(User(email=EMAIL, password="x"))
+        db.commit()
+
+    rows = []
+    for cache in ("lru", "off"):
+        bound = engine if cache == "lru" else engine.execution_options(compiled_cache=None)
+        db = sessionmaker(bind=bound)()
+        for query in (legacy_posts, module_posts, lambda_posts, legacy_user, module_user, lambda_user):
+            query(db)
+            seconds = measure(lambda: (query(db), db.expunge_all()), repeat=5, number=args.number)
+            rows.append([cache, query.__name__, f"{seconds * 1e6:.1f}"])
+        db.close()
+    print_table(["compiled cache", "query", "us/query"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,75 @@ import uvicorn
 import logging
 from contextlib import asynccontextmanager
 import anyio
+import asyncio
 
 from app.config.settings import settings
-from app.config.database import init_database
+from app.config.logging_config import configure_logging
+from app.config.server import server_options, sampled_access_log_enabled
+from app.config.sharding import shard_map
+from app.services.post_service import (
+    ingest_queue, cache_refresher, prune_cache_periodically, restore_cache, snapshot_cache, snapshot_periodically
+)
+from app.utils.revocation import revocation_index, prune_periodically, sync_periodically
+from app.utils.load_monitor import load_monitor
+from app.utils.deadline import DeadlineExceeded
+from app.services.idempotency_service import idempotency_store, purge_periodically
+from app.services.post_purge import post_purgers
+from app.utils.post_storage import check_post_storage
 
 from app.controllers.auth_controller import auth_router
 from app.controllers.post_controller import post_router
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.access_log import SampledAccessLogMiddleware
+from app.middleware.load_shedding import LoadSheddingMiddleware
+from app.middleware.deadline import DeadlineMiddleware
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await anyio.to_thread.run_sync(init_database)
+    await anyio.to_thread.run_sync(shard_map.init_schema)
+    if settings.REVOCATION_BACKEND == "database":
+        # Load revocations made before this worker started, then keep following them
+        await anyio.to_thread.run_sync(revocation_index.sync)
+        revocation_syncer = asyncio.create_task(sync_periodically(revocation_index))
+    for shard_engine in shard_map.engines:
+        await anyio.to_thread.run_sync(check_post_storage, shard_engine)
+    if settings.POST_WRITE_BEHIND:
+        await anyio.to_thread.run_sync(ingest_queue.start)
+    if settings.POST_PURGE_ENABLED:
+        for purger in post_purgers:
+            purger.start()
+    if settings.CACHE_SNAPSHOT_PATH:
+        # Warm the post cache from the last snapshot without holding up startup
+        cache_restorer = asyncio.create_task(anyio.to_thread.run_sync(restore_cache))
+        cache_snapshotter = asyncio.create_task(snapshot_periodically())
+    cache_pruner = asyncio.create_task(prune_cache_periodically())
+    revocation_pruner = asyncio.create_task(prune_periodically(revocation_index))
+    idempotency_purger = asyncio.create_task(purge_periodically(idempotency_store))
+    load_monitor_task = asyncio.create_task(load_monitor.run())
     yield
+    load_monitor_task.cancel()
+    cache_pruner.cancel()
+    revocation_pruner.cancel()
+    if settings.REVOCATION_BACKEND == "database":
+        revocation_syncer.cancel()
+    idempotency_purger.cancel()
+    if settings.POST_WRITE_BEHIND:
+        await anyio.to_thread.run_sync(ingest_queue.stop)
+    if settings.POST_PURGE_ENABLED:
+        for purger in post_purgers:
+            await anyio.to_thread.run_sync(purger.stop)
+    cache_refresher.shutdown(wait=False, cancel_futures=True)
+    if settings.CACHE_SNAPSHOT_PATH:
+        cache_restorer.cancel()
+        cache_snapshotter.cancel()
+        try:
+            await anyio.to_thread.run_sync(snapshot_cache)
+        except Exception as e:
+            logger.error("Final cache snapshot failed: %s", e)
 
 app = FastAPI(
     title="Lucid Blog API",
@@ -30,7 +84,21 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Configure CORS middleware
+# Starlette runs the middleware added last first, so the list below goes from innermost to outermost
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if sampled_access_log_enabled():
+    app.add_middleware(SampledAccessLogMiddleware)
+
+if settings.REQUEST_DEADLINE_MS or settings.REQUEST_DEADLINE_ROUTES:
+    app.add_middleware(DeadlineMiddleware)
+
+# Rejects shed requests before any work other than CORS
+if settings.LOAD_SHED_ENABLED:
+    app.add_middleware(LoadSheddingMiddleware)
+
+# Configure CORS middleware, outermost so 503 and 504 answers from the layers above carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS if hasattr(settings, 'ALLOWED_ORIGINS') else ["*"],
@@ -39,6 +107,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exception_handler(request: Request, exc: DeadlineExceeded):
+    """
+    Answers requests whose database work ran past their deadline with 504.
+
+    Args:
+        request (Request): The HTTP request that ran out of time
+        exc (DeadlineExceeded): The exception that was raised
+
+    Returns:
+        JSONResponse: Standardized error response
+    """
+    logger.warning("Deadline exceeded on %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=504,
+        content={
+            "detail": "Request deadline exceeded.",
+            "error": "Gateway timeout"
+        }
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """
@@ -51,7 +140,7 @@ async def global_exception_handler(request: Request, exc: Exception):
     Returns:
         JSONResponse: Standardized error response
     """
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
+    logger.error("Unhandled exception on %s %s: %s", request.method, request.url.path, exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={
@@ -84,11 +173,16 @@ async def root():
         "version": "1.0.0"
     }
 
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Worker load and background job metrics.
+    """
+    return {
+        "load": load_monitor.metrics(),
+        "post_purge": [purger.metrics() for purger in post_purgers]
+    }
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info"
-    )
+    uvicorn.run("main:app", **server_options())
@@ -0,0 +1,38 @@
+"""Create user_post_stats table
+
+Revision ID: 3b7e1c9d4a20
+Revises: d882afa75189
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e1c9d4a20'
+down_revision: Union[str, None] = 'd882afa75189'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Existing users get their counters from `python -m app.services.post_stats_service`.
+    """
+    op.create_table('user_post_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_count', sa.Integer(), nullable=False),
+    sa.Column('total_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('last_post_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_user_post_stats_user_id_users'),
+    sa.PrimaryKeyConstraint('user_id', name='pk_user_post_stats')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_post_stats')
@@ -0,0 +1,30 @@
+"""Add posts.deleted_at soft-delete tombstone
+
+Revision ID: 9c4e2b7a1f36
+Revises: 5d2a8f6c0e71
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2b7a1f36'
+down_revision: Union[str, None] = '5d2a8f6c0e71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_posts_deleted_at'), 'posts', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_posts_deleted_at'), table_name='posts')
+    op.drop_column('posts', 'deleted_at')
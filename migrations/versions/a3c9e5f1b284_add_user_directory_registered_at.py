@@ -0,0 +1,29 @@
+"""Add user_directory.registered_at
+
+Revision ID: a3c9e5f1b284
+Revises: f2b6d8a0c417
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e5f1b284'
+down_revision: Union[str, None] = 'f2b6d8a0c417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_directory', sa.Column('registered_at', sa.DateTime(), nullable=False,
+                                              server_default=sa.func.now()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_directory', 'registered_at')
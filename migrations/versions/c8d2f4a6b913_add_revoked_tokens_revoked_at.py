@@ -0,0 +1,31 @@
+"""Add revoked_tokens.revoked_at sync cursor
+
+Revision ID: c8d2f4a6b913
+Revises: a3c9e5f1b284
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d2f4a6b913'
+down_revision: Union[str, None] = 'a3c9e5f1b284'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('revoked_tokens', sa.Column('revoked_at', sa.DateTime(), nullable=False,
+                                              server_default=sa.func.now()))
+    op.create_index(op.f('ix_revoked_tokens_revoked_at'), 'revoked_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_revoked_tokens_revoked_at'), table_name='revoked_tokens')
+    op.drop_column('revoked_tokens', 'revoked_at')
@@ -0,0 +1,45 @@
+"""Add posts.text_size byte count
+
+Revision ID: e4a7c1b9d053
+Revises: b71f0d3e9a52
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.types import decode_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c1b9d053'
+down_revision: Union[str, None] = 'b71f0d3e9a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('text_size', sa.Integer(), nullable=False, server_default='0'))
+    # Sized in Python so rows already compressed at rest count their decoded UTF-8 length
+    conn = op.get_bind()
+    select_batch = sa.text("SELECT id, text FROM posts WHERE id > :last_id ORDER BY id LIMIT :limit")
+    update_size = sa.text("UPDATE posts SET text_size = :size WHERE id = :id")
+    last_id = ""
+    while True:
+        rows = conn.execute(select_batch, {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        conn.execute(update_size, [
+            {"id": post_id, "size": len(decode_text(value).encode("utf-8"))} for post_id, value in rows
+        ])
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'text_size')